@@ -0,0 +1,454 @@
+"""
+Колоночный формат снимков данных с отображением файлов в память
+
+Снимок - папка <имя>.columns. Списки объектов снимка (например, campaigns,
+keywords или visits_report.data) хранятся как таблицы: вложенные поля
+разворачиваются в отдельные столбцы ('TextAd.Title', 'DailyBudget.Amount'),
+каждый столбец - отдельный файл .npy:
+
+- целые, дробные и логические значения - массивы NumPy;
+- строки с небольшим числом различных значений (State, Status, Type) -
+  коды в словаре значений из schema.json;
+- остальные строки - общий буфер UTF-8 и смещения строк;
+- списки и значения смешанных типов - строки JSON.
+
+Отсутствующие поля и None отмечаются отдельным массивом состояний. Прочие
+поля снимка (timestamp, параметры отчетов) хранятся в schema.json.
+
+Файлы открываются через np.load(mmap_mode='r'): открытие снимка читает только
+schema.json, а данные столбца читаются с диска при первом обращении к нему,
+поэтому анализ, которому нужны несколько столбцов, не читает остальные.
+
+Модуль общий для yandex_direct_connector и yandex_metrika_connector: их модули
+добавляют папку shared в sys.path.
+"""
+import copy
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson не обязателен
+    orjson = None
+
+# Расширение папки колоночного снимка
+COLUMN_SNAPSHOT_SUFFIX = '.columns'
+
+# Строковый столбец кодируется словарем, если различных значений не больше
+STRING_DICTIONARY_LIMIT = 1024
+
+FORMAT_VERSION = 1
+
+# Состояния значений столбца
+_MISSING_STATE, _NULL_STATE, _VALUE_STATE = 0, 1, 2
+
+_DTYPES = {'int': np.int64, 'float': np.float64, 'bool': np.bool_}
+
+
+class _Missing:
+    """Метка отсутствующего в объекте поля"""
+
+
+_MISSING = _Missing()
+
+# Выбор столбцов: {таблица: [столбцы или префиксы вложенных полей]}
+ColumnSelection = Dict[str, Sequence[str]]
+
+
+def _dumps(value: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode('utf-8')
+        except TypeError:  # например, целые больше 64 бит
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _loads(value: str) -> Any:
+    if orjson is not None:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
+def _is_table(value: Any) -> bool:
+    """Непустой список объектов"""
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+
+def _flatten(item: Dict[str, Any], prefix: str, row: int, rows: int,
+             columns: Dict[str, List[Any]]) -> None:
+    """Раскладка вложенных полей объекта по столбцам 'A.B.C'"""
+    for key, value in item.items():
+        name = prefix + key
+        if isinstance(value, dict) and value:
+            _flatten(value, name + '.', row, rows, columns)
+            continue
+        column = columns.get(name)
+        if column is None:
+            column = columns[name] = [_MISSING] * rows
+        column[row] = value
+
+
+def _column_kind(values: List[Any]) -> str:
+    """Тип хранения столбца: int, float, bool, str, json или null"""
+    types = set(map(type, values)) - {_Missing, type(None)}
+    if not types:
+        return 'null'
+    if len(types) == 1:
+        kind = next(iter(types))
+        if kind is int:
+            present = [value for value in values if type(value) is int]
+            if min(present) >= np.iinfo(np.int64).min and max(present) <= np.iinfo(np.int64).max:
+                return 'int'
+        elif kind in (float, bool, str):
+            return kind.__name__
+    return 'json'
+
+
+def _encode_strings(values: Iterable[str]) -> Dict[str, np.ndarray]:
+    """Строки в виде буфера UTF-8 и смещений начала строк"""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    return {'offsets': offsets, 'data': np.frombuffer(b''.join(encoded), dtype=np.uint8)}
+
+
+def _encode_column(values: List[Any], kind: str) -> Dict[str, Any]:
+    """
+    Массивы столбца для записи на диск
+    
+    Returns:
+        {'kind', 'arrays': {имя массива: массив}, 'dictionary' (для str со словарем)}
+    """
+    rows = len(values)
+    arrays: Dict[str, np.ndarray] = {}
+    encoded: Dict[str, Any] = {'kind': kind, 'arrays': arrays}
+    
+    if any(value is _MISSING or value is None for value in values):
+        arrays['state'] = np.fromiter(
+            (_MISSING_STATE if value is _MISSING else _NULL_STATE if value is None else _VALUE_STATE
+             for value in values), dtype=np.int8, count=rows)
+    
+    if kind in _DTYPES:
+        filler = _DTYPES[kind](0)
+        arrays['values'] = np.fromiter(
+            (filler if value is _MISSING or value is None else value for value in values),
+            dtype=_DTYPES[kind], count=rows)
+    elif kind == 'str':
+        present = [value for value in values if isinstance(value, str)]
+        dictionary = dict.fromkeys(present)
+        if len(dictionary) <= STRING_DICTIONARY_LIMIT and len(dictionary) * 2 <= len(present):
+            codes = {value: code for code, value in enumerate(dictionary)}
+            arrays['codes'] = np.fromiter(
+                (codes.get(value, -1) if isinstance(value, str) else -1 for value in values),
+                dtype=np.int32, count=rows)
+            encoded['dictionary'] = list(dictionary)
+        else:
+            arrays.update(_encode_strings(value if isinstance(value, str) else '' for value in values))
+    elif kind == 'json':
+        arrays.update(_encode_strings(
+            '' if value is _MISSING or value is None else _dumps(value) for value in values))
+    return encoded
+
+
+def _assemble(node: Dict[Any, Any]) -> Tuple[List[Any], Optional[np.ndarray]]:
+    """
+    Объекты по дереву полей (см. ColumnSnapshot.records)
+    
+    Объекты строятся сразу со всеми ключами, затем из них удаляются
+    отсутствующие поля - обычно таких строк немного.
+    
+    Returns:
+        (объекты по строкам, маска строк, где есть хотя бы одно поле; None - во всех)
+    """
+    keys, columns, masks = [], [], []
+    for key, child in node.items():
+        if key is None:
+            continue
+        values, present = _assemble(child) if isinstance(child, dict) else child
+        keys.append(key)
+        columns.append(values)
+        masks.append(present)
+    
+    items = [dict(zip(keys, row)) for row in zip(*columns)]
+    for key, present in zip(keys, masks):
+        if present is not None:
+            for row in np.flatnonzero(~present).tolist():
+                del items[row][key]
+    present = None if any(mask is None for mask in masks) else np.logical_or.reduce(masks)
+    
+    # Поле, которое в одних объектах вложенное, а в других - простое значение
+    if None in node:
+        values, leaf_present = node[None]
+        rows = range(len(items)) if leaf_present is None else np.flatnonzero(leaf_present).tolist()
+        for row in rows:
+            items[row] = values[row]
+        present = None if leaf_present is None or present is None else present | leaf_present
+    return items, present
+
+
+def write_column_snapshot(data: Dict[str, Any], path: Union[str, Path]) -> Path:
+    """
+    Запись данных в колоночный снимок
+    
+    Таблицами становятся списки объектов верхнего уровня и списки объектов
+    внутри словарей верхнего уровня (например, data отчета).
+    
+    Args:
+        data: Данные (collect_all_data или другой словарь со списками объектов)
+        path: Папка снимка (будет создана; существующие файлы перезаписываются)
+    
+    Returns:
+        Путь к папке снимка
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    
+    meta: Dict[str, Any] = {}
+    tables: Dict[str, List[str]] = {}
+    for key, value in data.items():
+        if _is_table(value):
+            tables[key] = [key]
+            meta[key] = None
+        elif isinstance(value, dict):
+            meta[key] = {}
+            for inner_key, inner_value in value.items():
+                if _is_table(inner_value):
+                    tables[f'{key}.{inner_key}'] = [key, inner_key]
+                    meta[key][inner_key] = None
+                else:
+                    meta[key][inner_key] = inner_value
+        else:
+            meta[key] = value
+    
+    schema: Dict[str, Any] = {'version': FORMAT_VERSION, 'meta': meta, 'tables': {}}
+    for number, (name, table_path) in enumerate(tables.items()):
+        items = data[table_path[0]] if len(table_path) == 1 else data[table_path[0]][table_path[1]]
+        rows = len(items)
+        columns: Dict[str, List[Any]] = {}
+        for row, item in enumerate(items):
+            _flatten(item, '', row, rows, columns)
+        
+        table_schema: Dict[str, Any] = {'path': table_path, 'rows': rows, 'columns': {}}
+        for index, (column_name, values) in enumerate(columns.items()):
+            encoded = _encode_column(values, _column_kind(values))
+            prefix = f't{number}.c{index}'
+            for array_name, array in encoded['arrays'].items():
+                np.save(path / f'{prefix}.{array_name}.npy', array)
+            column_schema = {'kind': encoded['kind'], 'file': prefix, 'arrays': list(encoded['arrays'])}
+            if 'dictionary' in encoded:
+                column_schema['dictionary'] = encoded['dictionary']
+            table_schema['columns'][column_name] = column_schema
+            del columns[column_name][:]
+        schema['tables'][name] = table_schema
+    
+    # Схема пишется последней: без нее папка не считается снимком
+    (path / 'schema.json').write_text(json.dumps(schema, ensure_ascii=False), encoding='utf-8')
+    return path
+
+
+class ColumnSnapshot:
+    """Колоночный снимок, открытый для чтения (данные столбцов отображаются в память)"""
+    
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: Папка снимка
+        """
+        self.path = Path(path)
+        schema_file = self.path / 'schema.json'
+        if not schema_file.exists():
+            raise FileNotFoundError(f"Колоночный снимок не найден: {self.path}")
+        
+        schema = json.loads(schema_file.read_text(encoding='utf-8'))
+        if schema.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия колоночного снимка: {schema.get('version')}")
+        self.meta: Dict[str, Any] = schema['meta']
+        self._tables: Dict[str, Dict[str, Any]] = schema['tables']
+        self._arrays: Dict[str, np.ndarray] = {}
+    
+    @property
+    def tables(self) -> List[str]:
+        """Имена таблиц снимка"""
+        return list(self._tables)
+    
+    def rows(self, table: str) -> int:
+        """Число строк таблицы (0, если таблицы нет)"""
+        return self._tables[table]['rows'] if table in self._tables else 0
+    
+    def columns(self, table: str) -> List[str]:
+        """Столбцы таблицы (вложенные поля - через точку)"""
+        return list(self._tables[table]['columns']) if table in self._tables else []
+    
+    def _column_schema(self, table: str, name: str) -> Dict[str, Any]:
+        if table not in self._tables:
+            raise KeyError(f"Таблица не найдена: {table}")
+        columns = self._tables[table]['columns']
+        if name not in columns:
+            raise KeyError(f"Столбец не найден: {table}.{name}")
+        return columns[name]
+    
+    def _array(self, column: Dict[str, Any], array_name: str) -> np.ndarray:
+        key = f"{column['file']}.{array_name}"
+        if key not in self._arrays:
+            self._arrays[key] = np.load(self.path / f'{key}.npy', mmap_mode='r')
+        return self._arrays[key]
+    
+    def _state(self, column: Dict[str, Any]) -> Optional[np.ndarray]:
+        return self._array(column, 'state') if 'state' in column['arrays'] else None
+    
+    def valid(self, table: str, name: str) -> np.ndarray:
+        """Маска строк, в которых у поля есть значение (не отсутствует и не None)"""
+        state = self._state(self._column_schema(table, name))
+        if state is None:
+            return np.ones(self.rows(table), dtype=bool)
+        return state == _VALUE_STATE
+    
+    def column(self, table: str, name: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Значения столбца
+        
+        Числовые и логические столбцы возвращаются как массивы, отображенные
+        в память (без копирования); на месте отсутствующих значений - 0 или False
+        (см. valid). Строки и значения JSON декодируются - только для rows,
+        если они заданы; на месте отсутствующих значений - None.
+        
+        Args:
+            table: Таблица
+            name: Столбец
+            rows: Номера строк (None - все)
+        """
+        column = self._column_schema(table, name)
+        kind = column['kind']
+        if kind in ('int', 'float', 'bool'):
+            values = self._array(column, 'values')
+            return values if rows is None else values[rows]
+        
+        count = self.rows(table) if rows is None else len(rows)
+        result = np.empty(count, dtype=object)
+        state = self._state(column)
+        if state is not None and rows is not None:
+            state = state[rows]
+        if kind == 'null':
+            return result
+        
+        if 'codes' in column['arrays']:
+            codes = self._array(column, 'codes')
+            codes = codes if rows is None else codes[rows]
+            dictionary = np.empty(len(column['dictionary']) + 1, dtype=object)
+            dictionary[:-1] = column['dictionary']
+            return dictionary[codes]
+        
+        offsets = self._array(column, 'offsets')
+        data = self._array(column, 'data')
+        if rows is None:
+            buffer = data.tobytes()
+            bounds = zip(offsets[:-1].tolist(), offsets[1:].tolist())
+        else:
+            buffer = data
+            bounds = zip(offsets[rows].tolist(), offsets[np.asarray(rows) + 1].tolist())
+        decode = _loads if kind == 'json' else None
+        present = None if state is None else (state == _VALUE_STATE).tolist()
+        for i, (start, end) in enumerate(bounds):
+            if present is not None and not present[i]:
+                continue
+            text = buffer[start:end]
+            text = (text if rows is None else bytes(text)).decode('utf-8')
+            result[i] = decode(text) if decode else text
+        return result
+    
+    def _selected(self, table: str, names: Optional[Sequence[str]]) -> List[str]:
+        """Столбцы таблицы по именам или префиксам вложенных полей ('Productivity')"""
+        columns = self.columns(table)
+        if names is None:
+            return columns
+        prefixes = tuple(f'{name}.' for name in names)
+        wanted = set(names)
+        return [column for column in columns if column in wanted or column.startswith(prefixes)]
+    
+    def to_frame(self, table: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Таблица в виде DataFrame с развернутыми вложенными полями
+        
+        Целые столбцы с пропусками получают тип Int64, логические - boolean.
+        
+        Args:
+            table: Таблица
+            columns: Нужные столбцы или префиксы вложенных полей (None - все)
+        """
+        frame: Dict[str, Any] = {}
+        for name in self._selected(table, columns):
+            column = self._column_schema(table, name)
+            values = self.column(table, name)
+            state = self._state(column)
+            if column['kind'] == 'float' and state is not None:
+                values = np.where(state == _VALUE_STATE, values, np.nan)
+            elif column['kind'] == 'int' and state is not None:
+                values = pd.arrays.IntegerArray(np.asarray(values), state != _VALUE_STATE)
+            elif column['kind'] == 'bool' and state is not None:
+                values = pd.arrays.BooleanArray(np.asarray(values), state != _VALUE_STATE)
+            frame[name] = values
+        return pd.DataFrame(frame, index=pd.RangeIndex(self.rows(table)))
+    
+    def records(self, table: str, columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Объекты таблицы в исходном виде (со вложенными полями)
+        
+        Args:
+            table: Таблица
+            columns: Нужные столбцы или префиксы вложенных полей (None - все)
+        """
+        # Дерево полей: {ключ: лист (значения, маска наличия) или поддерево};
+        # лист с тем же ключом, что и поддерево, хранится в поддереве под ключом None
+        tree: Dict[Any, Any] = {}
+        for name in self._selected(table, columns):
+            column = self._column_schema(table, name)
+            values = self.column(table, name).tolist()
+            state = self._state(column)
+            present = None
+            if state is not None:
+                present = state != _MISSING_STATE
+                if column['kind'] in _DTYPES:
+                    for row in np.flatnonzero(state == _NULL_STATE).tolist():
+                        values[row] = None
+            
+            node = tree
+            *parents, key = name.split('.')
+            for parent in parents:
+                child = node.setdefault(parent, {})
+                if isinstance(child, tuple):
+                    child = node[parent] = {None: child}
+                node = child
+            if isinstance(node.get(key), dict):
+                node[key][None] = (values, present)
+            else:
+                node[key] = (values, present)
+        
+        if not tree:
+            return [{} for _ in range(self.rows(table))]
+        return _assemble(tree)[0]
+    
+    def to_data(self, columns: Optional[ColumnSelection] = None) -> Dict[str, Any]:
+        """
+        Восстановление данных в исходном формате
+        
+        Args:
+            columns: Нужные столбцы по таблицам, например {'keywords': ['Id', 'Bid']};
+                таблицы, не указанные в columns, пропускаются (None - все таблицы целиком)
+        """
+        data = copy.deepcopy(self.meta)
+        for table, table_schema in self._tables.items():
+            if columns is not None and table not in columns:
+                items: List[Dict[str, Any]] = []
+            else:
+                items = self.records(table, None if columns is None else columns[table])
+            path = table_schema['path']
+            if len(path) == 1:
+                data[path[0]] = items
+            else:
+                data[path[0]][path[1]] = items
+        return data
@@ -0,0 +1,119 @@
+"""
+Агентский режим: параллельный сбор данных по многим клиентам
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+from config import AGENCY_MAX_CLIENTS
+from connector import YandexDirectConnector
+from data_collector import DataCollector
+
+logger = logging.getLogger(__name__)
+
+ENTITY_KEYS = ('campaigns', 'ad_groups', 'ads', 'keywords')
+
+
+class AgencyCollector:
+    """Сбор данных по всем клиентам агентства одновременно"""
+    
+    def __init__(self, connector: YandexDirectConnector, max_clients: int = AGENCY_MAX_CLIENTS,
+                 fields: Union[None, str, Dict] = None):
+        """
+        Инициализация агентского сборщика
+        
+        Args:
+            connector: Коннектор с агентским токеном
+            max_clients: Сколько клиентов обрабатывается одновременно
+            fields: Запрашиваемые поля (см. DataCollector)
+        """
+        self.connector = connector
+        self.max_clients = max_clients
+        self.fields = fields
+        
+        logger.info("AgencyCollector инициализирован")
+    
+    def list_clients(self, include_archived: bool = False) -> List[str]:
+        """
+        Логины клиентов агентства
+        
+        Args:
+            include_archived: Включать ли архивных клиентов
+        
+        Returns:
+            Список логинов
+        """
+        clients = self.connector.get_agency_clients(include_archived=include_archived)
+        return [client['Login'] for client in clients if client.get('Login')]
+    
+    def _collect_client(self, login: str, campaign_ids: Optional[List[int]]) -> Dict:
+        """Сбор данных одного клиента через отдельный коннектор (свой Client-Login и бюджет баллов)"""
+        collector = DataCollector(self.connector.for_client(login), fields=self.fields)
+        return collector.collect_all_data(campaign_ids=campaign_ids)
+    
+    def collect_all_clients(self, logins: Optional[List[str]] = None,
+                            campaign_ids: Optional[Dict[str, List[int]]] = None) -> Dict:
+        """
+        Параллельный сбор данных по клиентам
+        
+        Каждый клиент обрабатывается в своем потоке со своим Client-Login;
+        баллы учитываются регулятором отдельно по каждому логину. Ошибка
+        одного клиента не прерывает сбор остальных.
+        
+        Args:
+            logins: Логины клиентов (если None - все неархивные клиенты агентства)
+            campaign_ids: ID кампаний по логинам (если для логина не указаны - все кампании)
+        
+        Returns:
+            Мультиклиентский набор данных: данные по логинам в 'clients',
+            объединенные списки объектов (с полем ClientLogin) и ошибки по логинам
+        """
+        if logins is None:
+            logins = self.list_clients()
+        campaign_ids = campaign_ids or {}
+        
+        logger.info(f"Агентский сбор данных: клиентов {len(logins)}, одновременно {self.max_clients}")
+        started = time.monotonic()
+        
+        result = {
+            'timestamp': datetime.now().isoformat(),
+            'clients': {},
+            'errors': {},
+            'budgets': {},
+            'durations': {}
+        }
+        
+        def run(login: str) -> Dict:
+            client_started = time.monotonic()
+            try:
+                return self._collect_client(login, campaign_ids.get(login))
+            finally:
+                result['durations'][login] = round(time.monotonic() - client_started, 3)
+        
+        with ThreadPoolExecutor(max_workers=self.max_clients) as executor:
+            futures = {executor.submit(run, login): login for login in logins}
+            for future in as_completed(futures):
+                login = futures[future]
+                try:
+                    result['clients'][login] = future.result()
+                except Exception as e:
+                    logger.error(f"Ошибка сбора данных клиента {login}: {e}")
+                    result['errors'][login] = str(e)
+                result['budgets'][login] = self.connector.governor.get_budget(login)
+        
+        # Объединенные списки в порядке входных логинов
+        for key in ENTITY_KEYS:
+            merged = []
+            for login in logins:
+                for item in result['clients'].get(login, {}).get(key, []):
+                    item['ClientLogin'] = login
+                    merged.append(item)
+            result[key] = merged
+        
+        logger.info(
+            f"Агентский сбор завершен за {time.monotonic() - started:.1f} с: "
+            f"успешно {len(result['clients'])}, с ошибками {len(result['errors'])}"
+        )
+        return result
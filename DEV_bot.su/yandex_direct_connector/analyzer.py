@@ -3,21 +3,52 @@
 """
 import json
 import logging
+import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
 import pandas as pd
 
+# Модули, общие для коннекторов Директа и Метрики (column_snapshot)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'shared'))
+
+from column_snapshot import ColumnSnapshot
 from config import REPORTS_DIR
+from excel_export import StreamingExcelWriter
+from keyword_analytics import KeywordArrays, analyze_keyword_performance
 
 logger = logging.getLogger(__name__)
 
+# Способы расчета: 'columnar' - по столбцам (pandas/NumPy) за несколько проходов,
+# 'python' - исходный перебор списков (эталон для сравнения, квадратичный по объему)
+ANALYZER_ENGINES = ('columnar', 'python')
+
 
 class StrategyAnalyzer:
     """Класс для анализа стратегии рекламных кампаний"""
     
-    def __init__(self):
-        """Инициализация анализатора"""
+    # Поля, которые читает анализ (передаются в DataCollector(fields=...))
+    REQUIRED_FIELDS = {
+        'campaigns': {
+            'FieldNames': ['Id', 'Name', 'Type', 'Status', 'DailyBudget', 'Funds'],
+            'TextCampaignFieldNames': ['BiddingStrategy']
+        },
+        'ad_groups': {'FieldNames': ['Id', 'CampaignId']},
+        'ads': {'FieldNames': ['Id', 'CampaignId']},
+        'keywords': {'FieldNames': ['Id', 'CampaignId', 'Keyword', 'Bid', 'Status']}
+    }
+    
+    def __init__(self, engine: str = 'columnar'):
+        """
+        Инициализация анализатора
+        
+        Args:
+            engine: Способ расчета ('columnar' или 'python', см. ANALYZER_ENGINES)
+        """
+        if engine not in ANALYZER_ENGINES:
+            raise ValueError(f"Неизвестный способ расчета: {engine}. Доступны: {', '.join(ANALYZER_ENGINES)}")
+        self.engine = engine
         self.reports_dir = REPORTS_DIR
         logger.info("StrategyAnalyzer инициализирован")
     
@@ -31,6 +62,106 @@ class StrategyAnalyzer:
         Returns:
             Результаты анализа
         """
+        if self.engine == 'columnar':
+            return self._analyze_campaigns_columnar(data)
+        return self._analyze_campaigns_python(data)
+    
+    def _analyze_campaigns_columnar(self, data: Dict) -> Dict:
+        """
+        Анализ по столбцам: каждый список объектов читается один раз,
+        счетчики по кампаниям и статусам считаются группировкой pandas
+        """
+        campaigns = data.get('campaigns', [])
+        keywords = data.get('keywords', [])
+        
+        analysis = {
+            'timestamp': datetime.now().isoformat(),
+            'summary': {},
+            'campaign_analysis': [],
+            'keyword_analysis': {},
+            'recommendations': []
+        }
+        
+        campaign_statuses = self._count_by(campaigns, 'Status')
+        counts = {key: self._count_by(data.get(key, []), 'CampaignId') for key in ('ad_groups', 'ads', 'keywords')}
+        
+        analysis['summary'] = {
+            'total_campaigns': len(campaigns),
+            'total_ad_groups': len(data.get('ad_groups', [])),
+            'total_ads': len(data.get('ads', [])),
+            'total_keywords': len(keywords),
+            'active_campaigns': campaign_statuses.get('ACCEPTED', 0),
+            'paused_campaigns': campaign_statuses.get('PAUSED', 0),
+            'archived_campaigns': campaign_statuses.get('ARCHIVED', 0)
+        }
+        
+        for campaign in campaigns:
+            campaign_id = campaign.get('Id')
+            analysis['campaign_analysis'].append({
+                'campaign_id': campaign_id,
+                'campaign_name': campaign.get('Name', 'N/A'),
+                'status': campaign.get('Status', 'N/A'),
+                'type': campaign.get('Type', 'N/A'),
+                'ad_groups_count': counts['ad_groups'].get(campaign_id, 0),
+                'ads_count': counts['ads'].get(campaign_id, 0),
+                'keywords_count': counts['keywords'].get(campaign_id, 0),
+                'strategy': self._extract_strategy(campaign),
+                'budget': self._extract_budget(campaign)
+            })
+        
+        analysis['keyword_analysis'] = self._analyze_keywords_columnar(keywords)
+        analysis['recommendations'] = self._generate_recommendations(analysis)
+        
+        return analysis
+    
+    @staticmethod
+    def _count_by(items: List[Dict], key: str) -> Dict[Any, int]:
+        """Число объектов по значению поля (в порядке первого появления)"""
+        if not items:
+            return {}
+        values = pd.Series([item.get(key) for item in items], dtype=object)
+        return {value: int(count) for value, count in values.value_counts(sort=False, dropna=False).items()}
+    
+    def _analyze_keywords_columnar(self, keywords: List[Dict]) -> Dict:
+        """Анализ ключевых слов по столбцам (результат совпадает с _analyze_keywords)"""
+        if not keywords:
+            return {}
+        
+        statuses = pd.Series([kw.get('Status', 'Unknown') for kw in keywords], dtype=object)
+        analysis = {
+            'total': len(keywords),
+            'by_status': {status: int(count) for status, count in statuses.value_counts(sort=False, dropna=False).items()},
+            'by_bid_range': {},
+            'top_keywords': []
+        }
+        
+        bids = np.asarray([kw.get('Bid') or 0 for kw in keywords])
+        if bids.dtype == object:
+            bids = bids.astype(float)
+        positions = np.flatnonzero(bids)
+        if positions.size:
+            selected = bids[positions]
+            analysis['by_bid_range'] = {
+                'min': selected.min().item(),
+                'max': selected.max().item(),
+                'avg': selected.sum().item() / positions.size
+            }
+        
+        # Топ по ставке; при равных ставках - в исходном порядке, как у sorted()
+        top = positions[np.argsort(-bids[positions], kind='stable')[:10]]
+        analysis['top_keywords'] = [
+            {
+                'keyword': keywords[i].get('Keyword', 'N/A'),
+                'bid': keywords[i].get('Bid', 0),
+                'status': keywords[i].get('Status', 'N/A')
+            }
+            for i in top
+        ]
+        
+        return analysis
+    
+    def _analyze_campaigns_python(self, data: Dict) -> Dict:
+        """Анализ перебором списков (по всем объектам для каждой кампании)"""
         campaigns = data.get('campaigns', [])
         ad_groups = data.get('ad_groups', [])
         ads = data.get('ads', [])
@@ -84,6 +215,26 @@ class StrategyAnalyzer:
         
         return analysis
     
+    def analyze_keyword_performance(self, data: Union[Dict, ColumnSnapshot],
+                                    report: Optional[Dict] = None) -> Dict:
+        """
+        Аналитика эффективности ключевых слов (см. keyword_analytics.py)
+        
+        Распределения ставок, CTR и CPC по кампаниям и выбросы по продуктивности.
+        Нужны поля keyword_analytics.REQUIRED_FIELDS (есть в профилях 'analysis' и 'full').
+        
+        Args:
+            data: Данные о кампаниях или колоночный снимок (DataCollector.open_snapshot) -
+                из снимка читаются только нужные столбцы ключевых слов
+            report: Отчет CRITERIA_PERFORMANCE_REPORT (CriterionId, Clicks, Cost) для расчета CPC
+            
+        Returns:
+            Результаты анализа
+        """
+        if isinstance(data, ColumnSnapshot):
+            return analyze_keyword_performance(KeywordArrays.from_snapshot(data), report)
+        return analyze_keyword_performance(data.get('keywords', []), report)
+    
     def _extract_strategy(self, campaign: Dict) -> Dict:
         """Извлечение информации о стратегии кампании"""
         strategy_info = {
@@ -260,38 +411,39 @@ class StrategyAnalyzer:
         
         filepath = self.reports_dir / filename
         
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        with StreamingExcelWriter(filepath) as writer:
             # Сводка
-            summary = analysis.get('summary', {})
-            df_summary = pd.DataFrame([summary])
-            df_summary.to_excel(writer, sheet_name='Сводка', index=False)
+            writer.write_sheet('Сводка', [analysis.get('summary', {})])
             
-            # Анализ кампаний
+            # Анализ кампаний (стратегия и бюджет - отдельными столбцами)
             if analysis.get('campaign_analysis'):
-                df_campaigns = pd.DataFrame(analysis['campaign_analysis'])
-                df_campaigns.to_excel(writer, sheet_name='Анализ кампаний', index=False)
+                writer.write_sheet('Анализ кампаний', analysis['campaign_analysis'])
             
             # Анализ ключевых слов
             keyword_analysis = analysis.get('keyword_analysis', {})
             if keyword_analysis:
                 # Статусы
                 if keyword_analysis.get('by_status'):
-                    df_status = pd.DataFrame([
+                    writer.write_sheet('Статусы ключевых слов', (
                         {'Статус': k, 'Количество': v}
                         for k, v in keyword_analysis['by_status'].items()
-                    ])
-                    df_status.to_excel(writer, sheet_name='Статусы ключевых слов', index=False)
+                    ))
                 
                 # Топ ключевых слов
                 if keyword_analysis.get('top_keywords'):
-                    df_top = pd.DataFrame(keyword_analysis['top_keywords'])
-                    df_top.to_excel(writer, sheet_name='Топ ключевых слов', index=False)
+                    writer.write_sheet('Топ ключевых слов', keyword_analysis['top_keywords'])
+            
+            # Эффективность ключевых слов (analyze_keyword_performance)
+            performance = analysis.get('keyword_performance', {})
+            if performance.get('campaigns'):
+                writer.write_sheet('Ключевые слова по кампаниям', performance['campaigns'])
+            if performance.get('productivity_outliers'):
+                writer.write_sheet('Выбросы продуктивности', performance['productivity_outliers'])
             
             # Рекомендации
             recommendations = analysis.get('recommendations', [])
             if recommendations:
-                df_rec = pd.DataFrame({'Рекомендация': recommendations})
-                df_rec.to_excel(writer, sheet_name='Рекомендации', index=False)
+                writer.write_sheet('Рекомендации', ({'Рекомендация': r} for r in recommendations))
         
         logger.info(f"Отчет об анализе экспортирован: {filepath}")
         return filepath
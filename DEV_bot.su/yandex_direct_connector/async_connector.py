@@ -0,0 +1,563 @@
+"""
+Асинхронный коннектор для работы с API Яндекс.Директ (asyncio + aiohttp)
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import aiohttp
+
+from connector import BaseDirectConnector
+from reports import (
+    ReportError, TsvColumnarParser, build_report_headers, build_report_request,
+    default_date_range, parse_retry_in, raise_report_error, report_result
+)
+from fields import Fields
+from json_stream import STREAM_CHUNK_SIZE, StreamingItemsDecoder, loads as json_loads
+from limiter import ConcurrencyLimiter
+from metrics import ConnectorMetrics
+from retry import CircuitBreaker, DirectAPIError, RetryPolicy
+from units import UnitsGovernor, estimate_request_cost
+from config import (
+    REQUEST_TIMEOUT, MAX_RETRIES, MAX_CONNECTIONS, MAX_PARALLEL_REQUESTS, PAGE_LIMIT, REPORTS_MAX_WAIT
+)
+
+logger = logging.getLogger(__name__)
+
+# HTTP статусы, при которых запрос повторяется (как в urllib3.Retry синхронного коннектора)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AsyncYandexDirectConnector(BaseDirectConnector):
+    """Асинхронный коннектор к API Яндекс.Директ с общим пулом соединений"""
+    
+    def __init__(self, token: Optional[str] = None, client_login: Optional[str] = None,
+                 session: Optional[aiohttp.ClientSession] = None,
+                 pool_size: int = MAX_CONNECTIONS,
+                 governor: Optional[UnitsGovernor] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 limiter: Optional[ConcurrencyLimiter] = None,
+                 metrics: Optional[ConnectorMetrics] = None,
+                 api_url: Optional[str] = None):
+        """
+        Инициализация коннектора
+        
+        Args:
+            token: Токен доступа к API. Если не указан, берется из config.py
+            client_login: Логин клиента (для агентских аккаунтов)
+            session: Готовая aiohttp-сессия (чтобы несколько коннекторов делили один пул)
+            pool_size: Максимальное число одновременных соединений в пуле
+            governor: Регулятор баллов (по умолчанию - общий для процесса)
+            retry_policy: Политика повторов при временных ошибках API
+            circuit_breaker: Предохранитель (по умолчанию - общий для процесса)
+            limiter: Лимитер одновременных запросов по Client-Login (по умолчанию - общий для процесса)
+            metrics: Накопитель метрик запросов (по умолчанию - общий для процесса)
+            api_url: Адрес API (по умолчанию - API_URL из config.py)
+        """
+        super().__init__(token=token, client_login=client_login, governor=governor,
+                         retry_policy=retry_policy, circuit_breaker=circuit_breaker,
+                         limiter=limiter, metrics=metrics, api_url=api_url)
+        
+        self.pool_size = pool_size
+        self._session = session
+        self._owns_session = session is None
+        self._session_loop = None
+        
+        logger.info("Асинхронный коннектор Яндекс.Директ инициализирован")
+    
+    async def __aenter__(self) -> 'AsyncYandexDirectConnector':
+        await self._get_session()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Сессия с пулом соединений, привязанная к текущему event loop
+        
+        Собственная сессия пересоздается, если коннектор используется
+        в новом цикле событий (например, после очередного asyncio.run).
+        """
+        if not self._owns_session:
+            return self._session
+        
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+                # Как timeout у requests: ограничено подключение и пауза между
+                # кусками ответа, а не загрузка целиком (большие страницы и отчеты)
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=REQUEST_TIMEOUT,
+                                              sock_read=REQUEST_TIMEOUT)
+            )
+            self._session_loop = loop
+        
+        return self._session
+    
+    async def close(self) -> None:
+        """Закрытие собственной сессии и освобождение пула соединений"""
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None if self._owns_session else self._session
+        self._session_loop = None
+    
+    def _is_outage(self, error: BaseException) -> bool:
+        """Сетевая ошибка, означающая недоступность сервиса (таймаут, обрыв, HTTP 5xx)"""
+        if isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+            return True
+        return isinstance(error, aiohttp.ClientResponseError) and error.status >= 500
+    
+    async def _make_request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполнение запроса к API с повторами по кодам ошибок Директа
+        
+        Args:
+            method: Название метода API
+            params: Параметры запроса
+        
+        Returns:
+            Ответ от API
+        
+        Raises:
+            DirectAPIError: ошибка API, которую нельзя или уже не удалось повторить
+            CircuitOpenError: API недоступен, предохранитель разомкнут
+        """
+        attempt = 0
+        while True:
+            self.circuit_breaker.before_call()
+            error: Optional[BaseException] = None
+            try:
+                result = await self._send_request(method, params)
+            except DirectAPIError as e:
+                error, delay = e, self._retry_delay(method, e, attempt)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error, delay = e, self._retry_delay(method, e, attempt, transport=True)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Пробный запрос предохранителя освобождается при любом исходе
+                self._record_attempt(error)
+            
+            if error is None:
+                return result
+            if delay is None:
+                raise error
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    async def _send_request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Одна попытка запроса к API с резервированием баллов и HTTP-повторами"""
+        session = await self._get_session()
+        headers = self._build_headers()
+        url, body = self._build_request(method, params)
+        payload = self._encode_body(body)
+        cost = estimate_request_cost(method, params)
+        
+        queued = time.monotonic()
+        charged = await self.governor.acquire_async(self.client_login, cost)
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                logger.debug(f"Запрос к API: {method}")
+                async with self.limiter.slot_async(self.client_login):
+                    started = time.monotonic()
+                    async with session.post(url, headers=headers, data=payload) as response:
+                        retry_status = response.status in RETRY_STATUSES and attempt < MAX_RETRIES
+                        if not retry_status:
+                            response.raise_for_status()
+                            content = await response.read()
+                            self.metrics.observe_request(
+                                method, time.monotonic() - started, wait=started - queued,
+                                request_bytes=len(payload), response_bytes=len(content),
+                                units_header=response.headers.get('Units')
+                            )
+                            result = json_loads(content)
+                
+                if retry_status:
+                    self.metrics.record_error(method, f"HTTP {response.status}")
+                    self.metrics.record_retry(method)
+                    await asyncio.sleep(2 ** attempt)
+                    queued = time.monotonic()
+                    continue
+                
+                return self._handle_response(response.headers, result)
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Ошибка запроса: {e}")
+            self.metrics.record_error(method, self._transport_error_code(e))
+            raise
+        finally:
+            self.governor.release(charged, cost)
+    
+    async def _stream_request(self, method: str, params: Dict[str, Any],
+                              decoder: StreamingItemsDecoder) -> AsyncIterator[List[Dict]]:
+        """
+        Запрос к API с потоковым разбором ответа и повторами по кодам ошибок
+        (см. YandexDirectConnector._stream_request)
+        """
+        attempt = 0
+        while True:
+            self.circuit_breaker.before_call()
+            decoder.reset()
+            stream = self._send_stream(method, params, decoder)
+            first = error = None
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                pass
+            except DirectAPIError as e:
+                error, delay = e, self._retry_delay(method, e, attempt)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error, delay = e, self._retry_delay(method, e, attempt, transport=True)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self._record_attempt(error)
+            
+            if error is None:
+                if first is not None:
+                    yield first
+                    async for batch in stream:
+                        yield batch
+                return
+            
+            if delay is None:
+                raise error
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    async def _send_stream(self, method: str, params: Dict[str, Any],
+                           decoder: StreamingItemsDecoder) -> AsyncIterator[List[Dict]]:
+        """Одна попытка запроса с чтением ответа кусками по STREAM_CHUNK_SIZE"""
+        session = await self._get_session()
+        headers = self._build_headers()
+        url, body = self._build_request(method, params)
+        payload = self._encode_body(body)
+        cost = estimate_request_cost(method, params)
+        
+        queued = time.monotonic()
+        charged = await self.governor.acquire_async(self.client_login, cost)
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                logger.debug(f"Потоковый запрос к API: {method}")
+                async with self.limiter.slot_async(self.client_login):
+                    started = time.monotonic()
+                    async with session.post(url, headers=headers, data=payload) as response:
+                        if response.status not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+                            response.raise_for_status()
+                            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                                batch = decoder.feed(chunk)
+                                if batch:
+                                    yield batch
+                            self.metrics.observe_request(
+                                method, time.monotonic() - started, wait=started - queued,
+                                request_bytes=len(payload), response_bytes=decoder.bytes,
+                                units_header=response.headers.get('Units')
+                            )
+                            self._handle_response(response.headers, decoder.close())
+                            return
+                
+                self.metrics.record_error(method, f"HTTP {response.status}")
+                self.metrics.record_retry(method)
+                await asyncio.sleep(2 ** attempt)
+                queued = time.monotonic()
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Ошибка запроса: {e}")
+            self.metrics.record_error(method, self._transport_error_code(e))
+            raise
+        finally:
+            self.governor.release(charged, cost)
+    
+    async def _iter_pages(self, method: str, params: Dict[str, Any], result_key: str,
+                          page_limit: int = PAGE_LIMIT,
+                          keep: Optional[Iterable[str]] = None) -> AsyncIterator[List[Dict]]:
+        """
+        Постраничное получение объектов с автоматическим переходом по Page.Offset
+        
+        Args:
+            method: Название метода API (например, 'keywords.get')
+            params: Параметры запроса без Page
+            result_key: Ключ списка объектов в ответе ('Campaigns', 'Keywords', ...)
+            page_limit: Размер страницы
+            keep: Поля объектов, которые нужно оставить (None - все полученные)
+        
+        Yields:
+            Списки объектов по мере поступления (ответ разбирается потоково)
+        """
+        decoder = StreamingItemsDecoder(result_key, keep)
+        offset = 0
+        while True:
+            page_params = self._page_params(params, offset, page_limit)
+            async for batch in self._stream_request(method, page_params, decoder):
+                yield batch
+            logger.debug(
+                f"{method}: страница с offset={offset}, объектов: {decoder.items}, "
+                f"{decoder.bytes / 1024:.0f} КБ"
+            )
+            
+            limited_by = decoder.result.get('result', {}).get('LimitedBy')
+            if not limited_by:
+                break
+            offset = limited_by
+    
+    async def _iter_selection(self, method: str, params: Dict[str, Any], result_key: str,
+                              page_limit: int = PAGE_LIMIT,
+                              keep: Optional[Iterable[str]] = None) -> AsyncIterator[List[Dict]]:
+        """
+        Постраничное получение объектов с разбиением SelectionCriteria на части
+        
+        Части выполняются параллельно (не более MAX_PARALLEL_REQUESTS одновременно),
+        а их результаты отдаются строго в порядке частей.
+        """
+        parts = self._split_selection(method, params)
+        if len(parts) == 1:
+            async for page in self._iter_pages(method, params, result_key, page_limit, keep):
+                yield page
+            return
+        
+        async def fetch(part: Dict[str, Any]) -> List[Dict]:
+            return [item async for page in self._iter_pages(method, part, result_key, page_limit, keep)
+                    for item in page]
+        
+        window = deque()
+        try:
+            for part in parts:
+                window.append(asyncio.ensure_future(fetch(part)))
+                if len(window) >= MAX_PARALLEL_REQUESTS:
+                    yield await window.popleft()
+            while window:
+                yield await window.popleft()
+        finally:
+            for task in window:
+                task.cancel()
+    
+    async def iter_campaigns(self, campaign_ids: Optional[List[int]] = None,
+                             field_names: Fields = None,
+                             page_limit: int = PAGE_LIMIT,
+                             keep_fields: Optional[Iterable[str]] = None) -> AsyncIterator[Dict]:
+        """Потоковое получение кампаний по страницам"""
+        params = self._campaigns_params(campaign_ids, field_names)
+        async for page in self._iter_selection('campaigns.get', params, 'Campaigns', page_limit, keep_fields):
+            for item in page:
+                yield item
+    
+    async def iter_ad_groups(self, campaign_ids: Optional[List[int]] = None,
+                             ad_group_ids: Optional[List[int]] = None,
+                             field_names: Fields = None,
+                             page_limit: int = PAGE_LIMIT,
+                             keep_fields: Optional[Iterable[str]] = None) -> AsyncIterator[Dict]:
+        """Потоковое получение групп объявлений по страницам"""
+        params = self._ad_groups_params(campaign_ids, ad_group_ids, field_names)
+        async for page in self._iter_selection('adgroups.get', params, 'AdGroups', page_limit, keep_fields):
+            for item in page:
+                yield item
+    
+    async def iter_ads(self, campaign_ids: Optional[List[int]] = None,
+                       ad_group_ids: Optional[List[int]] = None,
+                       ad_ids: Optional[List[int]] = None,
+                       field_names: Fields = None,
+                       page_limit: int = PAGE_LIMIT,
+                       keep_fields: Optional[Iterable[str]] = None) -> AsyncIterator[Dict]:
+        """Потоковое получение объявлений по страницам"""
+        params = self._ads_params(campaign_ids, ad_group_ids, ad_ids, field_names)
+        async for page in self._iter_selection('ads.get', params, 'Ads', page_limit, keep_fields):
+            for item in page:
+                yield item
+    
+    async def iter_keywords(self, campaign_ids: Optional[List[int]] = None,
+                            ad_group_ids: Optional[List[int]] = None,
+                            keyword_ids: Optional[List[int]] = None,
+                            field_names: Fields = None,
+                            page_limit: int = PAGE_LIMIT,
+                            keep_fields: Optional[Iterable[str]] = None) -> AsyncIterator[Dict]:
+        """Потоковое получение ключевых слов по страницам"""
+        params = self._keywords_params(campaign_ids, ad_group_ids, keyword_ids, field_names)
+        async for page in self._iter_selection('keywords.get', params, 'Keywords', page_limit, keep_fields):
+            for item in page:
+                yield item
+    
+    async def get_campaigns(self, campaign_ids: Optional[List[int]] = None,
+                            field_names: Fields = None) -> List[Dict]:
+        """
+        Получение списка кампаний (все страницы)
+        
+        Args:
+            campaign_ids: Список ID кампаний (если None - все кампании)
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
+        
+        Returns:
+            Список кампаний
+        """
+        campaigns = [c async for c in self.iter_campaigns(campaign_ids, field_names)]
+        
+        logger.info(f"Получено кампаний: {len(campaigns)}")
+        return campaigns
+    
+    async def get_ad_groups(self, campaign_ids: Optional[List[int]] = None,
+                            ad_group_ids: Optional[List[int]] = None,
+                            field_names: Fields = None) -> List[Dict]:
+        """
+        Получение списка групп объявлений (все страницы)
+        
+        Args:
+            campaign_ids: Список ID кампаний
+            ad_group_ids: Список ID групп объявлений
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
+        
+        Returns:
+            Список групп объявлений
+        """
+        ad_groups = [ag async for ag in self.iter_ad_groups(campaign_ids, ad_group_ids, field_names)]
+        
+        logger.info(f"Получено групп объявлений: {len(ad_groups)}")
+        return ad_groups
+    
+    async def get_ads(self, campaign_ids: Optional[List[int]] = None,
+                      ad_group_ids: Optional[List[int]] = None,
+                      ad_ids: Optional[List[int]] = None,
+                      field_names: Fields = None) -> List[Dict]:
+        """
+        Получение списка объявлений (все страницы)
+        
+        Args:
+            campaign_ids: Список ID кампаний
+            ad_group_ids: Список ID групп объявлений
+            ad_ids: Список ID объявлений
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
+        
+        Returns:
+            Список объявлений
+        """
+        ads = [ad async for ad in self.iter_ads(campaign_ids, ad_group_ids, ad_ids, field_names)]
+        
+        logger.info(f"Получено объявлений: {len(ads)}")
+        return ads
+    
+    async def get_keywords(self, campaign_ids: Optional[List[int]] = None,
+                           ad_group_ids: Optional[List[int]] = None,
+                           keyword_ids: Optional[List[int]] = None,
+                           field_names: Fields = None) -> List[Dict]:
+        """
+        Получение списка ключевых слов (все страницы)
+        
+        Args:
+            campaign_ids: Список ID кампаний
+            ad_group_ids: Список ID групп объявлений
+            keyword_ids: Список ID ключевых слов
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
+        
+        Returns:
+            Список ключевых слов
+        """
+        keywords = [kw async for kw in self.iter_keywords(campaign_ids, ad_group_ids, keyword_ids, field_names)]
+        
+        logger.info(f"Получено ключевых слов: {len(keywords)}")
+        return keywords
+    
+    async def get_statistics(self, report_type: str = 'CAMPAIGN_PERFORMANCE_REPORT',
+                             date_from: Optional[str] = None,
+                             date_to: Optional[str] = None,
+                             campaign_ids: Optional[List[int]] = None,
+                             field_names: Optional[List[str]] = None,
+                             max_wait: float = REPORTS_MAX_WAIT,
+                             name_suffix: Optional[str] = None) -> Dict:
+        """
+        Получение статистики через Reports API (офлайн-режим)
+        
+        Args:
+            report_type: Тип отчета
+            date_from: Дата начала (формат YYYY-MM-DD, по умолчанию - 7 дней назад)
+            date_to: Дата окончания (формат YYYY-MM-DD, по умолчанию - сегодня)
+            campaign_ids: Список ID кампаний
+            field_names: Поля отчета
+            max_wait: Максимальное время ожидания готовности отчета, сек
+            name_suffix: Добавка к имени отчета (см. build_report_request)
+        
+        Returns:
+            Статистика в колоночном виде (см. YandexDirectConnector.get_statistics)
+        """
+        session = await self._get_session()
+        date_from, date_to = default_date_range(date_from, date_to)
+        body = build_report_request(report_type, date_from, date_to, field_names, campaign_ids, name_suffix)
+        headers = build_report_headers(self._build_headers())
+        started = time.monotonic()
+        attempt = 0
+        
+        while True:
+            self.circuit_breaker.before_call()
+            error: Optional[BaseException] = None
+            try:
+                async with self.limiter.slot_async(self.client_login):
+                    requested = time.monotonic()
+                    async with session.post(self._service_url('reports'), headers=headers, json=body) as response:
+                        try:
+                            if response.status == 200:
+                                parser = TsvColumnarParser()
+                                async for line in response.content:
+                                    parser.feed_line(line)
+                                logger.info(f"Отчет {report_type} получен: {parser.rows} строк")
+                                return report_result(report_type, date_from, date_to, parser)
+                            
+                            if response.status in (201, 202):
+                                retry_in = parse_retry_in(response.headers.get('retryIn'))
+                            elif response.status >= 500:
+                                response.raise_for_status()
+                            else:
+                                raise_report_error(response.status, await response.text())
+                        finally:
+                            self.metrics.observe_request(
+                                'reports', time.monotonic() - requested,
+                                units_header=response.headers.get('Units')
+                            )
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+                    aiohttp.ClientResponseError, asyncio.TimeoutError) as e:
+                # Обрыв, пауза в выгрузке дольше REQUEST_TIMEOUT или HTTP 5xx - повтор запроса
+                logger.error(f"Ошибка запроса отчета: {e}")
+                self.metrics.record_error('reports', self._transport_error_code(e))
+                error, delay = e, self._retry_delay('reports', e, attempt, transport=True)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Пробный запрос предохранителя освобождается при любом исходе
+                self._record_attempt(error)
+            
+            if error is not None:
+                if delay is None:
+                    raise error
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            attempt = 0
+            
+            if time.monotonic() - started + retry_in > max_wait:
+                raise ReportError(f"Отчет {report_type} не сформирован за {max_wait:.0f} с")
+            
+            logger.info(f"Отчет {report_type} формируется, повтор через {retry_in:.0f} с")
+            await asyncio.sleep(retry_in)
+    
+    async def get_client_info(self) -> Dict:
+        """
+        Получение информации о клиенте
+        
+        Returns:
+            Информация о клиенте
+        """
+        result = await self._make_request('clients.get', self._client_info_params())
+        clients = result.get('Clients', [])
+        
+        if clients:
+            logger.info(f"Информация о клиенте получена: {clients[0].get('Login', 'Unknown')}")
+            return clients[0]
+        
+        return {}
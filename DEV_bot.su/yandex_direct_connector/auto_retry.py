@@ -12,6 +12,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from connector import YandexDirectConnector
 from create_campaign import CampaignCreator
+from retry import CircuitOpenError, DirectAPIError
 
 def check_and_create(max_attempts=12, interval=300):
     """
@@ -94,9 +95,9 @@ def check_and_create(max_attempts=12, interval=300):
                 return True
             
         except Exception as e:
-            error_msg = str(e)
-            if '1000' in error_msg or 'Сервер временно недоступен' in error_msg:
-                print(f"✗ API все еще недоступен (ошибка 1000)")
+            # Короткие сбои уже повторены коннектором; здесь ждем длительную недоступность
+            if isinstance(e, CircuitOpenError) or (isinstance(e, DirectAPIError) and e.is_service_down):
+                print(f"✗ API все еще недоступен: {e}")
                 if attempt < max_attempts:
                     wait_time = interval
                     print(f"⏳ Ожидание {wait_time//60} минут до следующей попытки...")
@@ -0,0 +1,70 @@
+"""
+Замер скорости StrategyAnalyzer на синтетическом аккаунте
+
+Данные строит FakeAccount (fake_server.py) без запуска сервера; по умолчанию
+это 1 000 000 ключевых слов (200 кампаний x 500 групп x 10 ключевых слов).
+Отдельно замеряется analyze_keyword_performance. Эталонный расчет 'python'
+квадратичен по объему, поэтому выполняется только с --compare: тогда
+результаты обоих способов сравниваются между собой.
+"""
+import argparse
+import time
+from typing import Any, Dict
+
+from analyzer import ANALYZER_ENGINES, StrategyAnalyzer
+from fake_server import FakeAccount
+
+
+def run(data: Dict[str, Any], engine: str) -> Dict[str, Any]:
+    """
+    Анализ данных выбранным способом
+    
+    Returns:
+        Словарь {'elapsed': секунды, 'analysis': результат анализа}
+    """
+    analyzer = StrategyAnalyzer(engine=engine)
+    started = time.monotonic()
+    analysis = analyzer.analyze_campaigns(data)
+    return {'elapsed': round(time.monotonic() - started, 3), 'analysis': analysis}
+
+
+def main():
+    """Запуск замера из командной строки"""
+    parser = argparse.ArgumentParser(description='Замер скорости анализа стратегии')
+    parser.add_argument('--campaigns', type=int, default=200, help='Число кампаний')
+    parser.add_argument('--groups', type=int, default=500, help='Групп в кампании')
+    parser.add_argument('--ads', type=int, default=2, help='Объявлений в группе')
+    parser.add_argument('--keywords', type=int, default=10, help='Ключевых слов в группе')
+    parser.add_argument('--engine', choices=ANALYZER_ENGINES, default='columnar')
+    parser.add_argument('--compare', action='store_true',
+                        help="Выполнить также эталонный расчет 'python' и сравнить результаты")
+    args = parser.parse_args()
+    
+    account = FakeAccount(args.campaigns, args.groups, args.ads, args.keywords)
+    print(f"Объектов: {account.sizes}")
+    
+    started = time.monotonic()
+    data = account.to_data()
+    print(f"Данные построены за {time.monotonic() - started:.1f} с")
+    
+    result = run(data, args.engine)
+    print(f"{args.engine}: {result['elapsed']} с")
+    
+    started = time.monotonic()
+    performance = StrategyAnalyzer().analyze_keyword_performance(data)
+    print(f"analyze_keyword_performance: {time.monotonic() - started:.3f} с "
+          f"(кампаний: {len(performance['campaigns'])}, "
+          f"выбросов продуктивности: {len(performance['productivity_outliers'])})")
+    
+    if args.compare:
+        other = 'python' if args.engine != 'python' else 'columnar'
+        reference = run(data, other)
+        print(f"{other}: {reference['elapsed']} с")
+        
+        fields = ('summary', 'campaign_analysis', 'keyword_analysis', 'recommendations')
+        mismatched = [field for field in fields if result['analysis'][field] != reference['analysis'][field]]
+        print("Результаты совпадают" if not mismatched else f"Результаты различаются: {', '.join(mismatched)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+"""
+Пересчет ставок ключевых слов по правилам и пакетная отправка в API
+
+BidManager читает ключевые слова аккаунта (или выбранных кампаний), считает
+новые ставки на поиске по набору правил и отправляет только изменившиеся
+ставки через keywordbids.set пакетами по BULK_LIMITS (10 000 ставок в запросе).
+Правила считаются векторно по столбцам KeywordArrays, поэтому пересчет сотен
+тысяч ключевых слов занимает доли секунды, а основное время - чтение из API.
+
+Правила применяются по порядку: ставку ключевого слова задает первое
+подходящее правило, ключевые слова без подходящего правила не меняются.
+Новая ставка ограничивается BID_MAX_CHANGE от текущей, границами
+BID_MIN..BID_MAX и округляется до BID_STEP.
+
+Изменение ставок стоит 25 баллов за запрос независимо от числа ставок,
+поэтому пересчет всего аккаунта укладывается в несколько запросов. Перед
+отправкой стоимость сверяется с остатком баллов: если баллы не восстановятся
+за время ожидания регулятора, ни одна ставка не отправляется, и аккаунт не
+остается пересчитанным наполовину.
+"""
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from config import BID_MAX, BID_MAX_CHANGE, BID_MIN, BID_STEP
+from connector import YandexDirectConnector
+from keyword_analytics import MICROS, KeywordArrays
+from planner import JobPlan
+from units import UnitsExhaustedError
+
+logger = logging.getLogger(__name__)
+
+# Поля ключевых слов, которые читают правила
+BID_KEYWORD_FIELDS = {
+    'FieldNames': ['Id', 'AdGroupId', 'CampaignId', 'Keyword', 'Bid', 'Productivity', 'StatisticsSearch'],
+}
+
+# Ставки торгов по объему трафика: {объем трафика: ставки в валюте (NaN - нет данных)}
+AuctionBids = Dict[int, np.ndarray]
+
+
+class BidRule:
+    """
+    Правило расчета ставки на поиске
+    
+    Подклассы переопределяют compute; campaign_ids ограничивает правило кампаниями.
+    """
+    
+    # Нужны ли правилу ставки торгов (keywordbids.get)
+    needs_auction = False
+    
+    def __init__(self, name: str, campaign_ids: Optional[Iterable[int]] = None):
+        """
+        Args:
+            name: Название правила (в результатах по ключевым словам)
+            campaign_ids: Кампании, к которым применяется правило (None - все)
+        """
+        self.name = name
+        self.campaign_ids = None if campaign_ids is None else np.asarray(list(campaign_ids), dtype=np.int64)
+    
+    def compute(self, arrays: KeywordArrays, auction: AuctionBids) -> np.ndarray:
+        """
+        Новые ставки в валюте по ключевым словам
+        
+        Returns:
+            Массив длины len(arrays); NaN - правило к ключевому слову не применяется
+        """
+        raise NotImplementedError
+    
+    def apply(self, arrays: KeywordArrays, auction: AuctionBids) -> np.ndarray:
+        """Ставки правила с учетом ограничения по кампаниям"""
+        bids = np.asarray(self.compute(arrays, auction), dtype=np.float64)
+        if self.campaign_ids is not None:
+            bids = np.where(np.isin(arrays.campaign_ids, self.campaign_ids), bids, np.nan)
+        return bids
+
+
+class TargetCpcRule(BidRule):
+    """
+    Целевая цена клика
+    
+    Если у ключевого слова достаточно кликов в отчете CRITERIA_PERFORMANCE_REPORT
+    (см. BidManager.reprice), ставка меняется пропорционально отношению
+    целевой цены клика к фактической; иначе ставка равна целевой цене клика.
+    """
+    
+    def __init__(self, target_cpc: float, min_clicks: int = 10,
+                 campaign_ids: Optional[Iterable[int]] = None, name: str = 'target_cpc'):
+        """
+        Args:
+            target_cpc: Целевая цена клика в валюте аккаунта
+            min_clicks: Кликов в отчете, достаточных для расчета фактической цены клика
+            campaign_ids: Кампании, к которым применяется правило (None - все)
+            name: Название правила
+        """
+        super().__init__(name, campaign_ids)
+        self.target_cpc = target_cpc
+        self.min_clicks = min_clicks
+    
+    def compute(self, arrays: KeywordArrays, auction: AuctionBids) -> np.ndarray:
+        bids = np.full(len(arrays), float(self.target_cpc))
+        if arrays.cost is None:
+            return bids
+        
+        known = (arrays.report_clicks >= max(1, self.min_clicks)) & (arrays.cost > 0) & (arrays.bids > 0)
+        cpc = arrays.cost[known] / arrays.report_clicks[known]
+        bids[known] = arrays.bids[known] * self.target_cpc / cpc
+        return bids
+
+
+class PositionRule(BidRule):
+    """
+    Ставка для объема трафика (позиции) по данным торгов
+    
+    Берется ставка торгов для наименьшего объема трафика не ниже заданного
+    (100 - первое спецразмещение, 75..85 - спецразмещение, 5..15 - гарантия)
+    с надбавкой markup.
+    """
+    
+    needs_auction = True
+    
+    def __init__(self, traffic_volume: int = 100, markup: float = 0.0,
+                 campaign_ids: Optional[Iterable[int]] = None, name: str = 'position'):
+        """
+        Args:
+            traffic_volume: Целевой объем трафика (5..100)
+            markup: Надбавка к ставке торгов (0.1 - плюс 10%)
+            campaign_ids: Кампании, к которым применяется правило (None - все)
+            name: Название правила
+        """
+        super().__init__(name, campaign_ids)
+        self.traffic_volume = traffic_volume
+        self.markup = markup
+    
+    def compute(self, arrays: KeywordArrays, auction: AuctionBids) -> np.ndarray:
+        bids = np.full(len(arrays), np.nan)
+        for volume in sorted(v for v in auction if v >= self.traffic_volume):
+            missing = np.isnan(bids)
+            bids[missing] = auction[volume][missing]
+        return bids * (1 + self.markup)
+
+
+class ProductivityRule(BidRule):
+    """
+    Повышение ставки продуктивным ключевым словам и снижение - непродуктивным
+    
+    Ключевые слова с продуктивностью между low и high правилом не затрагиваются.
+    """
+    
+    def __init__(self, low: float = 5.0, high: float = 8.0, step: float = 0.1,
+                 campaign_ids: Optional[Iterable[int]] = None, name: str = 'productivity'):
+        """
+        Args:
+            low: Ниже этой продуктивности ставка снижается
+            high: Начиная с этой продуктивности ставка повышается
+            step: Изменение ставки (0.1 - на 10%)
+            campaign_ids: Кампании, к которым применяется правило (None - все)
+            name: Название правила
+        """
+        super().__init__(name, campaign_ids)
+        self.low = low
+        self.high = high
+        self.step = step
+    
+    def compute(self, arrays: KeywordArrays, auction: AuctionBids) -> np.ndarray:
+        bids = np.full(len(arrays), np.nan)
+        productivity = arrays.productivity
+        with np.errstate(invalid='ignore'):
+            high = (productivity >= self.high) & (arrays.bids > 0)
+            low = (productivity < self.low) & (arrays.bids > 0)
+        bids[high] = arrays.bids[high] * (1 + self.step)
+        bids[low] = arrays.bids[low] * (1 - self.step)
+        return bids
+
+
+class BidManager:
+    """
+    Пересчет ставок ключевых слов аккаунта по правилам
+    
+    Пример:
+        manager = BidManager(connector)
+        result = manager.reprice([
+            PositionRule(traffic_volume=75, campaign_ids=[123]),
+            TargetCpcRule(target_cpc=25),
+        ], report=criteria_report)
+        result['results']  # по каждому ключевому слову: старая и новая ставка, статус, ошибки
+    """
+    
+    def __init__(self, connector: YandexDirectConnector, min_bid: float = BID_MIN,
+                 max_bid: float = BID_MAX, bid_step: float = BID_STEP,
+                 max_change: Optional[float] = BID_MAX_CHANGE):
+        """
+        Args:
+            connector: Коннектор (ставки меняются для его client_login)
+            min_bid: Минимальная ставка в валюте аккаунта
+            max_bid: Максимальная ставка в валюте аккаунта
+            bid_step: Шаг ставки в валюте аккаунта
+            max_change: Максимальное изменение за пересчет, доля текущей ставки (None - без ограничения)
+        """
+        self.connector = connector
+        self.min_bid = min_bid
+        self.max_bid = max_bid
+        self.bid_step = bid_step
+        self.max_change = max_change
+    
+    def load_keywords(self, campaign_ids: Optional[List[int]] = None) -> KeywordArrays:
+        """Ключевые слова кампаний (None - всего аккаунта) в виде столбцов"""
+        keywords = list(self.connector.iter_keywords(campaign_ids, field_names=BID_KEYWORD_FIELDS))
+        logger.info(f"Ставки: получено ключевых слов {len(keywords)}")
+        return KeywordArrays(keywords)
+    
+    def load_auction(self, arrays: KeywordArrays, campaign_ids: Optional[List[int]] = None) -> AuctionBids:
+        """
+        Ставки торгов (keywordbids.get) по объемам трафика для ключевых слов arrays
+        
+        Returns:
+            {объем трафика: ставки в валюте в порядке arrays (NaN - нет данных)}
+        """
+        position = dict(zip(arrays.ids.tolist(), range(len(arrays))))
+        auction: AuctionBids = {}
+        for item in self.connector.iter_keyword_bids(campaign_ids, search_fields=['AuctionBids']):
+            index = position.get(item.get('KeywordId'))
+            if index is None:
+                continue
+            auction_bids = ((item.get('Search') or {}).get('AuctionBids') or {}).get('AuctionBidItems') or []
+            for auction_bid in auction_bids:
+                volume = auction_bid.get('TrafficVolume')
+                if volume is None or auction_bid.get('Bid') is None:
+                    continue
+                if volume not in auction:
+                    auction[volume] = np.full(len(arrays), np.nan)
+                auction[volume][index] = auction_bid['Bid'] / MICROS
+        return auction
+    
+    def compute(self, arrays: KeywordArrays, rules: Sequence[BidRule],
+                auction: Optional[AuctionBids] = None) -> Dict[str, np.ndarray]:
+        """
+        Новые ставки по правилам с ограничениями по изменению, границам и шагу
+        
+        Returns:
+            {'bids': текущие ставки в микроединицах, 'new_bids': новые ставки
+            в микроединицах, 'rules': номер примененного правила (-1 - ни одно не подошло)}
+        """
+        auction = auction or {}
+        new = np.full(len(arrays), np.nan)
+        applied = np.full(len(arrays), -1, dtype=np.int64)
+        for number, rule in enumerate(rules):
+            bids = rule.apply(arrays, auction)
+            take = np.isnan(new) & ~np.isnan(bids)
+            new[take] = bids[take]
+            applied[take] = number
+        
+        current = arrays.bids
+        if self.max_change is not None:
+            limited = (applied >= 0) & (current > 0)
+            new[limited] = np.clip(new[limited], current[limited] * (1 - self.max_change),
+                                   current[limited] * (1 + self.max_change))
+        
+        step = round(self.bid_step * MICROS)
+        low = -(-round(self.min_bid * MICROS) // step) * step
+        high = round(self.max_bid * MICROS) // step * step
+        new_micros = np.rint(np.nan_to_num(new) * MICROS / step).astype(np.int64) * step
+        current_micros = np.rint(current * MICROS).astype(np.int64)
+        return {
+            'bids': current_micros,
+            'new_bids': np.where(applied >= 0, new_micros.clip(low, high), current_micros),
+            'rules': applied,
+        }
+    
+    @staticmethod
+    def plan(keywords: int, changes: Optional[int] = None, auction: bool = False) -> JobPlan:
+        """
+        Оценка стоимости пересчета в баллах
+        
+        Args:
+            keywords: Число ключевых слов
+            changes: Число изменяемых ставок (None - все ключевые слова)
+            auction: Читаются ли ставки торгов (правила PositionRule)
+        """
+        plan = JobPlan('Пересчет ставок')
+        plan.add_pages('keywords', 'keywords.get', keywords)
+        if auction:
+            plan.add_pages('auction', 'keywordbids.get', keywords)
+        plan.add_bulk('bids', 'keywordbids.set', keywords if changes is None else changes)
+        return plan
+    
+    def _check_budget(self, changes: int) -> Dict[str, Any]:
+        """
+        Хватит ли баллов на отправку ставок
+        
+        Raises:
+            UnitsExhaustedError: если баллы не восстановятся за время ожидания регулятора
+        """
+        plan = JobPlan('Изменение ставок')
+        plan.add_bulk('bids', 'keywordbids.set', changes)
+        budget = self.connector.get_units_budget()
+        remaining = budget['remaining']
+        if remaining is not None:
+            # Неприкосновенный запас регулятора и уже выполняющиеся запросы
+            remaining -= self.connector.governor.reserve + budget['pending']
+        check = plan.check(remaining, budget['daily_limit'])
+        wait = check['wait_seconds']
+        if wait is None or wait > self.connector.governor.max_wait:
+            raise UnitsExhaustedError(
+                f"Недостаточно баллов для изменения ставок: требуется ~{check['units']}, "
+                f"доступно {check['remaining']} (с учетом запаса); ставки не отправлены"
+            )
+        if wait:
+            logger.info(f"Ставки: баллов пока не хватает, отправка начнется через ~{wait:.0f} с")
+        return check
+    
+    def reprice(self, rules: Sequence[BidRule], campaign_ids: Optional[List[int]] = None,
+                report: Optional[Dict[str, Any]] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Пересчет и установка ставок на поиске
+        
+        Args:
+            rules: Правила по приоритету (ставку задает первое подходящее)
+            campaign_ids: Кампании (None - весь аккаунт)
+            report: Отчет CRITERIA_PERFORMANCE_REPORT с колонками CriterionId, Clicks, Cost
+                (фактическая цена клика для TargetCpcRule)
+            dry_run: Только рассчитать ставки, не отправляя их
+        
+        Returns:
+            Сводка: total, changed, unchanged, no_rule, succeeded, failed, by_rule,
+            plan (оценка в баллах), budget и results - по каждому ключевому слову
+            KeywordId, CampaignId, Keyword, rule, bid, new_bid (в валюте), status
+            ('updated', 'failed', 'planned', 'unchanged', 'no_rule') и errors
+        """
+        arrays = self.load_keywords(campaign_ids)
+        if report is not None:
+            arrays.attach_report(report)
+        use_auction = any(rule.needs_auction for rule in rules)
+        auction = self.load_auction(arrays, campaign_ids) if use_auction else {}
+        
+        computed = self.compute(arrays, rules, auction)
+        changed = np.flatnonzero((computed['rules'] >= 0) & (computed['new_bids'] != computed['bids']))
+        items = [
+            {'KeywordId': keyword_id, 'SearchBid': bid}
+            for keyword_id, bid in zip(arrays.ids[changed].tolist(), computed['new_bids'][changed].tolist())
+        ]
+        
+        summary = {
+            'total': len(arrays),
+            'changed': len(items),
+            'unchanged': int(np.count_nonzero(computed['rules'] >= 0)) - len(items),
+            'no_rule': int(np.count_nonzero(computed['rules'] < 0)),
+            'succeeded': 0,
+            'failed': 0,
+            'dry_run': dry_run,
+            'by_rule': {},
+            'plan': self.plan(len(arrays), len(items), use_auction).to_dict(),
+            'budget': None,
+            'results': [],
+        }
+        
+        # Статусы и ошибки изменившихся ставок
+        statuses: Dict[int, Any] = {}
+        if items and not dry_run:
+            summary['budget'] = self._check_budget(len(items))
+            result = self.connector.bulk_set_bids(items, service='keywordbids')
+            for index, item_result in zip(changed.tolist(), result['results']):
+                statuses[index] = ('failed', item_result['Errors']) if item_result['Errors'] else ('updated', [])
+        elif items:
+            statuses = dict.fromkeys(changed.tolist(), ('planned', []))
+        
+        by_rule: Counter = Counter()
+        names = [rule.name for rule in rules]
+        columns = zip(arrays.ids.tolist(), arrays.campaign_ids.tolist(), computed['rules'].tolist(),
+                      (computed['bids'] / MICROS).tolist(), (computed['new_bids'] / MICROS).tolist())
+        for index, (keyword_id, campaign_id, rule_number, bid, new_bid) in enumerate(columns):
+            if rule_number < 0:
+                status, errors = 'no_rule', []
+            else:
+                status, errors = statuses.get(index, ('unchanged', []))
+                by_rule[names[rule_number]] += 1
+            summary['results'].append({
+                'KeywordId': keyword_id,
+                'CampaignId': campaign_id,
+                'Keyword': arrays.keyword(index),
+                'rule': names[rule_number] if rule_number >= 0 else None,
+                'bid': bid,
+                'new_bid': new_bid,
+                'status': status,
+                'errors': errors,
+            })
+        
+        summary['by_rule'] = dict(by_rule)
+        summary['succeeded'] = sum(1 for status, _ in statuses.values() if status == 'updated')
+        summary['failed'] = sum(1 for status, _ in statuses.values() if status == 'failed')
+        logger.info(
+            f"Ставки: ключевых слов {summary['total']}, изменено {summary['changed']}"
+            f"{' (пробный расчет)' if dry_run else ''}, без изменений {summary['unchanged']}, "
+            f"без правила {summary['no_rule']}, с ошибками {summary['failed']}"
+        )
+        return summary
@@ -0,0 +1,142 @@
+"""
+Дерево кампаний: кампании, их группы, объявления и ключевые слова групп
+
+Связи строятся за один проход по спискам объектов в словари
+{родитель: [дочерние объекты]}, поэтому выборка детей группы не требует
+перебора всех объявлений и ключевых слов. Объявления и ключевые слова могут
+загружаться лениво - при первом обращении к группе запрашиваются дети всех
+групп ее кампании одним набором запросов.
+"""
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Загрузчик детей групп: ID групп -> (объявления, ключевые слова)
+ChildrenLoader = Callable[[List[int]], Tuple[List[Dict], List[Dict]]]
+
+
+def _group_by(items: Iterable[Dict], key: str) -> Dict[int, List[Dict]]:
+    """Индекс {значение key: [объекты]} за один проход с сохранением порядка"""
+    index: Dict[int, List[Dict]] = {}
+    for item in items:
+        index.setdefault(item.get(key), []).append(item)
+    return index
+
+
+class CampaignTree:
+    """Индексированная структура кампаний с ленивой загрузкой объявлений и ключевых слов"""
+    
+    def __init__(self, campaigns: Iterable[Dict], ad_groups: Iterable[Dict],
+                 ads: Optional[Iterable[Dict]] = None,
+                 keywords: Optional[Iterable[Dict]] = None,
+                 loader: Optional[ChildrenLoader] = None):
+        """
+        Args:
+            campaigns: Кампании
+            ad_groups: Группы объявлений этих кампаний
+            ads: Объявления групп (None - загружать через loader при обращении)
+            keywords: Ключевые слова групп (None - загружать через loader при обращении)
+            loader: Функция загрузки объявлений и ключевых слов по ID групп
+        """
+        self.campaigns: Dict[int, Dict] = {campaign['Id']: campaign for campaign in campaigns}
+        self.ad_groups: Dict[int, Dict] = {group['Id']: group for group in ad_groups}
+        self._groups_by_campaign = _group_by(self.ad_groups.values(), 'CampaignId')
+        self._ads = _group_by(ads or [], 'AdGroupId')
+        self._keywords = _group_by(keywords or [], 'AdGroupId')
+        self._loader = loader
+        self._lock = threading.Lock()
+        
+        # Кампании, дети групп которых уже известны
+        eager = ads is not None and keywords is not None
+        self._loaded = set(self.campaigns) if eager or loader is None else set()
+    
+    @classmethod
+    def from_data(cls, data: Dict) -> 'CampaignTree':
+        """Дерево по данным collect_all_data или сохраненному снимку"""
+        return cls(data.get('campaigns', []), data.get('ad_groups', []),
+                   data.get('ads', []), data.get('keywords', []))
+    
+    def __len__(self) -> int:
+        return len(self.campaigns)
+    
+    def __contains__(self, campaign_id: int) -> bool:
+        return campaign_id in self.campaigns
+    
+    @property
+    def campaign_ids(self) -> List[int]:
+        """ID кампаний в исходном порядке"""
+        return list(self.campaigns)
+    
+    def get_campaign(self, campaign_id: int) -> Optional[Dict]:
+        """Кампания по ID"""
+        return self.campaigns.get(campaign_id)
+    
+    def get_ad_groups(self, campaign_id: int) -> List[Dict]:
+        """Группы кампании"""
+        return self._groups_by_campaign.get(campaign_id, [])
+    
+    def get_ads(self, ad_group_id: int) -> List[Dict]:
+        """Объявления группы (загружаются при первом обращении к кампании группы)"""
+        self._ensure_loaded(ad_group_id)
+        return self._ads.get(ad_group_id, [])
+    
+    def get_keywords(self, ad_group_id: int) -> List[Dict]:
+        """Ключевые слова группы (загружаются при первом обращении к кампании группы)"""
+        self._ensure_loaded(ad_group_id)
+        return self._keywords.get(ad_group_id, [])
+    
+    def is_loaded(self, campaign_id: int) -> bool:
+        """Загружены ли объявления и ключевые слова кампании"""
+        return campaign_id in self._loaded
+    
+    def _ensure_loaded(self, ad_group_id: int) -> None:
+        group = self.ad_groups.get(ad_group_id)
+        if group is None or group.get('CampaignId') in self._loaded:
+            return
+        self.load([group.get('CampaignId')])
+    
+    def load(self, campaign_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Загрузка объявлений и ключевых слов кампаний одним набором запросов
+        
+        Args:
+            campaign_ids: Кампании (None - все еще не загруженные)
+        """
+        with self._lock:
+            selected = [c for c in (self.campaigns if campaign_ids is None else campaign_ids)
+                        if c not in self._loaded]
+            group_ids = [group['Id'] for c in selected for group in self.get_ad_groups(c)]
+            if group_ids:
+                ads, keywords = self._loader(group_ids)
+                for index, items in ((self._ads, ads), (self._keywords, keywords)):
+                    for group_id, group_items in _group_by(items, 'AdGroupId').items():
+                        index.setdefault(group_id, []).extend(group_items)
+            self._loaded.update(selected)
+    
+    def structure(self, campaign_id: int) -> Dict:
+        """
+        Вложенная структура кампании
+        
+        Returns:
+            {'campaign': ..., 'ad_groups': [{'ad_group', 'ads', 'keywords'}, ...]}
+            или пустой словарь, если кампании нет в дереве
+        """
+        campaign = self.campaigns.get(campaign_id)
+        if campaign is None:
+            return {}
+        
+        return {
+            'campaign': campaign,
+            'ad_groups': [
+                {
+                    'ad_group': group,
+                    'ads': self.get_ads(group['Id']),
+                    'keywords': self.get_keywords(group['Id'])
+                }
+                for group in self.get_ad_groups(campaign_id)
+            ]
+        }
+    
+    def iter_structures(self) -> Iterator[Dict]:
+        """Структуры всех кампаний по очереди (дети загружаются по мере обхода)"""
+        for campaign_id in self.campaigns:
+            yield self.structure(campaign_id)
@@ -28,7 +28,7 @@ def check_api_status():
     # 2. Проверка доступности сервера
     print("\n[2] Проверка доступности сервера...")
     try:
-        response = requests.get('https://api.direct.yandex.com', timeout=5)
+        response = requests.get(API_URL.split('/json/')[0], timeout=5)
         print(f"✓ Сервер доступен (статус: {response.status_code})")
     except Exception as e:
         print(f"✗ Сервер недоступен: {e}")
@@ -47,7 +47,7 @@ def check_api_status():
     }
     
     body = {
-        'method': 'campaigns.get',
+        'method': 'get',
         'params': {
             'SelectionCriteria': {},
             'FieldNames': ['Id', 'Name']
@@ -55,7 +55,7 @@ def check_api_status():
     }
     
     try:
-        response = requests.post(API_URL, headers=headers, json=body, timeout=10)
+        response = requests.post(f'{API_URL}/campaigns', headers=headers, json=body, timeout=10)
         print(f"  HTTP статус: {response.status_code}")
         
         if response.status_code == 200:
@@ -92,8 +92,8 @@ def check_api_status():
                     print("  • При необходимости обновите токен")
                 
                 elif error_code == 152:
-                    print("  Ошибка 152: 'Неверный токен'")
-                    print("  Решение: Обновите токен доступа")
+                    print("  Ошибка 152: 'Недостаточно баллов'")
+                    print("  Решение: Дождитесь восстановления баллов (коннектор повторяет такие запросы сам)")
                 
                 elif error_code == 53:
                     print("  Ошибка 53: 'Доступ запрещен'")
@@ -123,14 +123,14 @@ def check_api_status():
     print("  Пробую метод clients.get (более простой)...")
     
     body2 = {
-        'method': 'clients.get',
+        'method': 'get',
         'params': {
             'FieldNames': ['Login']
         }
     }
     
     try:
-        response = requests.post(API_URL, headers=headers, json=body2, timeout=10)
+        response = requests.post(f'{API_URL}/clients', headers=headers, json=body2, timeout=10)
         if response.status_code == 200:
             data = response.json()
             if 'error' in data:
@@ -22,8 +22,8 @@ if CONFIG_FILE.exists():
 if not YANDEX_DIRECT_TOKEN:
     YANDEX_DIRECT_TOKEN = os.getenv('YANDEX_DIRECT_TOKEN', '')
 
-# URL API Яндекс.Директ
-API_URL = 'https://api.direct.yandex.com/json/v5'
+# URL API Яндекс.Директ (YANDEX_DIRECT_API_URL - например, локальный fake_server.py)
+API_URL = os.getenv('YANDEX_DIRECT_API_URL', 'https://api.direct.yandex.com/json/v5')
 
 # Настройки по умолчанию
 DEFAULT_CLIENT_LOGIN = os.getenv('YANDEX_DIRECT_CLIENT_LOGIN', '')
@@ -33,11 +33,69 @@ DEFAULT_LANGUAGE = 'ru'  # ru, en, uk, tr
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 3
 
+# Максимальное число одновременных запросов от имени одного рекламодателя
+MAX_PARALLEL_REQUESTS = 5
+
+# Число клиентов агентства, данные которых собираются одновременно
+AGENCY_MAX_CLIENTS = 8
+
+# Размер пула HTTP-соединений сессии: ее разделяют коннекторы всех клиентов агентства
+HTTP_POOL_SIZE = AGENCY_MAX_CLIENTS * MAX_PARALLEL_REQUESTS
+
+# Максимальное число объектов на странице ответа (Page.Limit)
+PAGE_LIMIT = 10000
+
+# Учет баллов API: неприкосновенный запас, максимальное ожидание
+# восстановления баллов и шаг ожидания (сек)
+UNITS_RESERVE = 100
+UNITS_MAX_WAIT = 3600
+UNITS_POLL_INTERVAL = 30
+
+# Reports API: максимальное ожидание готовности офлайн-отчета и пауза
+# между опросами, если сервер не прислал retryIn (сек)
+REPORTS_MAX_WAIT = 1800
+REPORTS_DEFAULT_RETRY_IN = 10
+
+# Повторы запросов при временных ошибках API (52, 506, 1000, 152...):
+# число попыток, базовая и максимальная задержка (сек)
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 1
+RETRY_MAX_DELAY = 60
+
+# Предохранитель: после скольких отказов сервиса подряд перестать слать
+# запросы и через сколько секунд попробовать снова
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 300
+
+# Размер пула соединений асинхронного коннектора
+MAX_CONNECTIONS = 10
+
 # Папки для сохранения данных
 DATA_DIR = BASE_DIR / 'yandex_direct_connector' / 'data'
 REPORTS_DIR = BASE_DIR / 'yandex_direct_connector' / 'reports'
 LOGS_DIR = BASE_DIR / 'yandex_direct_connector' / 'logs'
 
+# Локальное хранилище объектов (SQLite)
+OBJECT_STORE_FILE = DATA_DIR / 'yandex_direct.sqlite3'
+
+# История снимков (snapshot_history.py): полный снимок раз в SNAPSHOT_BASE_EVERY
+# сохранений, между ними - только изменения относительно предыдущего
+SNAPSHOT_HISTORY_DIR = DATA_DIR / 'history'
+SNAPSHOT_BASE_EVERY = 30
+
+# Хранилище дневной статистики Reports API (stats_warehouse.py): статистика
+# последних STATS_MUTABLE_DAYS дней (включая сегодня) еще может уточняться
+# и перезапрашивается при каждой синхронизации
+STATS_WAREHOUSE_FILE = DATA_DIR / 'yandex_direct_stats.sqlite3'
+STATS_MUTABLE_DAYS = 3
+
+# Управление ставками (bid_manager.py): границы и шаг ставки на поиске в валюте
+# аккаунта, максимальное изменение ставки за один пересчет (доля текущей ставки)
+BID_MIN = 0.3
+BID_MAX = 3000
+BID_STEP = 0.1
+BID_MAX_CHANGE = 0.5
+
 # Создаем необходимые директории
 for directory in [DATA_DIR, REPORTS_DIR, LOGS_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
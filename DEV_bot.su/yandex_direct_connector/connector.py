@@ -1,10 +1,13 @@
 """
 Основной коннектор для работы с API Яндекс.Директ
 """
+import itertools
 import json
 import logging
 import time
-from typing import Dict, List, Optional, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -16,9 +19,19 @@ from config import (
     DEFAULT_LANGUAGE,
     REQUEST_TIMEOUT,
     MAX_RETRIES,
+    HTTP_POOL_SIZE,
+    PAGE_LIMIT,
+    MAX_PARALLEL_REQUESTS,
     LOG_FORMAT,
     LOG_FILE
 )
+from fields import Fields, resolve_fields
+from json_stream import STREAM_CHUNK_SIZE, StreamingItemsDecoder, loads as json_loads
+from limiter import ConcurrencyLimiter, get_shared_limiter
+from metrics import ConnectorMetrics, get_shared_metrics
+from reports import ReportsClient
+from retry import CircuitBreaker, DirectAPIError, RetryPolicy, get_shared_circuit_breaker
+from units import NOT_ENOUGH_UNITS_ERROR, UnitsGovernor, estimate_request_cost, get_shared_governor
 
 # Настройка логирования
 logging.basicConfig(
@@ -31,24 +44,384 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Максимальное число объектов в одном запросе на изменение
+BULK_LIMITS = {
+    'keywords.add': 1000,
+    'keywords.update': 10000,
+    'ads.add': 1000,
+    'ads.update': 1000,
+    'adgroups.add': 1000,
+    'adgroups.update': 1000,
+    'bids.set': 10000,
+    'keywordbids.set': 10000,
+}
 
-class YandexDirectConnector:
-    """Класс для работы с API Яндекс.Директ"""
+# Ключ списка объектов в параметрах запроса по сервисам
+BULK_ITEMS_KEYS = {
+    'keywords': 'Keywords',
+    'ads': 'Ads',
+    'adgroups': 'AdGroups',
+    'bids': 'Bids',
+    'keywordbids': 'KeywordBids',
+}
+
+# Ключ результатов в ответе по операциям
+BULK_RESULTS_KEYS = {
+    'add': 'AddResults',
+    'update': 'UpdateResults',
+    'set': 'SetResults',
+}
+
+# Максимальное число идентификаторов в одном SelectionCriteria по методам API
+SELECTION_LIMITS = {
+    'campaigns.get': {'Ids': 1000},
+    'adgroups.get': {'Ids': 10000, 'CampaignIds': 10},
+    'ads.get': {'Ids': 10000, 'AdGroupIds': 1000, 'CampaignIds': 10},
+    'keywords.get': {'Ids': 10000, 'AdGroupIds': 1000, 'CampaignIds': 10},
+    'keywordbids.get': {'KeywordIds': 10000, 'AdGroupIds': 1000, 'CampaignIds': 10},
+}
+
+
+class BaseDirectConnector:
+    """Общая часть синхронного и асинхронного коннекторов: заголовки, тела запросов, разбор ответов"""
     
-    def __init__(self, token: Optional[str] = None, client_login: Optional[str] = None):
+    def __init__(self, token: Optional[str] = None, client_login: Optional[str] = None,
+                 governor: Optional[UnitsGovernor] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 limiter: Optional[ConcurrencyLimiter] = None,
+                 metrics: Optional[ConnectorMetrics] = None,
+                 api_url: Optional[str] = None):
         """
         Инициализация коннектора
         
         Args:
             token: Токен доступа к API. Если не указан, берется из config.py
             client_login: Логин клиента (для агентских аккаунтов)
+            governor: Регулятор баллов (по умолчанию - общий для процесса)
+            retry_policy: Политика повторов при временных ошибках API
+            circuit_breaker: Предохранитель (по умолчанию - общий для процесса)
+            limiter: Лимитер одновременных запросов по Client-Login (по умолчанию - общий для процесса)
+            metrics: Накопитель метрик запросов (по умолчанию - общий для процесса)
+            api_url: Адрес API (по умолчанию - API_URL из config.py)
         """
         self.token = token or YANDEX_DIRECT_TOKEN
         self.client_login = client_login or DEFAULT_CLIENT_LOGIN
         self.language = DEFAULT_LANGUAGE
+        self.governor = governor or get_shared_governor()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or get_shared_circuit_breaker()
+        self.limiter = limiter or get_shared_limiter()
+        self.metrics = metrics or get_shared_metrics()
+        self.api_url = (api_url or API_URL).rstrip('/')
         
         if not self.token:
             raise ValueError("Токен Яндекс.Директ не найден! Укажите его в config.txt или переменной окружения YANDEX_DIRECT_TOKEN")
+    
+    def _build_headers(self) -> Dict[str, str]:
+        """Заголовки запроса (пустые значения отбрасываются)"""
+        headers = {
+            'Authorization': f'Bearer {self.token}',
+            'Client-Login': self.client_login,
+            'Accept-Language': self.language,
+            'Content-Type': 'application/json'
+        }
+        
+        # Удаляем пустые заголовки
+        return {k: v for k, v in headers.items() if v}
+    
+    def _service_url(self, service: str) -> str:
+        """Адрес сервиса API (например, .../json/v5/campaigns)"""
+        return f"{self.api_url}/{service}"
+    
+    def _build_request(self, method: str, params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        URL сервиса и тело запроса для метода вида 'campaigns.get'
+        
+        API v5 ожидает адрес сервиса в URL (/json/v5/campaigns),
+        а в теле - только имя операции (get).
+        
+        Returns:
+            Кортеж (url, body)
+        """
+        service, _, operation = method.partition('.')
+        url = self._service_url(service)
+        body = {
+            'method': operation or method,
+            'params': params
+        }
+        return url, body
+    
+    @staticmethod
+    def _encode_body(body: Dict[str, Any]) -> bytes:
+        """Тело запроса в JSON (размер учитывается в метриках)"""
+        return json.dumps(body).encode('utf-8')
+    
+    def _handle_response(self, headers: Dict[str, str], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Учет баллов по заголовкам ответа и разбор результата"""
+        self.governor.update(self.client_login, headers)
+        
+        if result.get('error', {}).get('error_code') == NOT_ENOUGH_UNITS_ERROR:
+            self.governor.mark_exhausted(self.client_login)
+        
+        return self._parse_result(result)
+    
+    def get_units_budget(self) -> Dict[str, Any]:
+        """
+        Остаток баллов и стоимость выполняющихся запросов для текущего логина
+        
+        Returns:
+            Словарь remaining/daily_limit/spent_total/pending
+        """
+        return self.governor.get_budget(self.client_login)
+    
+    @staticmethod
+    def _parse_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Проверка ответа API на ошибки и извлечение поля result
+        
+        Raises:
+            DirectAPIError: если в ответе есть поле error
+        """
+        if 'error' in result:
+            error = result['error']
+            logger.error(f"Ошибка API: {error}")
+            raise DirectAPIError.from_response(error)
+        
+        return result.get('result', {})
+    
+    def _is_outage(self, error: BaseException) -> bool:
+        """Сетевая ошибка, означающая недоступность сервиса (таймаут, обрыв, HTTP 5xx)"""
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.RetryError)):
+            return True
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+        return isinstance(error, requests.exceptions.HTTPError) and (status or 0) >= 500
+    
+    def _record_attempt(self, error: Optional[BaseException]) -> None:
+        """
+        Учет исхода попытки предохранителем
+        
+        Любой ответ API, кроме ошибок недоступности (52, 1000, 1001), считается
+        успехом: сервис работает, даже если вернул 506, 152 или ошибку авторизации.
+        Отказом считаются ошибки недоступности, таймауты, обрывы и HTTP 5xx.
+        Попытка, прерванная по другой причине (например, UnitsExhaustedError
+        до отправки), только освобождает пробный запрос полуоткрытого предохранителя.
+        """
+        if error is None or (isinstance(error, DirectAPIError) and not error.is_service_down):
+            self.circuit_breaker.record_success()
+        elif isinstance(error, DirectAPIError) or self._is_outage(error):
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.release_probe()
+    
+    def _retry_delay(self, method: str, error: Exception, attempt: int,
+                     transport: bool = False) -> Optional[float]:
+        """
+        Учет неудачной попытки: по коду ошибки решается, повторять ли запрос
+        
+        Args:
+            method: Название метода API
+            error: Возникшее исключение
+            attempt: Номер неудачной попытки (с 0)
+            transport: Сетевая ошибка, которую повторяет сам коннектор (асинхронный -
+                у него нет повторов urllib3; опрос отчетов - в обоих коннекторах)
+        
+        Returns:
+            Задержка перед повтором в секундах или None, если повторять не нужно
+        """
+        if isinstance(error, DirectAPIError):
+            self.metrics.record_error(method, error.error_code)
+        
+        if not self.retry_policy.should_retry(error, attempt, transport):
+            return None
+        
+        delay = self.retry_policy.delay(attempt)
+        self.metrics.record_retry(method)
+        logger.warning(
+            f"{method}: {error}; попытка {attempt + 2}/{self.retry_policy.max_attempts} "
+            f"через {delay:.1f} с"
+        )
+        return delay
+    
+    @staticmethod
+    def _transport_error_code(error: Exception) -> str:
+        """Код сетевой ошибки для метрик: HTTP-статус или имя исключения"""
+        status = getattr(getattr(error, 'response', None), 'status_code', None) or getattr(error, 'status', None)
+        return f"HTTP {status}" if status else type(error).__name__
+    
+    @staticmethod
+    def _split_selection(method: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Разбиение слишком длинных списков Ids/CampaignIds/AdGroupIds на допустимые части
+        
+        Условия SelectionCriteria объединяются по И, поэтому при разбиении
+        нескольких списков перебираются все сочетания частей; порядок частей
+        стабилен и совпадает с порядком идентификаторов во входных списках.
+        
+        Args:
+            method: Название метода API
+            params: Параметры запроса
+            
+        Returns:
+            Список параметров запросов (один элемент, если разбиение не нужно)
+        """
+        limits = SELECTION_LIMITS.get(method, {})
+        criteria = params.get('SelectionCriteria') or {}
+        
+        split_fields = []
+        split_chunks = []
+        for field, limit in limits.items():
+            ids = criteria.get(field)
+            if ids and len(ids) > limit:
+                split_fields.append(field)
+                split_chunks.append([ids[i:i + limit] for i in range(0, len(ids), limit)])
+        
+        if not split_fields:
+            return [params]
+        
+        parts = []
+        for combination in itertools.product(*split_chunks):
+            part_criteria = dict(criteria)
+            part_criteria.update(zip(split_fields, combination))
+            part = dict(params)
+            part['SelectionCriteria'] = part_criteria
+            parts.append(part)
+        
+        logger.debug(f"{method}: SelectionCriteria разбит на {len(parts)} запросов")
+        return parts
+    
+    @staticmethod
+    def _page_params(params: Dict[str, Any], offset: int, limit: int) -> Dict[str, Any]:
+        """Копия параметров запроса с указанной страницей (Page.Limit/Page.Offset)"""
+        page_params = dict(params)
+        page_params['Page'] = {'Limit': limit, 'Offset': offset}
+        return page_params
+    
+    def _campaigns_params(self, campaign_ids: Optional[List[int]] = None,
+                          field_names: Fields = None) -> Dict[str, Any]:
+        """Параметры запроса campaigns.get"""
+        params = {'SelectionCriteria': {}}
+        params.update(resolve_fields('campaigns', field_names))
+        
+        if campaign_ids:
+            params['SelectionCriteria']['Ids'] = campaign_ids
+        
+        if self.client_login:
+            params['SelectionCriteria']['ClientLogins'] = [self.client_login]
+        
+        return params
+    
+    def _ad_groups_params(self, campaign_ids: Optional[List[int]] = None,
+                          ad_group_ids: Optional[List[int]] = None,
+                          field_names: Fields = None) -> Dict[str, Any]:
+        """Параметры запроса adgroups.get"""
+        params = {'SelectionCriteria': {}}
+        params.update(resolve_fields('ad_groups', field_names))
+        
+        if campaign_ids:
+            params['SelectionCriteria']['CampaignIds'] = campaign_ids
+        
+        if ad_group_ids:
+            params['SelectionCriteria']['Ids'] = ad_group_ids
+        
+        return params
+    
+    def _ads_params(self, campaign_ids: Optional[List[int]] = None,
+                    ad_group_ids: Optional[List[int]] = None,
+                    ad_ids: Optional[List[int]] = None,
+                    field_names: Fields = None) -> Dict[str, Any]:
+        """Параметры запроса ads.get"""
+        params = {'SelectionCriteria': {}}
+        params.update(resolve_fields('ads', field_names))
+        
+        if campaign_ids:
+            params['SelectionCriteria']['CampaignIds'] = campaign_ids
+        
+        if ad_group_ids:
+            params['SelectionCriteria']['AdGroupIds'] = ad_group_ids
+        
+        if ad_ids:
+            params['SelectionCriteria']['Ids'] = ad_ids
+        
+        return params
+    
+    def _keywords_params(self, campaign_ids: Optional[List[int]] = None,
+                         ad_group_ids: Optional[List[int]] = None,
+                         keyword_ids: Optional[List[int]] = None,
+                         field_names: Fields = None) -> Dict[str, Any]:
+        """Параметры запроса keywords.get"""
+        params = {'SelectionCriteria': {}}
+        params.update(resolve_fields('keywords', field_names))
+        
+        if campaign_ids:
+            params['SelectionCriteria']['CampaignIds'] = campaign_ids
+        
+        if ad_group_ids:
+            params['SelectionCriteria']['AdGroupIds'] = ad_group_ids
+        
+        if keyword_ids:
+            params['SelectionCriteria']['Ids'] = keyword_ids
+        
+        return params
+    
+    @staticmethod
+    def _keyword_bids_params(campaign_ids: Optional[List[int]] = None,
+                             ad_group_ids: Optional[List[int]] = None,
+                             keyword_ids: Optional[List[int]] = None,
+                             search_fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Параметры запроса keywordbids.get"""
+        params = {
+            'SelectionCriteria': {},
+            'FieldNames': ['KeywordId', 'AdGroupId', 'CampaignId', 'ServingStatus', 'StrategyPriority'],
+            'SearchFieldNames': search_fields or ['Bid', 'AuctionBids'],
+        }
+        
+        if campaign_ids:
+            params['SelectionCriteria']['CampaignIds'] = campaign_ids
+        
+        if ad_group_ids:
+            params['SelectionCriteria']['AdGroupIds'] = ad_group_ids
+        
+        if keyword_ids:
+            params['SelectionCriteria']['KeywordIds'] = keyword_ids
+        
+        return params
+    
+    @staticmethod
+    def _client_info_params() -> Dict[str, Any]:
+        """Параметры запроса clients.get"""
+        return {
+            'FieldNames': ['Login', 'FirstName', 'LastName', 'Currency', 'AgencyName']
+        }
+
+
+class YandexDirectConnector(BaseDirectConnector):
+    """Класс для работы с API Яндекс.Директ"""
+    
+    def __init__(self, token: Optional[str] = None, client_login: Optional[str] = None,
+                 governor: Optional[UnitsGovernor] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 limiter: Optional[ConcurrencyLimiter] = None,
+                 metrics: Optional[ConnectorMetrics] = None,
+                 api_url: Optional[str] = None):
+        """
+        Инициализация коннектора
+        
+        Args:
+            token: Токен доступа к API. Если не указан, берется из config.py
+            client_login: Логин клиента (для агентских аккаунтов)
+            governor: Регулятор баллов (по умолчанию - общий для процесса)
+            retry_policy: Политика повторов при временных ошибках API
+            circuit_breaker: Предохранитель (по умолчанию - общий для процесса)
+            limiter: Лимитер одновременных запросов по Client-Login (по умолчанию - общий для процесса)
+            metrics: Накопитель метрик запросов (по умолчанию - общий для процесса)
+            api_url: Адрес API (по умолчанию - API_URL из config.py)
+        """
+        super().__init__(token=token, client_login=client_login, governor=governor,
+                         retry_policy=retry_policy, circuit_breaker=circuit_breaker,
+                         limiter=limiter, metrics=metrics, api_url=api_url)
         
         # Настройка сессии с retry
         self.session = requests.Session()
@@ -57,7 +430,9 @@ class YandexDirectConnector:
             backoff_factor=1,
             status_forcelist=[429, 500, 502, 503, 504]
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Пул на все одновременные запросы: сессию разделяют коннекторы из for_client
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=HTTP_POOL_SIZE,
+                              pool_maxsize=HTTP_POOL_SIZE)
         self.session.mount("https://", adapter)
         
         logger.info("Коннектор Яндекс.Директ инициализирован")
@@ -66,119 +441,383 @@ class YandexDirectConnector:
         """
         Выполнение запроса к API
         
+        Временные ошибки Директа (52, 506, 1000, 152...) приходят с HTTP 200
+        и повторяются здесь по политике повторов; при недоступности сервиса
+        срабатывает предохранитель.
+        
         Args:
             method: Название метода API
             params: Параметры запроса
             
         Returns:
             Ответ от API
-        """
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Client-Login': self.client_login,
-            'Accept-Language': self.language,
-            'Content-Type': 'application/json'
-        }
         
-        # Удаляем пустые заголовки
-        headers = {k: v for k, v in headers.items() if v}
+        Raises:
+            DirectAPIError: ошибка API, которую нельзя или уже не удалось повторить
+            CircuitOpenError: API недоступен, предохранитель разомкнут
+        """
+        attempt = 0
+        while True:
+            self.circuit_breaker.before_call()
+            error: Optional[BaseException] = None
+            try:
+                result = self._send_request(method, params)
+            except (DirectAPIError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error, delay = e, self._retry_delay(method, e, attempt)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Пробный запрос предохранителя освобождается при любом исходе
+                self._record_attempt(error)
+            
+            if error is None:
+                return result
+            if delay is None:
+                raise error
+            time.sleep(delay)
+            attempt += 1
+    
+    def _send_request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Одна попытка запроса к API
         
-        body = {
-            'method': method,
-            'params': params
-        }
+        Сначала резервируются баллы, затем занимается слот лимитера
+        одновременных запросов логина (чтобы не получить ошибку 506).
+        """
+        headers = self._build_headers()
+        url, body = self._build_request(method, params)
+        payload = self._encode_body(body)
+        cost = estimate_request_cost(method, params)
         
+        queued = time.monotonic()
+        charged = self.governor.acquire(self.client_login, cost)
         try:
-            logger.debug(f"Запрос к API: {method}")
-            response = self.session.post(
-                API_URL,
-                headers=headers,
-                json=body,
-                timeout=REQUEST_TIMEOUT
-            )
-            response.raise_for_status()
+            with self.limiter.slot(self.client_login):
+                logger.debug(f"Запрос к API: {method}")
+                started = time.monotonic()
+                response = self.session.post(
+                    url,
+                    headers=headers,
+                    data=payload,
+                    timeout=REQUEST_TIMEOUT
+                )
+                response.raise_for_status()
+                content = response.content
+                self.metrics.observe_request(
+                    method, time.monotonic() - started, wait=started - queued,
+                    request_bytes=len(payload), response_bytes=len(content),
+                    units_header=response.headers.get('Units')
+                )
+                
+                return self._handle_response(response.headers, json_loads(content))
             
-            result = response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Ошибка запроса: {e}")
+            self.metrics.record_error(method, self._transport_error_code(e))
+            raise
+        finally:
+            self.governor.release(charged, cost)
+    
+    def _stream_request(self, method: str, params: Dict[str, Any],
+                        decoder: StreamingItemsDecoder) -> Iterator[List[Dict]]:
+        """
+        Запрос к API с потоковым разбором ответа
+        
+        Ошибки API приходят без массива объектов, поэтому обнаруживаются до
+        того, как отдан первый объект, и повторяются так же, как в _make_request.
+        После завершения ответ без объектов (LimitedBy) доступен в decoder.result.
+        
+        Yields:
+            Непустые списки объектов по мере их поступления
+        """
+        attempt = 0
+        while True:
+            self.circuit_breaker.before_call()
+            decoder.reset()
+            stream = self._send_stream(method, params, decoder)
+            error: Optional[BaseException] = None
+            try:
+                first = next(stream, None)
+            except (DirectAPIError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error, delay = e, self._retry_delay(method, e, attempt)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self._record_attempt(error)
             
-            # Проверка на ошибки API
-            if 'error' in result:
-                error = result['error']
-                logger.error(f"Ошибка API: {error}")
-                raise Exception(f"API Error: {error.get('error_string', 'Unknown error')}")
+            if error is None:
+                if first is not None:
+                    yield first
+                    yield from stream
+                return
             
-            return result.get('result', {})
+            if delay is None:
+                raise error
+            time.sleep(delay)
+            attempt += 1
+    
+    def _send_stream(self, method: str, params: Dict[str, Any],
+                     decoder: StreamingItemsDecoder) -> Iterator[List[Dict]]:
+        """Одна попытка запроса с чтением ответа кусками по STREAM_CHUNK_SIZE"""
+        headers = self._build_headers()
+        url, body = self._build_request(method, params)
+        payload = self._encode_body(body)
+        cost = estimate_request_cost(method, params)
+        
+        queued = time.monotonic()
+        charged = self.governor.acquire(self.client_login, cost)
+        try:
+            with self.limiter.slot(self.client_login):
+                logger.debug(f"Потоковый запрос к API: {method}")
+                started = time.monotonic()
+                response = self.session.post(
+                    url,
+                    headers=headers,
+                    data=payload,
+                    timeout=REQUEST_TIMEOUT,
+                    stream=True
+                )
+                try:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                        batch = decoder.feed(chunk)
+                        if batch:
+                            yield batch
+                    # Время включает обработку отданных объектов потребителем
+                    self.metrics.observe_request(
+                        method, time.monotonic() - started, wait=started - queued,
+                        request_bytes=len(payload), response_bytes=decoder.bytes,
+                        units_header=response.headers.get('Units')
+                    )
+                    self._handle_response(response.headers, decoder.close())
+                finally:
+                    response.close()
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Ошибка запроса: {e}")
+            self.metrics.record_error(method, self._transport_error_code(e))
             raise
+        finally:
+            self.governor.release(charged, cost)
     
-    def get_campaigns(self, campaign_ids: Optional[List[int]] = None, 
-                     field_names: Optional[List[str]] = None) -> List[Dict]:
+    def _iter_pages(self, method: str, params: Dict[str, Any], result_key: str,
+                    page_limit: int = PAGE_LIMIT,
+                    keep: Optional[Iterable[str]] = None) -> Iterator[List[Dict]]:
         """
-        Получение списка кампаний
+        Постраничное получение объектов с автоматическим переходом по Page.Offset
+        
+        API возвращает LimitedBy (номер последнего отданного объекта), если
+        объекты не поместились в страницу; следующая страница начинается с него.
+        Ответ разбирается потоково: объекты отдаются частями, не дожидаясь
+        конца страницы, и весь ответ целиком в памяти не собирается.
         
         Args:
-            campaign_ids: Список ID кампаний (если None - все кампании)
-            field_names: Список полей для получения
+            method: Название метода API (например, 'keywords.get')
+            params: Параметры запроса без Page
+            result_key: Ключ списка объектов в ответе ('Campaigns', 'Keywords', ...)
+            page_limit: Размер страницы
+            keep: Поля объектов, которые нужно оставить (None - все полученные)
+        
+        Yields:
+            Списки объектов по мере поступления
+        """
+        decoder = StreamingItemsDecoder(result_key, keep)
+        offset = 0
+        while True:
+            page_params = self._page_params(params, offset, page_limit)
+            yield from self._stream_request(method, page_params, decoder)
+            logger.debug(
+                f"{method}: страница с offset={offset}, объектов: {decoder.items}, "
+                f"{decoder.bytes / 1024:.0f} КБ"
+            )
             
-        Returns:
-            Список кампаний
+            limited_by = decoder.result.get('result', {}).get('LimitedBy')
+            if not limited_by:
+                break
+            offset = limited_by
+    
+    def _iter_selection(self, method: str, params: Dict[str, Any], result_key: str,
+                        page_limit: int = PAGE_LIMIT,
+                        keep: Optional[Iterable[str]] = None) -> Iterator[List[Dict]]:
         """
-        default_fields = [
-            'Id', 'Name', 'Type', 'Status', 'State', 'StatusPayment',
-            'StartDate', 'EndDate', 'Currency', 'Funds', 'Statistics',
-            'DailyBudget', 'TextCampaign', 'SearchStrategy'
-        ]
+        Постраничное получение объектов с разбиением SelectionCriteria на части
         
-        params = {
-            'SelectionCriteria': {},
-            'FieldNames': field_names or default_fields
-        }
+        Части выполняются параллельно (не более MAX_PARALLEL_REQUESTS одновременно),
+        а их результаты отдаются строго в порядке частей.
         
-        if campaign_ids:
-            params['SelectionCriteria']['Ids'] = campaign_ids
+        Yields:
+            Списки объектов: по мере поступления (если разбиение не потребовалось) или части целиком
+        """
+        parts = self._split_selection(method, params)
+        if len(parts) == 1:
+            yield from self._iter_pages(method, params, result_key, page_limit, keep)
+            return
         
-        if self.client_login:
-            params['SelectionCriteria']['ClientLogins'] = [self.client_login]
+        def fetch(part: Dict[str, Any]) -> List[Dict]:
+            return [item for page in self._iter_pages(method, part, result_key, page_limit, keep) for item in page]
         
-        result = self._make_request('campaigns.get', params)
-        campaigns = result.get('Campaigns', [])
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS) as executor:
+            window = deque()
+            for part in parts:
+                window.append(executor.submit(fetch, part))
+                if len(window) >= MAX_PARALLEL_REQUESTS:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+    
+    def iter_campaigns(self, campaign_ids: Optional[List[int]] = None,
+                       field_names: Fields = None,
+                       page_limit: int = PAGE_LIMIT,
+                       keep_fields: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """
+        Потоковое получение кампаний по страницам
+        
+        Args:
+            campaign_ids: Список ID кампаний (если None - все кампании)
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
+            page_limit: Размер страницы
+            keep_fields: Поля, которые оставить в объектах при разборе (остальные отбрасываются)
+        
+        Yields:
+            Кампании
+        """
+        params = self._campaigns_params(campaign_ids, field_names)
+        for page in self._iter_selection('campaigns.get', params, 'Campaigns', page_limit, keep_fields):
+            yield from page
+    
+    def iter_ad_groups(self, campaign_ids: Optional[List[int]] = None,
+                       ad_group_ids: Optional[List[int]] = None,
+                       field_names: Fields = None,
+                       page_limit: int = PAGE_LIMIT,
+                       keep_fields: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """
+        Потоковое получение групп объявлений по страницам
+        
+        Args:
+            campaign_ids: Список ID кампаний
+            ad_group_ids: Список ID групп объявлений
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
+            page_limit: Размер страницы
+            keep_fields: Поля, которые оставить в объектах при разборе (остальные отбрасываются)
+        
+        Yields:
+            Группы объявлений
+        """
+        params = self._ad_groups_params(campaign_ids, ad_group_ids, field_names)
+        for page in self._iter_selection('adgroups.get', params, 'AdGroups', page_limit, keep_fields):
+            yield from page
+    
+    def iter_ads(self, campaign_ids: Optional[List[int]] = None,
+                 ad_group_ids: Optional[List[int]] = None,
+                 ad_ids: Optional[List[int]] = None,
+                 field_names: Fields = None,
+                 page_limit: int = PAGE_LIMIT,
+                 keep_fields: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """
+        Потоковое получение объявлений по страницам
+        
+        Args:
+            campaign_ids: Список ID кампаний
+            ad_group_ids: Список ID групп объявлений
+            ad_ids: Список ID объявлений
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
+            page_limit: Размер страницы
+            keep_fields: Поля, которые оставить в объектах при разборе (остальные отбрасываются)
+        
+        Yields:
+            Объявления
+        """
+        params = self._ads_params(campaign_ids, ad_group_ids, ad_ids, field_names)
+        for page in self._iter_selection('ads.get', params, 'Ads', page_limit, keep_fields):
+            yield from page
+    
+    def iter_keywords(self, campaign_ids: Optional[List[int]] = None,
+                      ad_group_ids: Optional[List[int]] = None,
+                      keyword_ids: Optional[List[int]] = None,
+                      field_names: Fields = None,
+                      page_limit: int = PAGE_LIMIT,
+                      keep_fields: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """
+        Потоковое получение ключевых слов по страницам
+        
+        Args:
+            campaign_ids: Список ID кампаний
+            ad_group_ids: Список ID групп объявлений
+            keyword_ids: Список ID ключевых слов
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
+            page_limit: Размер страницы
+            keep_fields: Поля, которые оставить в объектах при разборе (остальные отбрасываются)
+        
+        Yields:
+            Ключевые слова
+        """
+        params = self._keywords_params(campaign_ids, ad_group_ids, keyword_ids, field_names)
+        for page in self._iter_selection('keywords.get', params, 'Keywords', page_limit, keep_fields):
+            yield from page
+    
+    def iter_keyword_bids(self, campaign_ids: Optional[List[int]] = None,
+                          ad_group_ids: Optional[List[int]] = None,
+                          keyword_ids: Optional[List[int]] = None,
+                          search_fields: Optional[List[str]] = None,
+                          page_limit: int = PAGE_LIMIT) -> Iterator[Dict]:
+        """
+        Потоковое получение ставок и данных торгов ключевых слов (keywordbids.get)
+        
+        Args:
+            campaign_ids: Список ID кампаний
+            ad_group_ids: Список ID групп объявлений
+            keyword_ids: Список ID ключевых слов
+            search_fields: Поля ставки на поиске (по умолчанию Bid и AuctionBids -
+                ставки и списываемая цена для каждого объема трафика)
+            page_limit: Размер страницы
+        
+        Yields:
+            Ставки ключевых слов (KeywordId, Search.Bid, Search.AuctionBids.AuctionBidItems)
+        """
+        params = self._keyword_bids_params(campaign_ids, ad_group_ids, keyword_ids, search_fields)
+        for page in self._iter_selection('keywordbids.get', params, 'KeywordBids', page_limit):
+            yield from page
+    
+    def get_campaigns(self, campaign_ids: Optional[List[int]] = None, 
+                     field_names: Fields = None) -> List[Dict]:
+        """
+        Получение списка кампаний (все страницы)
+        
+        Args:
+            campaign_ids: Список ID кампаний (если None - все кампании)
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
+            
+        Returns:
+            Список кампаний
+        """
+        campaigns = list(self.iter_campaigns(campaign_ids, field_names))
         
         logger.info(f"Получено кампаний: {len(campaigns)}")
         return campaigns
     
     def get_ad_groups(self, campaign_ids: Optional[List[int]] = None,
                      ad_group_ids: Optional[List[int]] = None,
-                     field_names: Optional[List[str]] = None) -> List[Dict]:
+                     field_names: Fields = None) -> List[Dict]:
         """
-        Получение списка групп объявлений
+        Получение списка групп объявлений (все страницы)
         
         Args:
             campaign_ids: Список ID кампаний
             ad_group_ids: Список ID групп объявлений
-            field_names: Список полей для получения
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
             
         Returns:
             Список групп объявлений
         """
-        default_fields = [
-            'Id', 'Name', 'CampaignId', 'NegativeKeywords', 'NegativeKeywordSharedSetIds',
-            'Type', 'Subtype', 'Status', 'ServingStatus', 'Statistics'
-        ]
-        
-        params = {
-            'SelectionCriteria': {},
-            'FieldNames': field_names or default_fields
-        }
-        
-        if campaign_ids:
-            params['SelectionCriteria']['CampaignIds'] = campaign_ids
-        
-        if ad_group_ids:
-            params['SelectionCriteria']['Ids'] = ad_group_ids
-        
-        result = self._make_request('adgroups.get', params)
-        ad_groups = result.get('AdGroups', [])
+        ad_groups = list(self.iter_ad_groups(campaign_ids, ad_group_ids, field_names))
         
         logger.info(f"Получено групп объявлений: {len(ad_groups)}")
         return ad_groups
@@ -186,43 +825,21 @@ class YandexDirectConnector:
     def get_ads(self, campaign_ids: Optional[List[int]] = None,
                 ad_group_ids: Optional[List[int]] = None,
                 ad_ids: Optional[List[int]] = None,
-                field_names: Optional[List[str]] = None) -> List[Dict]:
+                field_names: Fields = None) -> List[Dict]:
         """
-        Получение списка объявлений
+        Получение списка объявлений (все страницы)
         
         Args:
             campaign_ids: Список ID кампаний
             ad_group_ids: Список ID групп объявлений
             ad_ids: Список ID объявлений
-            field_names: Список полей для получения
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
             
         Returns:
             Список объявлений
         """
-        default_fields = [
-            'Id', 'AdGroupId', 'CampaignId', 'Type', 'Subtype', 'Status',
-            'State', 'StatusModeration', 'TextAd', 'TextImageAd', 'MobileAppAd',
-            'DynamicTextAd', 'TextAdBuilderAd', 'Cpc', 'Cpm', 'ImpressionPriority',
-            'AdCategories', 'AdExtensionIds', 'VCardId', 'SitelinkSetId',
-            'Statistics', 'UserParam1', 'UserParam2'
-        ]
-        
-        params = {
-            'SelectionCriteria': {},
-            'FieldNames': field_names or default_fields
-        }
-        
-        if campaign_ids:
-            params['SelectionCriteria']['CampaignIds'] = campaign_ids
-        
-        if ad_group_ids:
-            params['SelectionCriteria']['AdGroupIds'] = ad_group_ids
-        
-        if ad_ids:
-            params['SelectionCriteria']['Ids'] = ad_ids
-        
-        result = self._make_request('ads.get', params)
-        ads = result.get('Ads', [])
+        ads = list(self.iter_ads(campaign_ids, ad_group_ids, ad_ids, field_names))
         
         logger.info(f"Получено объявлений: {len(ads)}")
         return ads
@@ -230,41 +847,21 @@ class YandexDirectConnector:
     def get_keywords(self, campaign_ids: Optional[List[int]] = None,
                     ad_group_ids: Optional[List[int]] = None,
                     keyword_ids: Optional[List[int]] = None,
-                    field_names: Optional[List[str]] = None) -> List[Dict]:
+                    field_names: Fields = None) -> List[Dict]:
         """
-        Получение списка ключевых слов
+        Получение списка ключевых слов (все страницы)
         
         Args:
             campaign_ids: Список ID кампаний
             ad_group_ids: Список ID групп объявлений
             keyword_ids: Список ID ключевых слов
-            field_names: Список полей для получения
+            field_names: Поля: профиль ('minimal', 'analysis', 'full'), список FieldNames
+                или словарь параметров *FieldNames (по умолчанию - профиль 'full')
             
         Returns:
             Список ключевых слов
         """
-        default_fields = [
-            'Id', 'AdGroupId', 'CampaignId', 'Keyword', 'UserParam1', 'UserParam2',
-            'Bid', 'ContextBid', 'StrategyPriority', 'Status', 'State',
-            'Productivity', 'StatisticsSearch', 'StatisticsNetwork'
-        ]
-        
-        params = {
-            'SelectionCriteria': {},
-            'FieldNames': field_names or default_fields
-        }
-        
-        if campaign_ids:
-            params['SelectionCriteria']['CampaignIds'] = campaign_ids
-        
-        if ad_group_ids:
-            params['SelectionCriteria']['AdGroupIds'] = ad_group_ids
-        
-        if keyword_ids:
-            params['SelectionCriteria']['Ids'] = keyword_ids
-        
-        result = self._make_request('keywords.get', params)
-        keywords = result.get('Keywords', [])
+        keywords = list(self.iter_keywords(campaign_ids, ad_group_ids, keyword_ids, field_names))
         
         logger.info(f"Получено ключевых слов: {len(keywords)}")
         return keywords
@@ -272,35 +869,273 @@ class YandexDirectConnector:
     def get_statistics(self, report_type: str = 'CAMPAIGN_PERFORMANCE_REPORT',
                       date_from: Optional[str] = None,
                       date_to: Optional[str] = None,
-                      campaign_ids: Optional[List[int]] = None) -> Dict:
+                      campaign_ids: Optional[List[int]] = None,
+                      field_names: Optional[List[str]] = None,
+                      name_suffix: Optional[str] = None) -> Dict:
         """
-        Получение статистики (требует использования Reports API)
+        Получение статистики через Reports API (офлайн-режим)
         
         Args:
             report_type: Тип отчета
-            date_from: Дата начала (формат YYYY-MM-DD)
-            date_to: Дата окончания (формат YYYY-MM-DD)
+            date_from: Дата начала (формат YYYY-MM-DD, по умолчанию - 7 дней назад)
+            date_to: Дата окончания (формат YYYY-MM-DD, по умолчанию - сегодня)
             campaign_ids: Список ID кампаний
+            field_names: Поля отчета
+            name_suffix: Добавка к имени отчета, чтобы не получить ранее построенный
+                отчет с теми же параметрами (см. build_report_request)
             
         Returns:
-            Статистика
+            Статистика: field_names, rows и columns - колонки отчета
+            (array('q')/array('d') для числовых полей, списки строк для остальных)
         """
-        # Это упрощенная версия, для полной реализации нужен Reports API
-        logger.warning("Получение статистики требует Reports API. Используйте get_campaigns с полем Statistics")
-        return {}
+        return ReportsClient(self).get_report(
+            report_type=report_type,
+            date_from=date_from,
+            date_to=date_to,
+            campaign_ids=campaign_ids,
+            field_names=field_names,
+            name_suffix=name_suffix
+        )
     
-    def get_client_info(self) -> Dict:
+    def _bulk(self, service: str, operation: str, items: List[Dict]) -> Dict[str, Any]:
         """
-        Получение информации о клиенте
+        Пакетное изменение объектов с разбиением на части и сбором ошибок по объектам
         
+        Части отправляются параллельно (не более MAX_PARALLEL_REQUESTS одновременно).
+        Ошибка запроса целиком помечает ошибочными все объекты его части.
+        
+        Args:
+            service: Сервис API (keywords, ads, adgroups, bids, keywordbids)
+            operation: Операция (add, update, set)
+            items: Объекты для отправки
+            
         Returns:
-            Информация о клиенте
+            Сводка: total/succeeded/failed, results по каждому объекту
+            (index, Id, Errors, Warnings) и failed_items для повторной отправки
+        """
+        method = f'{service}.{operation}'
+        if method not in BULK_LIMITS:
+            raise ValueError(f"Пакетная операция не поддерживается: {method}")
+        
+        items_key = BULK_ITEMS_KEYS[service]
+        results_key = BULK_RESULTS_KEYS[operation]
+        limit = BULK_LIMITS[method]
+        chunks = [items[i:i + limit] for i in range(0, len(items), limit)]
+        
+        def send(chunk: List[Dict]) -> List[Dict]:
+            try:
+                result = self._make_request(method, {items_key: chunk})
+                chunk_results = result.get(results_key, [])
+            except Exception as e:
+                logger.error(f"Ошибка пакета {method} ({len(chunk)} объектов): {e}")
+                return [{'Errors': [{'Message': str(e)}]} for _ in chunk]
+            
+            # Результаты приходят в порядке объектов запроса
+            missing = len(chunk) - len(chunk_results)
+            if missing > 0:
+                chunk_results = chunk_results + [{'Errors': [{'Message': 'Нет результата для объекта'}]}] * missing
+            return chunk_results
+        
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS) as executor:
+            chunk_results = list(executor.map(send, chunks))
+        
+        summary = {
+            'method': method,
+            'total': len(items),
+            'succeeded': 0,
+            'failed': 0,
+            'warnings': 0,
+            'results': [],
+            'failed_items': []
+        }
+        
+        index = 0
+        for chunk, results in zip(chunks, chunk_results):
+            for item, item_result in zip(chunk, results):
+                errors = item_result.get('Errors', [])
+                warnings = item_result.get('Warnings', [])
+                summary['results'].append({
+                    'index': index,
+                    'Id': item_result.get('Id'),
+                    'Errors': errors,
+                    'Warnings': warnings
+                })
+                if errors:
+                    summary['failed'] += 1
+                    summary['failed_items'].append(item)
+                else:
+                    summary['succeeded'] += 1
+                if warnings:
+                    summary['warnings'] += 1
+                index += 1
+        
+        logger.info(
+            f"{method}: успешно {summary['succeeded']}/{summary['total']}, "
+            f"с ошибками {summary['failed']}, с предупреждениями {summary['warnings']}"
+        )
+        return summary
+    
+    def bulk_add(self, service: str, items: List[Dict]) -> Dict[str, Any]:
+        """
+        Пакетное добавление объектов (keywords, ads, adgroups)
+        
+        Args:
+            service: Сервис API
+            items: Объекты для добавления
+            
+        Returns:
+            Сводка с результатами по объектам (см. _bulk); failed_items
+            можно передать в bulk_add повторно
+        """
+        return self._bulk(service, 'add', items)
+    
+    def bulk_update(self, service: str, items: List[Dict]) -> Dict[str, Any]:
+        """
+        Пакетное обновление объектов (keywords, ads, adgroups)
+        
+        Args:
+            service: Сервис API
+            items: Объекты для обновления (с Id)
+            
+        Returns:
+            Сводка с результатами по объектам (см. _bulk)
+        """
+        return self._bulk(service, 'update', items)
+    
+    def bulk_set_bids(self, items: List[Dict], service: str = 'keywordbids') -> Dict[str, Any]:
+        """
+        Пакетная установка ставок (keywordbids.set или bids.set)
+        
+        Args:
+            items: Ставки (KeywordId/AdGroupId/CampaignId и значения ставок)
+            service: keywordbids или bids
+            
+        Returns:
+            Сводка с результатами по объектам (см. _bulk)
+        """
+        return self._bulk(service, 'set', items)
+    
+    def for_client(self, client_login: Optional[str]) -> 'YandexDirectConnector':
+        """
+        Коннектор того же агентского токена для другого клиента
+        
+        Новый коннектор использует ту же HTTP-сессию (пул соединений)
+        и тот же регулятор баллов, но отдельный Client-Login.
+        
+        Args:
+            client_login: Логин клиента агентства; None или '' - запросы от имени
+                самого агентства, без Client-Login (DEFAULT_CLIENT_LOGIN не подставляется)
+            
+        Returns:
+            Экземпляр YandexDirectConnector
+        """
+        client_connector = YandexDirectConnector(
+            token=self.token,
+            client_login=client_login,
+            governor=self.governor,
+            retry_policy=self.retry_policy,
+            circuit_breaker=self.circuit_breaker,
+            limiter=self.limiter,
+            metrics=self.metrics,
+            api_url=self.api_url
+        )
+        client_connector.client_login = client_login or ''
+        client_connector.session = self.session
+        return client_connector
+    
+    def get_agency_clients(self, field_names: Optional[List[str]] = None,
+                           include_archived: bool = False) -> List[Dict]:
+        """
+        Получение списка клиентов агентства (agencyclients.get)
+        
+        Args:
+            field_names: Список полей для получения
+            include_archived: Включать ли архивных клиентов
+            
+        Returns:
+            Список клиентов
         """
         params = {
-            'FieldNames': ['Login', 'FirstName', 'LastName', 'Currency', 'AgencyName']
+            'SelectionCriteria': {} if include_archived else {'Archived': 'NO'},
+            'FieldNames': field_names or ['Login', 'ClientId', 'ClientInfo', 'Currency', 'Archived']
         }
         
-        result = self._make_request('clients.get', params)
+        # Запрос выполняется от имени агентства, без Client-Login
+        agency_connector = self.for_client(None)
+        clients = [
+            client
+            for page in agency_connector._iter_pages('agencyclients.get', params, 'Clients')
+            for client in page
+        ]
+        
+        logger.info(f"Получено клиентов агентства: {len(clients)}")
+        return clients
+    
+    def get_changes_timestamp(self) -> str:
+        """
+        Текущее время сервера для последующих проверок изменений
+        
+        Returns:
+            Метка времени в формате API (YYYY-MM-DDThh:mm:ssZ)
+        """
+        result = self._make_request('changes.checkDictionaries', {})
+        return result.get('Timestamp', '')
+    
+    def check_campaigns_changes(self, timestamp: str) -> Dict:
+        """
+        Кампании, изменившиеся с указанного момента (changes.checkCampaigns)
+        
+        Args:
+            timestamp: Метка времени предыдущей проверки
+            
+        Returns:
+            Ответ API: Campaigns (CampaignId, ChangesIn) и новая Timestamp
+        """
+        result = self._make_request('changes.checkCampaigns', {'Timestamp': timestamp})
+        logger.info(f"Изменившихся кампаний: {len(result.get('Campaigns', []))}")
+        return result
+    
+    def check_changes(self, timestamp: str, campaign_ids: Optional[List[int]] = None,
+                      ad_group_ids: Optional[List[int]] = None,
+                      ad_ids: Optional[List[int]] = None,
+                      field_names: Optional[List[str]] = None) -> Dict:
+        """
+        Изменения в объектах кампаний с указанного момента (changes.check)
+        
+        Args:
+            timestamp: Метка времени предыдущей проверки
+            campaign_ids: Список ID кампаний (не более 3000)
+            ad_group_ids: Список ID групп объявлений (не более 10000)
+            ad_ids: Список ID объявлений (не более 50000)
+            field_names: Какие изменения вернуть (CampaignIds, AdGroupIds, AdIds, CampaignsStat)
+            
+        Returns:
+            Ответ API: Modified, NotFound, Unprocessed и новая Timestamp
+        """
+        params = {
+            'Timestamp': timestamp,
+            'FieldNames': field_names or ['CampaignIds', 'AdGroupIds', 'AdIds']
+        }
+        
+        if campaign_ids:
+            params['CampaignIds'] = campaign_ids
+        
+        if ad_group_ids:
+            params['AdGroupIds'] = ad_group_ids
+        
+        if ad_ids:
+            params['AdIds'] = ad_ids
+        
+        return self._make_request('changes.check', params)
+    
+    def get_client_info(self) -> Dict:
+        """
+        Получение информации о клиенте
+        
+        Returns:
+            Информация о клиенте
+        """
+        result = self._make_request('clients.get', self._client_info_params())
         clients = result.get('Clients', [])
         
         if clients:
@@ -6,11 +6,12 @@
 import sys
 import logging
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 
 sys.path.insert(0, str(Path(__file__).parent))
 
 from connector import YandexDirectConnector
+from planner import JobPlan
 from config import YANDEX_DIRECT_TOKEN
 
 logging.basicConfig(level=logging.INFO)
@@ -23,25 +24,73 @@ class CampaignCreator:
     def __init__(self, connector: YandexDirectConnector):
         self.connector = connector
     
-    def check_existing_campaigns(self) -> List[Dict]:
-        """Проверка существующих кампаний"""
-        try:
-            campaigns = self.connector.get_campaigns()
-            return campaigns
-        except Exception as e:
-            logger.error(f"Ошибка при проверке кампаний: {e}")
-            return []
+    @staticmethod
+    def _bulk_summary(result: Dict) -> Dict:
+        """
+        Итог пакетного добавления: счетчики, ошибки по объектам
+        и объекты, которые можно отправить повторно
+        """
+        return {
+            'added': result['succeeded'],
+            'total': result['total'],
+            'errors': [r for r in result['results'] if r['Errors']],
+            'failed_items': result['failed_items']
+        }
     
-    def create_campaign(self, landing_url: str = "https://dev-bot.su") -> Dict:
+    def retry_failed(self, service: str, summary: Dict) -> Dict:
         """
-        Создание полной кампании
+        Повторная отправка только неудавшихся объектов
+        
+        Args:
+            service: Сервис API (keywords, ads)
+            summary: Результат create_keywords/create_ads
+            
+        Returns:
+            Итог повторного добавления
+        """
+        if not summary.get('failed_items'):
+            return {'added': 0, 'total': 0, 'errors': [], 'failed_items': []}
+        return self._bulk_summary(self.connector.bulk_add(service, summary['failed_items']))
+    
+    def dump_metrics(self, path: Optional[Union[str, Path]] = None) -> Path:
+        """Сохранение метрик запросов коннектора (см. DataCollector.dump_metrics)"""
+        filepath = self.connector.metrics.dump(path)
+        logger.info(f"Метрики запросов сохранены в {filepath}")
+        return filepath
+    
+    def plan_creation(self, landing_url: str = "https://dev-bot.su") -> JobPlan:
+        """
+        План запросов полного создания кампании (main) и оценка стоимости в баллах
+        без обращения к API
         
         Args:
             landing_url: URL посадочной страницы
             
         Returns:
-            Созданная кампания
+            План: проверка кампаний, campaigns.add, adgroups.add и пакеты keywords.add/ads.add
         """
+        ad_groups = self.build_ad_groups(0)
+        ad_group_ids = list(range(len(ad_groups)))
+        
+        plan = JobPlan('create_campaign')
+        plan.add('check', 'campaigns.get')
+        plan.add('campaign', 'campaigns.add', 1)
+        plan.add('ad_groups', 'adgroups.add', len(ad_groups))
+        plan.add_bulk('keywords', 'keywords.add', len(self.build_keywords(ad_group_ids)))
+        plan.add_bulk('ads', 'ads.add', len(self.build_ads(ad_group_ids, landing_url)))
+        return plan
+    
+    def check_existing_campaigns(self) -> List[Dict]:
+        """Проверка существующих кампаний"""
+        try:
+            campaigns = self.connector.get_campaigns(field_names='minimal')
+            return campaigns
+        except Exception as e:
+            logger.error(f"Ошибка при проверке кампаний: {e}")
+            return []
+    
+    def build_campaign(self) -> Dict:
+        """Параметры новой кампании для campaigns.add"""
         # Данные кампании
         campaign_data = {
             "Name": "Поиск | AI-решения | РФ",
@@ -124,6 +173,20 @@ class CampaignCreator:
             "Status": "DRAFT"  # Черновик - не запускается автоматически
         }
         
+        return campaign_data
+    
+    def create_campaign(self, landing_url: str = "https://dev-bot.su") -> Dict:
+        """
+        Создание полной кампании
+        
+        Args:
+            landing_url: URL посадочной страницы
+            
+        Returns:
+            Созданная кампания
+        """
+        campaign_data = self.build_campaign()
+        
         # Создание кампании через API
         try:
             result = self.connector._make_request(
@@ -144,9 +207,8 @@ class CampaignCreator:
             logger.error(f"Ошибка при создании кампании: {e}")
             raise
     
-    def create_ad_groups(self, campaign_id: int, landing_url: str) -> List[Dict]:
-        """Создание групп объявлений"""
-        
+    def build_ad_groups(self, campaign_id: int) -> List[Dict]:
+        """Группы объявлений для adgroups.add"""
         ad_groups_data = [
             {
                 "Name": "Общий спрос на внедрение AI",
@@ -186,6 +248,13 @@ class CampaignCreator:
             }
         ]
         
+        return ad_groups_data
+    
+    def create_ad_groups(self, campaign_id: int, landing_url: str) -> List[Dict]:
+        """Создание групп объявлений"""
+        
+        ad_groups_data = self.build_ad_groups(campaign_id)
+        
         try:
             result = self.connector._make_request(
                 'adgroups.add',
@@ -209,9 +278,8 @@ class CampaignCreator:
             logger.error(f"Ошибка при создании групп: {e}")
             raise
     
-    def create_keywords(self, ad_group_ids: List[int]) -> Dict:
-        """Создание ключевых слов"""
-        
+    def build_keywords(self, ad_group_ids: List[int]) -> List[Dict]:
+        """Ключевые слова для keywords.add (по группам ad_group_ids)"""
         keywords_data = []
         
         # Группа 1: Общий спрос
@@ -273,28 +341,30 @@ class CampaignCreator:
                 "UserParam2": ""
             })
         
+        return keywords_data
+    
+    def create_keywords(self, ad_group_ids: List[int]) -> Dict:
+        """Создание ключевых слов; итог - см. _bulk_summary (объекты с ошибками - в failed_items)"""
+        
+        keywords_data = self.build_keywords(ad_group_ids)
+        
         try:
-            result = self.connector._make_request(
-                'keywords.add',
-                {
-                    'Keywords': keywords_data
-                }
-            )
+            result = self.connector.bulk_add('keywords', keywords_data)
             
-            if result.get('AddResults'):
-                added_count = len([r for r in result['AddResults'] if r.get('Id')])
-                logger.info(f"Создано ключевых слов: {added_count}")
-                return {'added': added_count, 'total': len(keywords_data)}
+            # Итог возвращается и при полном отказе: failed_items нужны для retry_failed
+            summary = self._bulk_summary(result)
+            if result['succeeded']:
+                logger.info(f"Создано ключевых слов: {result['succeeded']}")
             else:
-                raise Exception("Ключевые слова не созданы")
+                logger.error(f"Ключевые слова не созданы: {summary['errors'][:1]}")
+            return summary
                 
         except Exception as e:
             logger.error(f"Ошибка при создании ключевых слов: {e}")
             raise
     
-    def create_ads(self, ad_group_ids: List[int], landing_url: str) -> Dict:
-        """Создание объявлений"""
-        
+    def build_ads(self, ad_group_ids: List[int], landing_url: str) -> List[Dict]:
+        """Объявления для ads.add (по группам ad_group_ids)"""
         ads_data = []
         
         # Объявление 1: Общий спрос
@@ -352,26 +422,40 @@ class CampaignCreator:
             }
         })
         
+        return ads_data
+    
+    def create_ads(self, ad_group_ids: List[int], landing_url: str) -> Dict:
+        """Создание объявлений; итог - см. _bulk_summary (объекты с ошибками - в failed_items)"""
+        
+        ads_data = self.build_ads(ad_group_ids, landing_url)
+        
         try:
-            result = self.connector._make_request(
-                'ads.add',
-                {
-                    'Ads': ads_data
-                }
-            )
+            result = self.connector.bulk_add('ads', ads_data)
             
-            if result.get('AddResults'):
-                added_count = len([r for r in result['AddResults'] if r.get('Id')])
-                logger.info(f"Создано объявлений: {added_count}")
-                return {'added': added_count, 'total': len(ads_data)}
+            # Итог возвращается и при полном отказе: failed_items нужны для retry_failed
+            summary = self._bulk_summary(result)
+            if result['succeeded']:
+                logger.info(f"Создано объявлений: {result['succeeded']}")
             else:
-                raise Exception("Объявления не созданы")
+                logger.error(f"Объявления не созданы: {summary['errors'][:1]}")
+            return summary
                 
         except Exception as e:
             logger.error(f"Ошибка при создании объявлений: {e}")
             raise
 
 
+def print_bulk_summary(title: str, summary: Dict) -> None:
+    """Вывод итога create_keywords/create_ads с первыми ошибками"""
+    mark = "✓" if summary['added'] == summary['total'] else "✗"
+    print(f"{mark} Создано {title}: {summary['added']}/{summary['total']}")
+    for item in summary['errors'][:3]:
+        error = item['Errors'][0]
+        print(f"  - #{item.get('index')}: {error.get('Message')} {error.get('Details', '')}".rstrip())
+    if summary['failed_items']:
+        print(f"  Не созданы: {len(summary['failed_items'])} (повторная отправка - CampaignCreator.retry_failed)")
+
+
 def main():
     """Основная функция"""
     print("\n" + "="*70)
@@ -387,6 +471,12 @@ def main():
         # Инициализация
         connector = YandexDirectConnector()
         creator = CampaignCreator(connector)
+        landing_url = "https://dev-bot.su"  # Можно изменить
+        plan = creator.plan_creation(landing_url)
+        
+        if '--dry-run' in sys.argv:
+            print(f"\nПлан запросов (без обращения к API):\n{plan.summary()}")
+            return
         
         # Проверка существующих кампаний
         print("\n[1/6] Проверка существующих кампаний...")
@@ -405,9 +495,18 @@ def main():
                 print(f"  Статус: {our_campaign[0].get('Status', 'N/A')}")
                 return
         
+        # Остаток баллов известен после первого запроса: не начинаем создание,
+        # которое остановится на середине из-за нехватки баллов
+        budget = connector.get_units_budget()
+        check = plan.check(budget['remaining'], budget['daily_limit'])
+        if check['fits'] is False:
+            print(f"\n✗ Недостаточно баллов: нужно ~{check['units']}, осталось {check['remaining']}")
+            if check['wait_seconds'] is not None:
+                print(f"  Баллы восстановятся примерно через {check['wait_seconds'] / 60:.0f} мин")
+            return
+        
         # Создание кампании
         print("\n[2/6] Создание кампании...")
-        landing_url = "https://dev-bot.su"  # Можно изменить
         campaign = creator.create_campaign(landing_url=landing_url)
         print(f"✓ Кампания создана: {campaign['Name']} (ID: {campaign['Id']})")
         
@@ -423,12 +522,12 @@ def main():
         # Создание ключевых слов
         print("\n[4/6] Создание ключевых слов...")
         keywords_result = creator.create_keywords(ad_group_ids)
-        print(f"✓ Создано ключевых слов: {keywords_result['added']}/{keywords_result['total']}")
+        print_bulk_summary("ключевых слов", keywords_result)
         
         # Создание объявлений
         print("\n[5/6] Создание объявлений...")
         ads_result = creator.create_ads(ad_group_ids, landing_url)
-        print(f"✓ Создано объявлений: {ads_result['added']}/{ads_result['total']}")
+        print_bulk_summary("объявлений", ads_result)
         
         # Итоги
         print("\n" + "="*70)
@@ -441,6 +540,7 @@ def main():
         print(f"  - Групп объявлений: {len(ad_groups)}")
         print(f"  - Ключевых слов: {keywords_result['added']}")
         print(f"  - Объявлений: {ads_result['added']}")
+        print(f"\nМетрики запросов: {creator.dump_metrics()}")
         print(f"\n⚠️  ВАЖНО: Кампания создана в статусе DRAFT (черновик)")
         print("   Она не будет запущена автоматически.")
         print("   Для запуска перейдите в интерфейс Яндекс.Директ и активируйте кампанию.")
@@ -1,48 +1,315 @@
 """
 Модуль для сбора данных о кампаниях, объявлениях и стратегии
 """
+import asyncio
 import json
 import logging
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
-import pandas as pd
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-from connector import YandexDirectConnector
-from config import DATA_DIR, REPORTS_DIR
+# Модули, общие для коннекторов Директа и Метрики (column_snapshot)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'shared'))
+
+from campaign_tree import CampaignTree
+from column_snapshot import COLUMN_SNAPSHOT_SUFFIX, ColumnSelection, ColumnSnapshot, write_column_snapshot
+from excel_export import StreamingExcelWriter
+from connector import SELECTION_LIMITS, YandexDirectConnector
+from fields import merge_requirements, resolve_requirements
+from incremental_sync import SNAPSHOT_PATTERN, IncrementalSync
+from object_store import ObjectStore
+from planner import JobPlan, counts_from_snapshot, plan_collect, split_campaigns
+from snapshot_history import SnapshotHistory
+from stats_warehouse import StatsWarehouse
+from config import DATA_DIR, MAX_PARALLEL_REQUESTS, REPORTS_DIR
 
 logger = logging.getLogger(__name__)
 
+# Этап конвейера сбора: (тип объектов, номер части, параметры отбора)
+Stage = Tuple[str, int, Dict[str, List[int]]]
+
+
+class _CollectPipeline:
+    """
+    Состояние конвейерного сбора collect_all_data
+    
+    Кампании собираются в части по лимиту CampaignIds метода adgroups.get, и
+    группы каждой части запрашиваются, не дожидаясь остальных кампаний. ID
+    полученных групп накапливаются до лимита AdGroupIds, после чего сразу
+    запрашиваются объявления и ключевые слова этих групп; остаток отправляется,
+    когда все группы получены. Так число запросов (и баллов) остается тем же,
+    что и при последовательном сборе, а этапы перекрываются по времени.
+    
+    Методы возвращают новые этапы, которые нужно запустить; сами запросы
+    выполняет вызывающий код (потоки или задачи asyncio).
+    """
+    
+    def __init__(self, on_batch: Optional[Callable[[str, List[Dict]], Any]] = None):
+        self.on_batch = on_batch
+        self.campaigns: List[Dict] = []
+        self.group_parts: Dict[int, List[Dict]] = {}
+        self.children: Dict[str, List[Dict]] = {'ads': [], 'keywords': []}
+        self.part_size = SELECTION_LIMITS['adgroups.get']['CampaignIds']
+        self.chunk_size = min(SELECTION_LIMITS['ads.get']['AdGroupIds'],
+                              SELECTION_LIMITS['keywords.get']['AdGroupIds'])
+        self._part: List[int] = []
+        self._parts = 0
+        self._groups_in_flight = 0
+        self._campaigns_done = False
+        self._group_ids: List[int] = []
+        self._has_groups = False
+        self._chunks = 0
+    
+    def _emit(self, entity: str, items: List[Dict]) -> None:
+        if self.on_batch is not None and items:
+            self.on_batch(entity, items)
+    
+    def _groups_stage(self) -> List[Stage]:
+        ids, self._part = self._part, []
+        if not ids:
+            return []
+        self._emit('campaigns', self.campaigns[-len(ids):])
+        self._parts += 1
+        self._groups_in_flight += 1
+        return [('ad_groups', self._parts - 1, {'campaign_ids': ids})]
+    
+    def _children_stages(self, selection: Dict[str, List[int]]) -> List[Stage]:
+        self._chunks += 1
+        return [(entity, self._chunks - 1, selection) for entity in self.children]
+    
+    def _flush_groups(self) -> List[Stage]:
+        """Дочерние запросы по оставшимся группам, когда все группы получены"""
+        if not self._campaigns_done or self._groups_in_flight:
+            return []
+        if self._group_ids:
+            ids, self._group_ids = self._group_ids, []
+            return self._children_stages({'ad_group_ids': ids})
+        if self.campaigns and not self._has_groups:
+            # Как и при последовательном сборе: без групп отбор по кампаниям
+            return self._children_stages({'campaign_ids': [c['Id'] for c in self.campaigns]})
+        return []
+    
+    def add_campaign(self, campaign: Dict) -> List[Stage]:
+        """Полученная кампания; возвращает запрос групп, если часть заполнена"""
+        self.campaigns.append(campaign)
+        self._part.append(campaign['Id'])
+        if len(self._part) < self.part_size:
+            return []
+        return self._groups_stage()
+    
+    def end_campaigns(self) -> List[Stage]:
+        """Все кампании получены"""
+        stages = self._groups_stage()
+        self._campaigns_done = True
+        return stages + self._flush_groups()
+    
+    def complete(self, entity: str, index: int, items: List[Dict]) -> List[Stage]:
+        """Результат этапа; возвращает этапы, которые можно запустить после него"""
+        self._emit(entity, items)
+        if entity != 'ad_groups':
+            self.children[entity].extend(items)
+            return []
+        
+        self.group_parts[index] = items
+        self._groups_in_flight -= 1
+        self._has_groups = self._has_groups or bool(items)
+        self._group_ids.extend(group['Id'] for group in items)
+        
+        stages = []
+        while len(self._group_ids) >= self.chunk_size:
+            ids = self._group_ids[:self.chunk_size]
+            del self._group_ids[:self.chunk_size]
+            stages.extend(self._children_stages({'ad_group_ids': ids}))
+        return stages + self._flush_groups()
+    
+    def fill(self, data: Dict) -> Dict:
+        """
+        Запись результатов в data
+        
+        Порядок не зависит от того, в каком порядке завершились запросы: группы -
+        по частям кампаний, объявления и ключевые слова - по порядку своих групп.
+        """
+        data['campaigns'] = self.campaigns
+        data['ad_groups'] = [group for index in sorted(self.group_parts) for group in self.group_parts[index]]
+        
+        position = {group['Id']: i for i, group in enumerate(data['ad_groups'])}
+        missing = len(position)
+        for entity, items in self.children.items():
+            data[entity] = sorted(items, key=lambda item: position.get(item.get('AdGroupId'), missing))
+        return data
+
 
 class DataCollector:
     """Класс для сбора данных из Яндекс.Директ"""
     
-    def __init__(self, connector: YandexDirectConnector):
+    # Поля, без которых не строится структура кампаний
+    REQUIRED_FIELDS = {
+        'campaigns': {'FieldNames': ['Id']},
+        'ad_groups': {'FieldNames': ['Id', 'CampaignId']},
+        'ads': {'FieldNames': ['Id', 'AdGroupId', 'CampaignId']},
+        'keywords': {'FieldNames': ['Id', 'AdGroupId', 'CampaignId']}
+    }
+    
+    def __init__(self, connector: YandexDirectConnector, fields: Union[None, str, Dict] = None):
         """
         Инициализация сборщика данных
         
         Args:
-            connector: Экземпляр YandexDirectConnector
+            connector: Экземпляр YandexDirectConnector или AsyncYandexDirectConnector
+            fields: Запрашиваемые поля: имя профиля ('minimal', 'analysis', 'full')
+                или словарь {объект: поля}, например StrategyAnalyzer.REQUIRED_FIELDS
+                (по умолчанию - профиль 'full')
         """
         self.connector = connector
+        self.fields = merge_requirements(resolve_requirements(fields), self.REQUIRED_FIELDS)
+        self.is_async = asyncio.iscoroutinefunction(connector.get_campaigns)
         self.data_dir = DATA_DIR
         self.reports_dir = REPORTS_DIR
         
         logger.info("DataCollector инициализирован")
     
-    def collect_all_data(self, campaign_ids: Optional[List[int]] = None) -> Dict:
+    def collect_all_data(self, campaign_ids: Optional[List[int]] = None, dry_run: bool = False,
+                         on_batch: Optional[Callable[[str, List[Dict]], Any]] = None) -> Dict:
         """
         Сбор всех данных о кампаниях
         
+        Этапы выполняются конвейером: группы запрашиваются по мере получения
+        кампаний, объявления и ключевые слова - по мере получения групп
+        (см. _CollectPipeline). Число запросов то же, что при последовательном сборе.
+        
         Args:
             campaign_ids: Список ID кампаний (если None - все кампании)
+            dry_run: Не обращаться к API, а вернуть план запросов и оценку
+                стоимости в баллах по последнему снимку (см. plan_collect)
+            on_batch: Функция (тип объектов, объекты), вызываемая для каждой
+                полученной части ('campaigns', 'ad_groups', 'ads', 'keywords'),
+                например ObjectStore.upsert для записи по мере сбора
             
         Returns:
-            Словарь со всеми собранными данными
+            Словарь со всеми собранными данными (при dry_run - план и budget)
         """
+        if dry_run:
+            plan = self.plan_collect(campaign_ids)
+            budget = self.connector.governor.get_budget(self.connector.client_login)
+            return {**plan.to_dict(), 'budget': plan.check(budget['remaining'], budget['daily_limit'])}
+        
+        if self.is_async:
+            return self._run_async(self.collect_all_data_async(campaign_ids=campaign_ids, on_batch=on_batch))
+        
         logger.info("Начало сбора данных...")
         
-        data = {
+        data = self._empty_data()
+        pipeline = _CollectPipeline(on_batch)
+        stages: Dict[Future, Tuple[str, int]] = {}
+        
+        executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS)
+        
+        def fetch(entity: str, selection: Dict[str, List[int]]) -> List[Dict]:
+            iterate = getattr(self.connector, f'iter_{entity}')
+            return list(iterate(**selection, field_names=self.fields[entity]))
+        
+        def submit(new_stages: List[Stage]) -> None:
+            for entity, index, selection in new_stages:
+                stages[executor.submit(fetch, entity, selection)] = (entity, index)
+        
+        def complete(futures: Iterable[Future]) -> None:
+            for future in futures:
+                entity, index = stages.pop(future)
+                submit(pipeline.complete(entity, index, future.result()))
+        
+        client_info = executor.submit(self.connector.get_client_info)
+        try:
+            for campaign in self.connector.iter_campaigns(campaign_ids, field_names=self.fields['campaigns']):
+                submit(pipeline.add_campaign(campaign))
+                complete([future for future in stages if future.done()])
+            submit(pipeline.end_campaigns())
+            
+            while stages:
+                done, _ = wait(list(stages), return_when=FIRST_COMPLETED)
+                complete(done)
+            
+            data['client_info'] = client_info.result()
+            pipeline.fill(data)
+            
+            logger.info(f"Сбор данных завершен успешно: кампаний {len(data['campaigns'])}, "
+                        f"групп {len(data['ad_groups'])}, объявлений {len(data['ads'])}, "
+                        f"ключевых слов {len(data['keywords'])}")
+            return data
+            
+        except Exception as e:
+            for future in [client_info, *stages]:
+                future.cancel()
+            logger.error(f"Ошибка при сборе данных: {e}")
+            raise
+        finally:
+            executor.shutdown(wait=True)
+    
+    async def collect_all_data_async(self, campaign_ids: Optional[List[int]] = None,
+                                     on_batch: Optional[Callable[[str, List[Dict]], Any]] = None) -> Dict:
+        """
+        Сбор всех данных о кампаниях с параллельным выполнением независимых запросов
+        
+        Информация о клиенте запрашивается одновременно с кампаниями, остальные
+        этапы выполняются конвейером, как в collect_all_data.
+        
+        Args:
+            campaign_ids: Список ID кампаний (если None - все кампании)
+            on_batch: Функция (тип объектов, объекты) для каждой полученной части
+            
+        Returns:
+            Словарь со всеми собранными данными
+        """
+        logger.info("Начало асинхронного сбора данных...")
+        
+        data = self._empty_data()
+        pipeline = _CollectPipeline(on_batch)
+        stages: Dict[asyncio.Future, Tuple[str, int]] = {}
+        
+        async def fetch(entity: str, selection: Dict[str, List[int]]) -> List[Dict]:
+            iterate = getattr(self.connector, f'iter_{entity}')
+            return [item async for item in iterate(**selection, field_names=self.fields[entity])]
+        
+        def submit(new_stages: List[Stage]) -> None:
+            for entity, index, selection in new_stages:
+                stages[asyncio.ensure_future(fetch(entity, selection))] = (entity, index)
+        
+        def complete(tasks: Iterable[asyncio.Future]) -> None:
+            for task in tasks:
+                entity, index = stages.pop(task)
+                submit(pipeline.complete(entity, index, task.result()))
+        
+        client_info = asyncio.ensure_future(self.connector.get_client_info())
+        try:
+            async for campaign in self.connector.iter_campaigns(campaign_ids, field_names=self.fields['campaigns']):
+                submit(pipeline.add_campaign(campaign))
+                complete([task for task in stages if task.done()])
+            submit(pipeline.end_campaigns())
+            
+            while stages:
+                done, _ = await asyncio.wait(list(stages), return_when=asyncio.FIRST_COMPLETED)
+                complete(done)
+            
+            data['client_info'] = await client_info
+            pipeline.fill(data)
+            
+            logger.info(f"Сбор данных завершен успешно: кампаний {len(data['campaigns'])}, "
+                        f"групп {len(data['ad_groups'])}, объявлений {len(data['ads'])}, "
+                        f"ключевых слов {len(data['keywords'])}")
+            return data
+            
+        except BaseException as e:
+            for task in [client_info, *stages]:
+                task.cancel()
+            if isinstance(e, Exception):
+                logger.error(f"Ошибка при сборе данных: {e}")
+            raise
+    
+    @staticmethod
+    def _empty_data() -> Dict:
+        return {
             'timestamp': datetime.now().isoformat(),
             'client_info': {},
             'campaigns': [],
@@ -50,74 +317,244 @@ class DataCollector:
             'ads': [],
             'keywords': []
         }
+    
+    def _latest_snapshot(self) -> Dict:
+        """Последний сохраненный снимок из data/ (источник числа объектов для плана)"""
+        snapshots = sorted(self.data_dir.glob(SNAPSHOT_PATTERN))
+        if not snapshots:
+            raise ValueError("Нет сохраненного снимка для оценки: выполните полный сбор или передайте snapshot")
         
-        try:
-            # Информация о клиенте
-            data['client_info'] = self.connector.get_client_info()
+        with open(snapshots[-1], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def plan_collect(self, campaign_ids: Optional[List[int]] = None,
+                     snapshot: Optional[Dict] = None) -> JobPlan:
+        """
+        План запросов collect_all_data и оценка стоимости без обращения к API
+        
+        Args:
+            campaign_ids: Список ID кампаний (если None - все кампании снимка)
+            snapshot: Снимок с числом объектов (если None - последний файл из data/)
             
-            # Кампании
-            campaigns = self.connector.get_campaigns(campaign_ids=campaign_ids)
-            data['campaigns'] = campaigns
+        Returns:
+            План с запросами по методам и оценкой в баллах
+        """
+        plan = plan_collect(counts_from_snapshot(snapshot or self._latest_snapshot()), campaign_ids)
+        logger.info(plan.summary())
+        return plan
+    
+    def collect_within_budget(self, campaign_ids: Optional[List[int]] = None,
+                              budget: Optional[int] = None,
+                              snapshot: Optional[Dict] = None) -> Dict:
+        """
+        Сбор с разбиением на части по кампаниям, если задание не помещается в остаток баллов
+        
+        Каждая часть запускается, когда ее оценка помещается в остаток баллов
+        (с ожиданием восстановления не дольше max_wait регулятора). Если ждать
+        дольше, сбор останавливается между частями, а не посреди запросов:
+        несобранные кампании возвращаются в pending_campaign_ids.
+        
+        Args:
+            campaign_ids: Список ID кампаний (если None - все кампании аккаунта)
+            budget: Баллов на одну часть (по умолчанию - текущий остаток)
+            snapshot: Снимок с числом объектов (если None - последний файл из data/)
             
-            if campaigns:
-                campaign_ids_list = [c['Id'] for c in campaigns]
-                
-                # Группы объявлений
-                ad_groups = self.connector.get_ad_groups(campaign_ids=campaign_ids_list)
-                data['ad_groups'] = ad_groups
-                
-                ad_group_ids_list = [ag['Id'] for ag in ad_groups]
-                
-                # Объявления
-                ads = self.connector.get_ads(
-                    campaign_ids=campaign_ids_list,
-                    ad_group_ids=ad_group_ids_list
-                )
-                data['ads'] = ads
-                
-                # Ключевые слова
-                keywords = self.connector.get_keywords(
-                    campaign_ids=campaign_ids_list,
-                    ad_group_ids=ad_group_ids_list
-                )
-                data['keywords'] = keywords
-            
-            logger.info("Сбор данных завершен успешно")
-            return data
+        Returns:
+            Собранные данные (как collect_all_data) и, при остановке, pending_campaign_ids
+        """
+        governor = self.connector.governor
+        login = self.connector.client_login
+        counts = counts_from_snapshot(snapshot or self._latest_snapshot())
+        
+        if campaign_ids is None:
+            # Текущий список кампаний: новые кампании, которых нет в снимке, тоже нужно собрать
+            call = self.connector.get_campaigns(field_names={'FieldNames': ['Id']})
+            campaign_ids = [c['Id'] for c in (self._run_async(call) if self.is_async else call)]
+        
+        part_budget = budget if budget is not None else self._available_units(governor.get_budget(login))
+        plan = plan_collect(counts, campaign_ids)
+        if part_budget is None or plan.units <= part_budget:
+            return self.collect_all_data(campaign_ids)
+        
+        unknown = [c for c in campaign_ids if c not in counts]
+        parts = split_campaigns(counts, part_budget, campaign_ids)
+        if unknown:
+            parts.append(unknown)
+        logger.info(f"Сбор (~{plan.units} баллов) разбит на {len(parts)} частей по ~{part_budget} баллов")
+        
+        data = None
+        for index, part in enumerate(parts):
+            part_plan = plan_collect(counts, part)
+            state = governor.get_budget(login)
+            wait = part_plan.wait_seconds(self._available_units(state), state['daily_limit'])
+            if wait is None or wait > governor.max_wait:
+                pending = [c for rest in parts[index:] for c in rest]
+                logger.warning(f"Баллов не хватит на часть {index + 1}/{len(parts)} (~{part_plan.units}); "
+                               f"не собрано кампаний: {len(pending)}")
+                data = data or self._empty_data()
+                data['pending_campaign_ids'] = pending
+                break
             
-        except Exception as e:
-            logger.error(f"Ошибка при сборе данных: {e}")
-            raise
+            if wait:
+                logger.info(f"Часть {index + 1}/{len(parts)}: ожидание восстановления баллов {wait:.0f} с")
+                time.sleep(wait)
+            
+            part_data = self.collect_all_data(part)
+            if data is None:
+                data = part_data
+            else:
+                for key in ('campaigns', 'ad_groups', 'ads', 'keywords'):
+                    data[key].extend(part_data[key])
+        
+        return data
     
-    def save_data(self, data: Dict, filename: Optional[str] = None) -> Path:
+    def _available_units(self, state: Dict) -> Optional[int]:
+        """Остаток баллов за вычетом запаса регулятора и уже выполняющихся запросов"""
+        if state['remaining'] is None:
+            return None
+        return state['remaining'] - self.connector.governor.reserve - state['pending']
+    
+    def _run_async(self, coro):
+        """Выполнение корутины в новом цикле событий с закрытием сессии коннектора"""
+        async def runner():
+            try:
+                return await coro
+            finally:
+                await self.connector.close()
+        
+        return asyncio.run(runner())
+    
+    def sync_data(self, snapshot: Optional[Dict] = None) -> Dict:
         """
-        Сохранение данных в JSON файл
+        Инкрементальное обновление последнего снимка по сервису Changes
+        
+        Args:
+            snapshot: Базовый снимок (если None - последний файл из data/)
+            
+        Returns:
+            Обновленный снимок (при отсутствии базового - полный сбор)
+        """
+        return IncrementalSync(self).sync(snapshot)
+    
+    def save_data(self, data: Dict, filename: Optional[str] = None, columnar: bool = False) -> Path:
+        """
+        Сохранение данных в JSON файл или колоночный снимок
         
         Args:
             data: Данные для сохранения
             filename: Имя файла (если None - генерируется автоматически)
+            columnar: Сохранить колоночный снимок (папка .columns, см. column_snapshot.py);
+                так же сохраняется при filename с расширением .columns
             
         Returns:
             Путь к сохраненному файлу
         """
+        columnar = columnar or (filename or '').endswith(COLUMN_SNAPSHOT_SUFFIX)
         if not filename:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'yandex_direct_data_{timestamp}.json'
+            suffix = COLUMN_SNAPSHOT_SUFFIX if columnar else '.json'
+            filename = f'yandex_direct_data_{timestamp}{suffix}'
         
         filepath = self.data_dir / filename
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if columnar:
+            write_column_snapshot(data, filepath)
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
         
         logger.info(f"Данные сохранены в {filepath}")
         return filepath
     
-    def load_data(self, filename: str) -> Dict:
+    def save_to_store(self, data: Dict, store: Optional[ObjectStore] = None,
+                      prune: bool = False) -> Dict[str, int]:
         """
-        Загрузка данных из JSON файла
+        Сохранение данных в локальное SQLite-хранилище (обновление объектов по Id)
+        
+        Args:
+            data: Данные collect_all_data или sync_data
+            store: Хранилище (по умолчанию - data/yandex_direct.sqlite3)
+            prune: Данные полные - удалить из хранилища объекты, которых в них нет
+            
+        Returns:
+            Число записанных объектов по типам
+        """
+        if store is not None:
+            return store.save_data(data, prune=prune)
+        
+        with ObjectStore() as default_store:
+            return default_store.save_data(data, prune=prune)
+    
+    def save_to_history(self, data: Dict, history: Optional[SnapshotHistory] = None) -> str:
+        """
+        Сохранение снимка в историю (data/history): хранятся только изменившиеся объекты
+        
+        Args:
+            data: Данные collect_all_data или sync_data
+            history: История снимков (по умолчанию - data/history)
+            
+        Returns:
+            ID снимка (для SnapshotHistory.load и diff)
+        """
+        return (history or SnapshotHistory()).save(data)
+    
+    def get_statistics_history(self, report_type: str = 'CAMPAIGN_PERFORMANCE_REPORT',
+                               date_from: Optional[str] = None, date_to: Optional[str] = None,
+                               campaign_ids: Optional[List[int]] = None,
+                               warehouse: Optional[StatsWarehouse] = None) -> Dict:
+        """
+        Статистика за период из локального хранилища (stats_warehouse.py)
+        
+        Из API запрашиваются только дни, которых нет в хранилище, и последние
+        STATS_MUTABLE_DAYS дней, статистика которых еще может измениться.
+        
+        Args:
+            report_type: CAMPAIGN_PERFORMANCE_REPORT или AD_PERFORMANCE_REPORT
+            date_from: Дата начала (формат YYYY-MM-DD, по умолчанию - 7 дней назад)
+            date_to: Дата окончания (формат YYYY-MM-DD, по умолчанию - сегодня)
+            campaign_ids: Только эти кампании (хранится статистика всего аккаунта)
+            warehouse: Хранилище (по умолчанию - data/yandex_direct_stats.sqlite3)
+            
+        Returns:
+            Статистика в формате connector.get_statistics
+        """
+        def run(store: StatsWarehouse) -> Dict:
+            if self.is_async:
+                summary = self._run_async(store.sync_async(self.connector, report_type, date_from, date_to))
+            else:
+                summary = store.sync(self.connector, report_type, date_from, date_to)
+            return store.query(report_type, summary['date_from'], summary['date_to'],
+                               summary['client_login'], campaign_ids)
+        
+        if warehouse is not None:
+            return run(warehouse)
+        
+        with StatsWarehouse() as default_warehouse:
+            return run(default_warehouse)
+    
+    def dump_metrics(self, path: Optional[Union[str, Path]] = None) -> Path:
+        """
+        Сохранение метрик запросов коннектора (время ответа, баллы, ошибки по методам)
+        
+        Args:
+            path: Путь к файлу (.prom - формат Prometheus, иначе JSON; по умолчанию - logs/)
+        
+        Returns:
+            Путь к сохраненному файлу
+        """
+        filepath = self.connector.metrics.dump(path)
+        logger.info(f"Метрики запросов сохранены в {filepath}")
+        return filepath
+    
+    def load_data(self, filename: str, columns: Optional[ColumnSelection] = None) -> Dict:
+        """
+        Загрузка данных из JSON файла или колоночного снимка
         
         Args:
             filename: Имя файла
+            columns: Только для колоночного снимка - нужные поля по спискам объектов,
+                например {'keywords': ['Id', 'Bid', 'Productivity']}; остальные
+                списки загружаются пустыми (None - все данные)
             
         Returns:
             Загруженные данные
@@ -127,16 +564,46 @@ class DataCollector:
         if not filepath.exists():
             raise FileNotFoundError(f"Файл не найден: {filepath}")
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if filepath.is_dir():
+            data = ColumnSnapshot(filepath).to_data(columns)
+        else:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         
         logger.info(f"Данные загружены из {filepath}")
         return data
     
+    def open_snapshot(self, filename: str) -> ColumnSnapshot:
+        """
+        Открытие колоночного снимка для чтения отдельных столбцов
+        
+        Данные столбцов отображаются в память и читаются с диска только при
+        обращении, например StrategyAnalyzer().analyze_keyword_performance(snapshot)
+        читает лишь нужные ему столбцы ключевых слов.
+        
+        Args:
+            filename: Имя папки снимка (результат save_data(..., columnar=True))
+            
+        Returns:
+            Открытый снимок
+        """
+        return ColumnSnapshot(self.data_dir / filename)
+    
+    # Листы Excel для списков объектов
+    EXCEL_SHEETS = (
+        ('campaigns', 'Кампании'),
+        ('ad_groups', 'Группы объявлений'),
+        ('ads', 'Объявления'),
+        ('keywords', 'Ключевые слова'),
+    )
+    
     def export_to_excel(self, data: Dict, filename: Optional[str] = None) -> Path:
         """
         Экспорт данных в Excel файл
         
+        Книга пишется потоково (excel_export.py): вложенные поля разворачиваются
+        в столбцы, листы длиннее лимита строк Excel продолжаются на следующих.
+        
         Args:
             data: Данные для экспорта
             filename: Имя файла
@@ -144,96 +611,207 @@ class DataCollector:
         Returns:
             Путь к сохраненному файлу
         """
-        if not filename:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'yandex_direct_report_{timestamp}.xlsx'
+        filepath = self._excel_path(filename)
         
-        filepath = self.reports_dir / filename
-        
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            # Кампании
-            if data.get('campaigns'):
-                df_campaigns = pd.DataFrame(data['campaigns'])
-                df_campaigns.to_excel(writer, sheet_name='Кампании', index=False)
-            
-            # Группы объявлений
-            if data.get('ad_groups'):
-                df_ad_groups = pd.DataFrame(data['ad_groups'])
-                df_ad_groups.to_excel(writer, sheet_name='Группы объявлений', index=False)
-            
-            # Объявления
-            if data.get('ads'):
-                df_ads = pd.DataFrame(data['ads'])
-                df_ads.to_excel(writer, sheet_name='Объявления', index=False)
-            
-            # Ключевые слова
-            if data.get('keywords'):
-                df_keywords = pd.DataFrame(data['keywords'])
-                df_keywords.to_excel(writer, sheet_name='Ключевые слова', index=False)
-            
-            # Сводная информация
-            summary = {
-                'Метрика': [
-                    'Всего кампаний',
-                    'Всего групп объявлений',
-                    'Всего объявлений',
-                    'Всего ключевых слов',
-                    'Дата сбора данных'
-                ],
-                'Значение': [
-                    len(data.get('campaigns', [])),
-                    len(data.get('ad_groups', [])),
-                    len(data.get('ads', [])),
-                    len(data.get('keywords', [])),
-                    data.get('timestamp', 'N/A')
-                ]
-            }
-            df_summary = pd.DataFrame(summary)
-            df_summary.to_excel(writer, sheet_name='Сводка', index=False)
+        with StreamingExcelWriter(filepath) as writer:
+            for entity, title in self.EXCEL_SHEETS:
+                if data.get(entity):
+                    writer.write_sheet(title, data[entity])
+            
+            counts = {entity: len(data.get(entity, [])) for entity, _ in self.EXCEL_SHEETS}
+            writer.write_sheet('Сводка', self._excel_summary(counts, data.get('timestamp', 'N/A')))
         
         logger.info(f"Данные экспортированы в Excel: {filepath}")
         return filepath
     
-    def get_campaign_structure(self, campaign_id: int) -> Dict:
+    def export_account_to_excel(self, campaign_ids: Optional[List[int]] = None,
+                                filename: Optional[str] = None) -> Path:
         """
-        Получение полной структуры кампании
+        Выгрузка кампаний, групп, объявлений и ключевых слов из API сразу в Excel
+        
+        Объекты пишутся в книгу по мере получения страниц (iter_* коннектора)
+        и не накапливаются в памяти, поэтому подходит для аккаунтов, данные
+        которых не помещаются в память целиком.
         
         Args:
-            campaign_id: ID кампании
+            campaign_ids: Список ID кампаний (если None - все кампании)
+            filename: Имя файла
             
         Returns:
-            Структура кампании с вложенными элементами
+            Путь к сохраненному файлу
         """
-        campaigns = self.connector.get_campaigns(campaign_ids=[campaign_id])
+        filepath = self._excel_path(filename)
+        timestamp = datetime.now().isoformat()
         
-        if not campaigns:
-            return {}
+        with StreamingExcelWriter(filepath) as writer:
+            if self.is_async:
+                self._run_async(self._export_account_async(writer, campaign_ids))
+            else:
+                campaigns = writer.sheet('Кампании')
+                found_ids = []
+                for campaign in self.connector.iter_campaigns(campaign_ids, field_names=self.fields['campaigns']):
+                    campaigns.append(campaign)
+                    found_ids.append(campaign['Id'])
+                
+                iterators = {
+                    'ad_groups': self.connector.iter_ad_groups,
+                    'ads': self.connector.iter_ads,
+                    'keywords': self.connector.iter_keywords,
+                }
+                for entity, title in self.EXCEL_SHEETS[1:]:
+                    if found_ids:
+                        writer.write_sheet(title, iterators[entity](
+                            campaign_ids=found_ids, field_names=self.fields[entity]))
+            
+            writer.end_sheet()
+            counts = {entity: writer.counts.get(title, 0) for entity, title in self.EXCEL_SHEETS}
+            writer.write_sheet('Сводка', self._excel_summary(counts, timestamp))
         
-        campaign = campaigns[0]
+        logger.info(f"Данные экспортированы в Excel: {filepath} ({counts})")
+        return filepath
+    
+    async def _export_account_async(self, writer: StreamingExcelWriter,
+                                    campaign_ids: Optional[List[int]]) -> None:
+        """Потоковая выгрузка для асинхронного коннектора (см. export_account_to_excel)"""
+        campaigns = writer.sheet('Кампании')
+        found_ids = []
+        async for campaign in self.connector.iter_campaigns(campaign_ids, field_names=self.fields['campaigns']):
+            campaigns.append(campaign)
+            found_ids.append(campaign['Id'])
         
-        # Получаем связанные данные
-        ad_groups = self.connector.get_ad_groups(campaign_ids=[campaign_id])
+        iterators = {
+            'ad_groups': self.connector.iter_ad_groups,
+            'ads': self.connector.iter_ads,
+            'keywords': self.connector.iter_keywords,
+        }
+        for entity, title in self.EXCEL_SHEETS[1:]:
+            if found_ids:
+                sheet = writer.sheet(title)
+                async for item in iterators[entity](campaign_ids=found_ids, field_names=self.fields[entity]):
+                    sheet.append(item)
+    
+    def _excel_path(self, filename: Optional[str]) -> Path:
+        if not filename:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f'yandex_direct_report_{timestamp}.xlsx'
+        return self.reports_dir / filename
+    
+    @staticmethod
+    def _excel_summary(counts: Dict[str, int], timestamp: str) -> List[Dict[str, Any]]:
+        """Строки листа 'Сводка'"""
+        return [
+            {'Метрика': 'Всего кампаний', 'Значение': counts['campaigns']},
+            {'Метрика': 'Всего групп объявлений', 'Значение': counts['ad_groups']},
+            {'Метрика': 'Всего объявлений', 'Значение': counts['ads']},
+            {'Метрика': 'Всего ключевых слов', 'Значение': counts['keywords']},
+            {'Метрика': 'Дата сбора данных', 'Значение': timestamp},
+        ]
+    
+    def get_campaign_tree(self, campaign_ids: Optional[List[int]] = None, lazy: bool = True) -> CampaignTree:
+        """
+        Дерево кампаний с индексами по родителям
         
-        ad_group_ids = [ag['Id'] for ag in ad_groups]
-        ads = self.connector.get_ads(ad_group_ids=ad_group_ids)
-        keywords = self.connector.get_keywords(ad_group_ids=ad_group_ids)
+        Кампании и их группы запрашиваются одним набором запросов для всех
+        кампаний сразу. Объявления и ключевые слова при lazy загружаются при
+        первом обращении к группе (для всех групп ее кампании), иначе - сразу.
         
-        # Формируем структуру
-        structure = {
-            'campaign': campaign,
-            'ad_groups': []
-        }
+        Args:
+            campaign_ids: Список ID кампаний (если None - все кампании)
+            lazy: Откладывать загрузку объявлений и ключевых слов
+            
+        Returns:
+            CampaignTree
+        """
+        if self.is_async:
+            campaigns, ad_groups = self._run_async(self._fetch_campaigns_and_groups_async(campaign_ids))
+        else:
+            campaigns = self.connector.get_campaigns(campaign_ids=campaign_ids, field_names=self.fields['campaigns'])
+            ad_groups = []
+            if campaigns:
+                ad_groups = self.connector.get_ad_groups(campaign_ids=[c['Id'] for c in campaigns],
+                                                         field_names=self.fields['ad_groups'])
+        
+        tree = CampaignTree(campaigns, ad_groups, loader=self._load_children)
+        if not lazy:
+            tree.load()
+        return tree
+    
+    async def get_campaign_tree_async(self, campaign_ids: Optional[List[int]] = None) -> CampaignTree:
+        """
+        Дерево кампаний со всеми объявлениями и ключевыми словами (асинхронно)
         
-        for ad_group in ad_groups:
-            ag_id = ad_group['Id']
-            group_ads = [ad for ad in ads if ad.get('AdGroupId') == ag_id]
-            group_keywords = [kw for kw in keywords if kw.get('AdGroupId') == ag_id]
+        Args:
+            campaign_ids: Список ID кампаний (если None - все кампании)
             
-            structure['ad_groups'].append({
-                'ad_group': ad_group,
-                'ads': group_ads,
-                'keywords': group_keywords
-            })
+        Returns:
+            CampaignTree
+        """
+        campaigns, ad_groups = await self._fetch_campaigns_and_groups_async(campaign_ids)
+        ads, keywords = await self._load_children_async([group['Id'] for group in ad_groups])
+        return CampaignTree(campaigns, ad_groups, ads, keywords)
+    
+    async def _fetch_campaigns_and_groups_async(self, campaign_ids: Optional[List[int]]) -> Tuple[List[Dict], List[Dict]]:
+        if campaign_ids:
+            # ID кампаний известны - кампании и группы запрашиваются одновременно
+            campaigns, ad_groups = await asyncio.gather(
+                self.connector.get_campaigns(campaign_ids=campaign_ids, field_names=self.fields['campaigns']),
+                self.connector.get_ad_groups(campaign_ids=campaign_ids, field_names=self.fields['ad_groups'])
+            )
+            return campaigns, ad_groups
         
-        return structure
-
+        campaigns = await self.connector.get_campaigns(campaign_ids=campaign_ids, field_names=self.fields['campaigns'])
+        ad_groups = []
+        if campaigns:
+            ad_groups = await self.connector.get_ad_groups(campaign_ids=[c['Id'] for c in campaigns],
+                                                           field_names=self.fields['ad_groups'])
+        return campaigns, ad_groups
+    
+    def _load_children(self, ad_group_ids: List[int]) -> Tuple[List[Dict], List[Dict]]:
+        """Объявления и ключевые слова групп (загрузчик CampaignTree)"""
+        if self.is_async:
+            return self._run_async(self._load_children_async(ad_group_ids))
+        
+        ads = self.connector.get_ads(ad_group_ids=ad_group_ids, field_names=self.fields['ads'])
+        keywords = self.connector.get_keywords(ad_group_ids=ad_group_ids, field_names=self.fields['keywords'])
+        return ads, keywords
+    
+    async def _load_children_async(self, ad_group_ids: List[int]) -> Tuple[List[Dict], List[Dict]]:
+        if not ad_group_ids:
+            return [], []
+        
+        ads, keywords = await asyncio.gather(
+            self.connector.get_ads(ad_group_ids=ad_group_ids, field_names=self.fields['ads']),
+            self.connector.get_keywords(ad_group_ids=ad_group_ids, field_names=self.fields['keywords'])
+        )
+        return ads, keywords
+    
+    def get_campaign_structure(self, campaign_id: int) -> Dict:
+        """
+        Получение полной структуры кампании
+        
+        Для нескольких кампаний выгоднее get_campaign_tree: запросы выполняются
+        один раз для всех кампаний.
+        
+        Args:
+            campaign_id: ID кампании
+            
+        Returns:
+            Структура кампании с вложенными элементами
+        """
+        return self.get_campaign_tree([campaign_id], lazy=False).structure(campaign_id)
+    
+    async def get_campaign_structure_async(self, campaign_id: int) -> Dict:
+        """
+        Получение полной структуры кампании (асинхронно)
+        
+        Кампания и ее группы запрашиваются одновременно,
+        затем параллельно - объявления и ключевые слова групп.
+        
+        Args:
+            campaign_id: ID кампании
+            
+        Returns:
+            Структура кампании с вложенными элементами
+        """
+        tree = await self.get_campaign_tree_async([campaign_id])
+        return tree.structure(campaign_id)
@@ -21,7 +21,7 @@ def main():
     
     # 3. Получение списка кампаний
     print("\nПолучение списка кампаний...")
-    campaigns = connector.get_campaigns()
+    campaigns = connector.get_campaigns(field_names='minimal')
     print(f"Найдено кампаний: {len(campaigns)}")
     
     if campaigns:
@@ -30,7 +30,7 @@ def main():
     
     # 4. Сбор всех данных
     print("\nСбор всех данных...")
-    collector = DataCollector(connector)
+    collector = DataCollector(connector, fields=StrategyAnalyzer.REQUIRED_FIELDS)
     data = collector.collect_all_data()
     
     print(f"Собрано:")
@@ -66,6 +66,13 @@ def main():
     print("\nСохранение анализа...")
     analyzer.save_analysis(analysis)
     print("Анализ сохранен в reports/")
+    
+    # 9. Метрики запросов: на что ушло время и баллы
+    print("\nСамые затратные методы API:")
+    for row in connector.metrics.summary()[:3]:
+        print(f"  - {row['method']}: {row['requests']} запросов, {row['latency_sum']:.1f} с "
+              f"({row['share']:.0%}), {row['units']} баллов")
+    print(f"Метрики сохранены: {collector.dump_metrics().name}")
 
 
 if __name__ == '__main__':
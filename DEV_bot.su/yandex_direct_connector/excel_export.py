@@ -0,0 +1,219 @@
+"""
+Потоковый экспорт объектов в Excel с постоянным расходом памяти
+
+Книга пишется в режиме openpyxl write-only: строки сразу уходят во временный
+файл листа, поэтому в памяти находятся только текущая строка и небольшая
+выборка строк для заголовка. Вложенные поля объектов разворачиваются в
+отдельные столбцы ('TextAd.Title', 'DailyBudget.Amount'), списки
+записываются строкой JSON. Лист, в который не помещаются все строки
+(EXCEL_MAX_ROWS), продолжается на следующих листах 'Имя (2)', 'Имя (3)', ...
+
+Столбцы листа определяются по первым EXCEL_HEADER_SAMPLE строкам. Поля,
+впервые встретившиеся позже (например, DynamicTextAd после тысячи TextAd),
+не теряются: заголовок дополняется ими, и запись продолжается на следующей
+части листа.
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from openpyxl import Workbook
+
+logger = logging.getLogger(__name__)
+
+# Строк на листе Excel (включая заголовок)
+EXCEL_MAX_ROWS = 1_048_576
+
+# Длина имени листа Excel
+EXCEL_SHEET_TITLE_LIMIT = 31
+
+# Сколько первых строк листа просматривается для заголовка
+EXCEL_HEADER_SAMPLE = 1000
+
+
+def flatten_fields(item: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    """
+    Разворачивание вложенных полей объекта: {'TextAd': {'Title': ...}} -> {'TextAd.Title': ...}
+    
+    Списки и пустые словари заменяются строкой JSON, None остается пустой ячейкой.
+    """
+    flat: Dict[str, Any] = {}
+    for key, value in item.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict) and value:
+            flat.update(flatten_fields(value, f'{name}.'))
+        elif isinstance(value, (list, dict)):
+            flat[name] = json.dumps(value, ensure_ascii=False)
+        else:
+            flat[name] = value
+    return flat
+
+
+def _part_title(title: str, part: int) -> str:
+    """Имя листа с номером части, не длиннее EXCEL_SHEET_TITLE_LIMIT"""
+    suffix = '' if part == 1 else f' ({part})'
+    return title[:EXCEL_SHEET_TITLE_LIMIT - len(suffix)] + suffix
+
+
+class SheetStream:
+    """Лист книги, в который строки дописываются по одной"""
+    
+    def __init__(self, workbook: Workbook, title: str, columns: Optional[Sequence[str]] = None,
+                 max_rows: int = EXCEL_MAX_ROWS, header_sample: int = EXCEL_HEADER_SAMPLE):
+        """
+        Args:
+            workbook: Книга в режиме write-only
+            title: Имя листа
+            columns: Столбцы (None - по первым header_sample строкам;
+                если заданы, остальные поля не пишутся)
+            max_rows: Строк на листе, включая заголовок
+            header_sample: Сколько строк просматривать для заголовка
+        """
+        self.workbook = workbook
+        self.title = title
+        self.max_rows = max(2, max_rows)
+        self.header_sample = max(1, header_sample)
+        self.columns: Optional[List[str]] = list(columns) if columns is not None else None
+        self.rows = 0
+        self.sheets: List[str] = []
+        self._fixed = columns is not None
+        self._known = set(self.columns or [])
+        self._pending: List[Dict[str, Any]] = []
+        self._sheet = None
+        self._sheet_rows = 0
+    
+    def append(self, item: Dict[str, Any]) -> None:
+        """Добавление объекта (вложенные поля разворачиваются)"""
+        flat = flatten_fields(item)
+        if self.columns is None:
+            self._pending.append(flat)
+            if len(self._pending) >= self.header_sample:
+                self._flush_pending()
+            return
+        self._write(flat)
+    
+    def extend(self, items: Iterable[Dict[str, Any]]) -> 'SheetStream':
+        """Добавление объектов из итератора (читается по мере записи)"""
+        for item in items:
+            self.append(item)
+        return self
+    
+    def close(self) -> int:
+        """
+        Запись оставшихся строк
+        
+        Returns:
+            Число записанных строк (без заголовков)
+        """
+        if self.columns is None:
+            self._flush_pending()
+        elif self._sheet is None:
+            self._new_sheet()
+        return self.rows
+    
+    def _flush_pending(self) -> None:
+        columns: Dict[str, None] = {}
+        for flat in self._pending:
+            columns.update(dict.fromkeys(flat))
+        self.columns = list(columns)
+        self._known = set(columns)
+        pending, self._pending = self._pending, []
+        for flat in pending:
+            self._write(flat)
+    
+    def _new_sheet(self) -> None:
+        self._sheet = self.workbook.create_sheet(_part_title(self.title, len(self.sheets) + 1))
+        self.sheets.append(self._sheet.title)
+        self._sheet.append(self.columns)
+        self._sheet_rows = 1
+    
+    def _write(self, flat: Dict[str, Any]) -> None:
+        if not self._fixed and not self._known.issuperset(flat):
+            # Заголовок уже записан: новые поля - со следующей части листа
+            new = [key for key in flat if key not in self._known]
+            self.columns.extend(new)
+            self._known.update(new)
+            if self._sheet is not None:
+                logger.info(f"Лист '{self._sheet.title}': новые поля {new}, продолжение на следующем листе")
+                self._sheet = None
+        
+        if self._sheet is None or self._sheet_rows >= self.max_rows:
+            self._new_sheet()
+        self._sheet.append([flat.get(column) for column in self.columns])
+        self._sheet_rows += 1
+        self.rows += 1
+
+
+class StreamingExcelWriter:
+    """
+    Книга Excel, листы которой пишутся потоково
+    
+    Пример:
+        with StreamingExcelWriter(path) as writer:
+            writer.write_sheet('Ключевые слова', connector.iter_keywords(campaign_ids))
+            sheet = writer.sheet('Объявления')
+            for ad in ads:
+                sheet.append(ad)
+    """
+    
+    def __init__(self, path: Union[str, Path], max_rows: int = EXCEL_MAX_ROWS,
+                 header_sample: int = EXCEL_HEADER_SAMPLE):
+        """
+        Args:
+            path: Путь к файлу .xlsx
+            max_rows: Строк на листе, включая заголовок (больше - продолжение на новом листе)
+            header_sample: Сколько первых строк листа просматривать для заголовка
+        """
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self.header_sample = header_sample
+        self.workbook = Workbook(write_only=True)
+        # Число строк записанных листов: {имя листа: строк}
+        self.counts: Dict[str, int] = {}
+        self._current: Optional[SheetStream] = None
+    
+    def __enter__(self) -> 'StreamingExcelWriter':
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+    
+    def sheet(self, title: str, columns: Optional[Sequence[str]] = None) -> SheetStream:
+        """
+        Новый лист (предыдущий лист при этом дописывается)
+        
+        Args:
+            title: Имя листа
+            columns: Столбцы (None - по первым строкам листа)
+        """
+        self.end_sheet()
+        self._current = SheetStream(self.workbook, title, columns, self.max_rows, self.header_sample)
+        return self._current
+    
+    def write_sheet(self, title: str, items: Iterable[Dict[str, Any]],
+                    columns: Optional[Sequence[str]] = None) -> int:
+        """
+        Лист из объектов итератора
+        
+        Returns:
+            Число записанных строк
+        """
+        sheet = self.sheet(title, columns).extend(items)
+        self.end_sheet()
+        return sheet.rows
+    
+    def end_sheet(self) -> None:
+        """Дописать текущий лист (число его строк появится в counts)"""
+        if self._current is not None:
+            self.counts[self._current.title] = self._current.close()
+            self._current = None
+    
+    def close(self) -> Path:
+        """Сохранение книги"""
+        self.end_sheet()
+        if not self.workbook.worksheets:
+            self.workbook.create_sheet('Данные')
+        self.workbook.save(self.path)
+        return self.path
@@ -0,0 +1,751 @@
+#!/usr/bin/env python3
+"""
+Локальная имитация API Яндекс.Директ v5 для тестов и замеров без сети
+
+Сервер отвечает по тем же адресам, что и api.direct.yandex.com/json/v5:
+синтетический аккаунт заданного размера (кампании, группы, объявления,
+ключевые слова) с постраничной выдачей и LimitedBy, проекцией FieldNames,
+списанием баллов с заголовками Units, ошибками 506 (лишние одновременные
+запросы), 152 (закончились баллы), 1000 (сервис недоступен), задержкой
+ответа и офлайн-режимом Reports API (201/202 с retryIn, затем TSV).
+
+Объекты не хранятся в памяти, а вычисляются по номеру, поэтому аккаунт
+на миллион ключевых слов запускается мгновенно.
+
+Запуск:
+    python fake_server.py --campaigns 50 --groups 20 --keywords 100 --latency 0.05
+    YANDEX_DIRECT_API_URL=http://127.0.0.1:8765/json/v5 YANDEX_DIRECT_TOKEN=fake python test_connector.py
+
+Замер скорости сбора (сервер и сбор в одном процессе):
+    python fake_server.py --campaigns 20 --groups 50 --keywords 200 --benchmark
+
+Из кода:
+    with FakeDirectServer(FakeAccount(campaigns=10), port=0) as server:
+        connector = YandexDirectConnector(token='fake', api_url=server.url)
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from units import estimate_cost
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Первые идентификаторы объектов синтетического аккаунта
+CAMPAIGN_ID_BASE = 10_000_000
+AD_GROUP_ID_BASE = 100_000_000
+AD_ID_BASE = 1_000_000_000
+KEYWORD_ID_BASE = 10_000_000_000
+
+ERROR_STRINGS = {
+    53: 'Ошибка авторизации',
+    55: 'Не найдена операция',
+    152: 'Недостаточно баллов',
+    506: 'Превышено ограничение на количество одновременных запросов',
+    1000: 'Сервер временно недоступен',
+}
+
+# Вложенные структуры объектов и параметры, которыми запрашиваются их поля
+SUBTYPE_FIELD_PARAMS = {
+    'TextCampaignFieldNames': 'TextCampaign',
+    'TextAdFieldNames': 'TextAd',
+    'SearchFieldNames': 'Search',
+}
+
+# Объемы трафика, для которых keywordbids.get возвращает ставки торгов
+AUCTION_TRAFFIC_VOLUMES = (100, 90, 85, 75, 65, 15, 10, 5)
+
+_STATUSES = ('ACCEPTED', 'ACCEPTED', 'ACCEPTED', 'DRAFT', 'MODERATION', 'REJECTED')
+_STATES = ('ON', 'ON', 'ON', 'SUSPENDED', 'OFF')
+_STRATEGIES = ('HIGHEST_POSITION', 'WB_MAXIMUM_CLICKS', 'AVERAGE_CPC', 'WB_MAXIMUM_CONVERSION_RATE')
+_WORDS = ('купить', 'заказать', 'цена', 'недорого', 'доставка', 'москва', 'чат бот',
+          'ai ассистент', 'автоматизация', 'crm', 'интеграция', 'поддержка', 'отзывы')
+
+
+class FakeAccount:
+    """
+    Синтетический аккаунт: одинаковое число групп в каждой кампании
+    и одинаковое число объявлений и ключевых слов в каждой группе
+    
+    Объект с порядковым номером n строится детерминированно из seed и n,
+    поэтому повторные запросы возвращают одни и те же данные.
+    """
+    
+    def __init__(self, campaigns: int = 10, groups: int = 10, ads: int = 3,
+                 keywords: int = 20, seed: int = 1):
+        """
+        Args:
+            campaigns: Число кампаний
+            groups: Число групп объявлений в кампании
+            ads: Число объявлений в группе
+            keywords: Число ключевых слов в группе
+            seed: Зерно генератора значений
+        """
+        self.campaigns = campaigns
+        self.groups = groups
+        self.ads = ads
+        self.keywords = keywords
+        self.seed = seed
+    
+    @property
+    def sizes(self) -> Dict[str, int]:
+        """Число объектов каждого вида"""
+        total_groups = self.campaigns * self.groups
+        return {
+            'campaigns': self.campaigns,
+            'adgroups': total_groups,
+            'ads': total_groups * self.ads,
+            'keywords': total_groups * self.keywords,
+        }
+    
+    def to_data(self) -> Dict[str, Any]:
+        """
+        Все объекты аккаунта в формате DataCollector.collect_all_data (без сервера)
+        
+        Для замеров обработки собранных данных (анализ, экспорт) на больших объемах.
+        """
+        sizes = self.sizes
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'client_info': {'Login': 'fake-agency'},
+            'campaigns': [self.campaign(n) for n in range(sizes['campaigns'])],
+            'ad_groups': [self.ad_group(n) for n in range(sizes['adgroups'])],
+            'ads': [self.ad(n) for n in range(sizes['ads'])],
+            'keywords': [self.keyword(n) for n in range(sizes['keywords'])],
+        }
+    
+    def _rng(self, kind: int, n: int) -> random.Random:
+        return random.Random((self.seed << 48) ^ (kind << 40) ^ n)
+    
+    # Номера объектов, подходящих под SelectionCriteria, в виде отрезков [start, stop)
+    
+    def _per_group(self, service: str) -> int:
+        return {'adgroups': 1, 'ads': self.ads, 'keywords': self.keywords}[service]
+    
+    def _id_base(self, service: str) -> int:
+        return {
+            'campaigns': CAMPAIGN_ID_BASE,
+            'adgroups': AD_GROUP_ID_BASE,
+            'ads': AD_ID_BASE,
+            'keywords': KEYWORD_ID_BASE,
+        }[service]
+    
+    def select(self, service: str, criteria: Dict[str, Any]) -> List[Tuple[int, int]]:
+        """
+        Отрезки порядковых номеров объектов по условиям отбора
+        
+        Учитываются Ids (KeywordIds), CampaignIds и AdGroupIds (остальные условия игнорируются).
+        """
+        # Ставки (keywordbids) нумеруются так же, как ключевые слова
+        kind = 'keywords' if service == 'keywordbids' else service
+        size = self.sizes[kind]
+        base = self._id_base(kind)
+        ranges = [(0, size)]
+        
+        ids = criteria.get('Ids') or criteria.get('KeywordIds')
+        if ids:
+            numbers = sorted({i - base for i in ids if 0 <= i - base < size})
+            ranges = [(n, n + 1) for n in numbers]
+        
+        if kind != 'campaigns' and criteria.get('CampaignIds'):
+            span = self.groups * self._per_group(kind)
+            campaigns = sorted({i - CAMPAIGN_ID_BASE for i in criteria['CampaignIds']
+                                if 0 <= i - CAMPAIGN_ID_BASE < self.campaigns})
+            ranges = _intersect(ranges, [(c * span, (c + 1) * span) for c in campaigns])
+        
+        if kind in ('ads', 'keywords') and criteria.get('AdGroupIds'):
+            span = self._per_group(kind)
+            groups = sorted({i - AD_GROUP_ID_BASE for i in criteria['AdGroupIds']
+                             if 0 <= i - AD_GROUP_ID_BASE < self.sizes['adgroups']})
+            ranges = _intersect(ranges, [(g * span, (g + 1) * span) for g in groups])
+        
+        return ranges
+    
+    def objects(self, service: str, ranges: List[Tuple[int, int]],
+                offset: int, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Страница объектов
+        
+        Returns:
+            Кортеж (объекты страницы, всего подходящих объектов)
+        """
+        build = {
+            'campaigns': self.campaign,
+            'adgroups': self.ad_group,
+            'ads': self.ad,
+            'keywords': self.keyword,
+            'keywordbids': self.keyword_bids,
+        }[service]
+        
+        total = sum(stop - start for start, stop in ranges)
+        page = []
+        skip = offset
+        for start, stop in ranges:
+            if skip >= stop - start:
+                skip -= stop - start
+                continue
+            for n in range(start + skip, stop):
+                if len(page) >= limit:
+                    return page, total
+                page.append(build(n))
+            skip = 0
+        return page, total
+    
+    def campaign(self, n: int) -> Dict[str, Any]:
+        rng = self._rng(1, n)
+        clicks = rng.randint(0, 5000)
+        daily_budget = rng.choice((None, 500, 1000, 3000)) if rng.random() < 0.7 else None
+        return {
+            'Id': CAMPAIGN_ID_BASE + n,
+            'Name': f"Кампания {n + 1} | Поиск",
+            'Type': 'TEXT_CAMPAIGN',
+            'Status': rng.choice(_STATUSES),
+            'State': rng.choice(_STATES),
+            'StatusPayment': 'ALLOWED',
+            'StartDate': (date(2025, 1, 1) + timedelta(days=n % 365)).isoformat(),
+            'EndDate': None,
+            'Currency': 'RUB',
+            'Funds': {
+                'Mode': 'SHARED_ACCOUNT_FUNDS',
+                'SharedAccountFunds': {'Refund': 0, 'Spend': rng.randint(0, 10 ** 11)},
+            },
+            'Statistics': {'Clicks': clicks, 'Impressions': clicks * rng.randint(10, 60)},
+            'DailyBudget': {'Amount': daily_budget * 1_000_000, 'Mode': 'STANDARD'} if daily_budget else None,
+            'TextCampaign': {
+                'BiddingStrategy': {
+                    'Search': {'BiddingStrategyType': rng.choice(_STRATEGIES)},
+                    'Network': {'BiddingStrategyType': 'SERVING_OFF'},
+                },
+                'Settings': [{'Option': 'ADD_METRICA_TAG', 'Value': 'YES'}],
+                'CounterIds': {'Items': [rng.randint(10 ** 7, 10 ** 8)]},
+                'RelevantKeywords': None,
+            },
+        }
+    
+    def ad_group(self, n: int) -> Dict[str, Any]:
+        rng = self._rng(2, n)
+        return {
+            'Id': AD_GROUP_ID_BASE + n,
+            'Name': f"Группа {n + 1}",
+            'CampaignId': CAMPAIGN_ID_BASE + n // self.groups,
+            'NegativeKeywords': {'Items': ['бесплатно', 'скачать']} if rng.random() < 0.3 else None,
+            'NegativeKeywordSharedSetIds': None,
+            'RegionIds': [225],
+            'Type': 'TEXT_AD_GROUP',
+            'Subtype': 'NONE',
+            'Status': rng.choice(_STATUSES),
+            'ServingStatus': 'ELIGIBLE',
+        }
+    
+    def ad(self, n: int) -> Dict[str, Any]:
+        rng = self._rng(3, n)
+        group = n // self.ads
+        return {
+            'Id': AD_ID_BASE + n,
+            'AdGroupId': AD_GROUP_ID_BASE + group,
+            'CampaignId': CAMPAIGN_ID_BASE + group // self.groups,
+            'Type': 'TEXT_AD',
+            'Subtype': 'NONE',
+            'Status': rng.choice(_STATUSES),
+            'State': rng.choice(_STATES),
+            'StatusClarification': '',
+            'AdCategories': None,
+            'AgeLabel': None,
+            'TextAd': {
+                'Title': f"Объявление {n + 1}",
+                'Title2': 'Внедрение за 2 недели',
+                'Text': 'Автоматизируйте продажи и поддержку с AI-ассистентом',
+                'Href': f"https://dev-bot.su/?utm_content={n + 1}",
+                'Mobile': 'NO',
+                'DisplayDomain': 'dev-bot.su',
+                'DisplayUrlPath': None,
+                'VCardId': None,
+                'SitelinkSetId': None,
+                'AdImageHash': None,
+                'AdExtensions': [],
+            },
+        }
+    
+    def keyword(self, n: int) -> Dict[str, Any]:
+        rng = self._rng(4, n)
+        group = n // self.keywords
+        clicks = rng.randint(0, 300)
+        return {
+            'Id': KEYWORD_ID_BASE + n,
+            'AdGroupId': AD_GROUP_ID_BASE + group,
+            'CampaignId': CAMPAIGN_ID_BASE + group // self.groups,
+            'Keyword': f"{rng.choice(_WORDS)} {rng.choice(_WORDS)} {n + 1}",
+            'UserParam1': None,
+            'UserParam2': None,
+            'Bid': rng.randint(1, 300) * 100_000,
+            'ContextBid': rng.randint(1, 100) * 100_000,
+            'StrategyPriority': 'NORMAL',
+            'Status': rng.choice(_STATUSES),
+            'State': rng.choice(_STATES),
+            'Productivity': {'Value': round(rng.uniform(1, 10), 1), 'References': []},
+            'StatisticsSearch': {'Clicks': clicks, 'Impressions': clicks * rng.randint(5, 40)},
+            'StatisticsNetwork': {'Clicks': 0, 'Impressions': 0},
+        }
+    
+    def keyword_bids(self, n: int) -> Dict[str, Any]:
+        keyword = self.keyword(n)
+        rng = self._rng(5, n)
+        # Чем больше объем трафика, тем выше ставка торгов
+        price = rng.randint(5, 60) * 100_000
+        items = []
+        for volume in sorted(AUCTION_TRAFFIC_VOLUMES):
+            price = int(price * rng.uniform(1.05, 1.4)) // 10_000 * 10_000
+            items.append({'TrafficVolume': volume, 'Bid': price, 'Price': price * 9 // 10})
+        return {
+            'KeywordId': keyword['Id'],
+            'AdGroupId': keyword['AdGroupId'],
+            'CampaignId': keyword['CampaignId'],
+            'ServingStatus': 'ELIGIBLE',
+            'StrategyPriority': keyword['StrategyPriority'],
+            'Search': {
+                'Bid': keyword['Bid'],
+                'AuctionBids': {'AuctionBidItems': items[::-1]},
+            },
+        }
+
+
+def _intersect(left: List[Tuple[int, int]], right: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Пересечение двух упорядоченных списков отрезков"""
+    result = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        start = max(left[i][0], right[j][0])
+        stop = min(left[i][1], right[j][1])
+        if start < stop:
+            result.append((start, stop))
+        if left[i][1] < right[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def _project(item: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Оставляет поля из FieldNames и *FieldNames запроса"""
+    field_names = params.get('FieldNames')
+    projected = {key: item[key] for key in field_names if key in item} if field_names else dict(item)
+    for param, key in SUBTYPE_FIELD_PARAMS.items():
+        if params.get(param) and key in item:
+            projected[key] = {name: item[key].get(name) for name in params[param]}
+    return projected
+
+
+class FakeDirectServer:
+    """HTTP-сервер, имитирующий API Яндекс.Директ"""
+    
+    SERVICE_KEYS = {
+        'campaigns': 'Campaigns',
+        'adgroups': 'AdGroups',
+        'ads': 'Ads',
+        'keywords': 'Keywords',
+        'keywordbids': 'KeywordBids',
+    }
+    
+    def __init__(self, account: Optional[FakeAccount] = None,
+                 host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 latency: float = 0.0, latency_per_object: float = 0.0,
+                 error_rates: Optional[Dict[int, float]] = None,
+                 units_limit: int = 1_000_000,
+                 max_concurrent: int = 5,
+                 report_delay: float = 2.0, report_retry_in: int = 1,
+                 agency_clients: int = 3):
+        """
+        Args:
+            account: Синтетический аккаунт (по умолчанию - FakeAccount())
+            host: Адрес для прослушивания
+            port: Порт (0 - любой свободный, см. url после start)
+            latency: Задержка каждого ответа, сек
+            latency_per_object: Дополнительная задержка на каждый объект ответа, сек
+            error_rates: Вероятность случайной ошибки по кодам, например {1000: 0.01, 506: 0.005}
+            units_limit: Суточный лимит баллов каждого логина (при исчерпании - ошибка 152)
+            max_concurrent: Одновременных запросов на логин, сверх них - ошибка 506
+            report_delay: Время формирования офлайн-отчета, сек
+            report_retry_in: Значение заголовка retryIn, сек
+            agency_clients: Число клиентов в agencyclients.get
+        """
+        self.account = account or FakeAccount()
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_per_object = latency_per_object
+        self.error_rates = dict(error_rates or {})
+        self.units_limit = units_limit
+        self.max_concurrent = max_concurrent
+        self.report_delay = report_delay
+        self.report_retry_in = report_retry_in
+        self.agency_clients = agency_clients
+        
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[int, int] = {}
+        self._units_spent: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._reports: Dict[str, float] = {}
+        self._next_id = 90_000_000_000
+        self._rng = random.Random(self.account.seed)
+        
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        """Адрес API для YANDEX_DIRECT_API_URL или параметра api_url коннектора"""
+        return f"http://{self.host}:{self.port}/json/v5"
+    
+    def make_app(self) -> web.Application:
+        """aiohttp-приложение сервера"""
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/json/v5/reports', self._handle_report)
+        app.router.add_post('/json/v5/{service}', self._handle)
+        return app
+    
+    def reset_units(self) -> None:
+        """Восстановление баллов всех логинов (как в начале суток)"""
+        self._units_spent.clear()
+    
+    # Работа в фоновом потоке
+    
+    def start(self) -> 'FakeDirectServer':
+        """Запуск сервера в фоновом потоке (возврат после начала прослушивания)"""
+        started = threading.Event()
+        
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self.make_app(), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, self.host, self.port)
+            self._loop.run_until_complete(site.start())
+            self.port = self._runner.addresses[0][1]
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+        
+        self._thread = threading.Thread(target=run, name='fake-direct-api', daemon=True)
+        self._thread.start()
+        started.wait()
+        logger.info(f"Имитация API Яндекс.Директ запущена: {self.url}")
+        return self
+    
+    def stop(self) -> None:
+        """Остановка фонового сервера"""
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        self._loop = self._thread = None
+    
+    def __enter__(self) -> 'FakeDirectServer':
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+    
+    # Обработка запросов
+    
+    def _error(self, code: int, request_id: str, detail: str = '') -> web.Response:
+        self.errors[code] = self.errors.get(code, 0) + 1
+        return web.json_response({'error': {
+            'request_id': request_id,
+            'error_code': code,
+            'error_string': ERROR_STRINGS.get(code, 'Ошибка'),
+            'error_detail': detail,
+        }}, headers={'RequestId': request_id})
+    
+    def _injected_error(self) -> Optional[int]:
+        for code, rate in self.error_rates.items():
+            if rate and self._rng.random() < rate:
+                return code
+        return None
+    
+    async def _handle(self, request: web.Request) -> web.Response:
+        service = request.match_info['service']
+        request_id = str(self._rng.getrandbits(63))
+        
+        if not request.headers.get('Authorization', '').removeprefix('Bearer ').strip():
+            return self._error(53, request_id, 'Не указан OAuth-токен')
+        
+        body = json.loads(await request.read())
+        method = f"{service}.{body.get('method')}"
+        params = body.get('params') or {}
+        login = request.headers.get('Client-Login', '')
+        self.requests[method] = self.requests.get(method, 0) + 1
+        
+        if self._in_flight.get(login, 0) >= self.max_concurrent:
+            return self._error(506, request_id)
+        
+        self._in_flight[login] = self._in_flight.get(login, 0) + 1
+        try:
+            code = self._injected_error()
+            if code is not None:
+                await asyncio.sleep(self.latency)
+                return self._error(code, request_id, 'Ошибка смоделирована fake_server.py')
+            
+            result, objects = self._dispatch(service, body.get('method'), params, login)
+            if result is None:
+                return self._error(55, request_id, f"Метод {method} не поддерживается имитацией")
+            
+            cost = estimate_cost(method, objects)
+            spent = self._units_spent.get(login, 0)
+            if spent + cost > self.units_limit:
+                return self._error(152, request_id)
+            self._units_spent[login] = spent + cost
+            
+            await asyncio.sleep(self.latency + self.latency_per_object * objects)
+            
+            return web.Response(
+                body=json.dumps({'result': result}, ensure_ascii=False).encode('utf-8'),
+                content_type='application/json',
+                headers={
+                    'RequestId': request_id,
+                    'Units': f"{cost}/{self.units_limit - spent - cost}/{self.units_limit}",
+                    'Units-Used-Login': login or 'fake-agency',
+                }
+            )
+        finally:
+            self._in_flight[login] -= 1
+    
+    def _dispatch(self, service: str, operation: str, params: Dict[str, Any],
+                  login: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Результат операции и число объектов для расчета баллов"""
+        if operation == 'get' and service in self.SERVICE_KEYS:
+            page = params.get('Page') or {}
+            offset = page.get('Offset', 0)
+            limit = page.get('Limit', 10000)
+            ranges = self.account.select(service, params.get('SelectionCriteria') or {})
+            items, total = self.account.objects(service, ranges, offset, limit)
+            result = {self.SERVICE_KEYS[service]: [_project(item, params) for item in items]}
+            if offset + len(items) < total:
+                result['LimitedBy'] = offset + len(items)
+            return result, len(items)
+        
+        if operation == 'get' and service == 'clients':
+            return {'Clients': [{
+                'Login': login or 'fake-client',
+                'ClientId': 1,
+                'Currency': 'RUB',
+                'ClientInfo': 'Имитация API',
+            }]}, 0
+        
+        if operation == 'get' and service == 'agencyclients':
+            page = params.get('Page') or {}
+            offset = page.get('Offset', 0)
+            limit = page.get('Limit', 10000)
+            clients = [
+                {'Login': f"fake-client-{i + 1}", 'ClientId': i + 1, 'ClientInfo': f"Клиент {i + 1}",
+                 'Currency': 'RUB', 'Archived': 'NO'}
+                for i in range(offset, min(offset + limit, self.agency_clients))
+            ]
+            result = {'Clients': clients}
+            if offset + len(clients) < self.agency_clients:
+                result['LimitedBy'] = offset + len(clients)
+            return result, 0
+        
+        if service == 'changes':
+            timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            if operation == 'checkCampaigns':
+                return {'Campaigns': [], 'Timestamp': timestamp}, 0
+            if operation == 'check':
+                return {'Modified': {}, 'NotFound': {}, 'Unprocessed': {}, 'Timestamp': timestamp}, 0
+            if operation == 'checkDictionaries':
+                return {'Timestamp': timestamp, 'RegionsChanged': 'NO', 'TimeZonesChanged': 'NO'}, 0
+        
+        if operation in ('add', 'update', 'set'):
+            items = next((value for value in params.values() if isinstance(value, list)), [])
+            results = []
+            for item in items:
+                if operation == 'add':
+                    self._next_id += 1
+                    results.append({'Id': self._next_id})
+                else:
+                    results.append({key: item[key] for key in ('Id', 'KeywordId', 'AdGroupId', 'CampaignId')
+                                    if key in item})
+            key = {'add': 'AddResults', 'update': 'UpdateResults', 'set': 'SetResults'}[operation]
+            return {key: results}, len(items)
+        
+        return None, 0
+    
+    async def _handle_report(self, request: web.Request) -> web.StreamResponse:
+        """Офлайн-отчет: 201 при постановке в очередь, 202 пока формируется, затем TSV"""
+        params = (await request.json()).get('params') or {}
+        name = params.get('ReportName', '')
+        self.requests['reports'] = self.requests.get('reports', 0) + 1
+        
+        queued = self._reports.get(name)
+        if queued is None:
+            self._reports[name] = time.monotonic()
+            return web.Response(status=201, headers={'retryIn': str(self.report_retry_in)})
+        if time.monotonic() - queued < self.report_delay:
+            return web.Response(status=202, headers={'retryIn': str(self.report_retry_in)})
+        
+        response = web.StreamResponse(headers={'Content-Type': 'text/tab-separated-values; charset=utf-8'})
+        await response.prepare(request)
+        
+        field_names = params.get('FieldNames') or ['Date', 'Impressions', 'Clicks', 'Cost']
+        lines = []
+        if request.headers.get('skipColumnHeader', 'false') != 'true':
+            lines.append('\t'.join(field_names))
+        for row in self._report_rows(params):
+            lines.append('\t'.join(str(row.get(field, '--')) for field in field_names))
+            if len(lines) >= 10000:
+                await response.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                lines = []
+        if lines:
+            await response.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        await response.write_eof()
+        return response
+    
+    def _report_rows(self, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Строки отчета: по дням и кампаниям (AD_PERFORMANCE_REPORT - по объявлениям)"""
+        criteria = params.get('SelectionCriteria') or {}
+        date_from = date.fromisoformat(criteria.get('DateFrom', date.today().isoformat()))
+        date_to = date.fromisoformat(criteria.get('DateTo', date.today().isoformat()))
+        
+        campaign_ids = None
+        for condition in criteria.get('Filter') or []:
+            if condition.get('Field') == 'CampaignId':
+                campaign_ids = [int(value) for value in condition.get('Values', [])]
+        campaign_ranges = self.account.select('campaigns', {'Ids': campaign_ids} if campaign_ids else {})
+        
+        by_ads = params.get('ReportType') == 'AD_PERFORMANCE_REPORT'
+        ads_per_campaign = self.account.groups * self.account.ads
+        
+        day = date_from
+        while day <= date_to:
+            for start, stop in campaign_ranges:
+                for n in range(start, stop):
+                    objects = range(n * ads_per_campaign, (n + 1) * ads_per_campaign) if by_ads else (n,)
+                    for m in objects:
+                        yield self._report_row(day, n, m if by_ads else None)
+            day += timedelta(days=1)
+    
+    def _report_row(self, day: date, campaign: int, ad: Optional[int]) -> Dict[str, Any]:
+        rng = self.account._rng(5, day.toordinal() * 1_000_003 + (campaign if ad is None else ad))
+        impressions = rng.randint(0, 2000)
+        clicks = rng.randint(0, impressions // 10) if impressions else 0
+        cost = round(clicks * rng.uniform(5, 60), 2)
+        conversions = rng.randint(0, clicks // 10) if clicks >= 10 else None
+        row = {
+            'Date': day.isoformat(),
+            'CampaignId': CAMPAIGN_ID_BASE + campaign,
+            'CampaignName': f"Кампания {campaign + 1} | Поиск",
+            'Impressions': impressions,
+            'Clicks': clicks,
+            'Cost': cost,
+            'Ctr': round(clicks / impressions * 100, 2) if impressions else '--',
+            'AvgCpc': round(cost / clicks, 2) if clicks else '--',
+            'Conversions': conversions if conversions is not None else '--',
+        }
+        if ad is not None:
+            row['AdGroupId'] = AD_GROUP_ID_BASE + ad // self.account.ads
+            row['AdId'] = AD_ID_BASE + ad
+        return row
+    
+    def serve_forever(self) -> None:
+        """Запуск в текущем потоке до Ctrl+C"""
+        print(f"Имитация API Яндекс.Директ: {self.url}")
+        print(f"Объектов: {self.account.sizes}")
+        web.run_app(self.make_app(), host=self.host, port=self.port, print=None, access_log=None)
+
+
+def benchmark(server: FakeDirectServer, use_async: bool = False) -> Dict[str, Any]:
+    """
+    Замер скорости DataCollector.collect_all_data на запущенном сервере
+    
+    Returns:
+        Время, число объектов, объектов в секунду и сводка метрик по методам
+    """
+    from connector import YandexDirectConnector
+    from data_collector import DataCollector
+    from metrics import ConnectorMetrics
+    
+    metrics = ConnectorMetrics()
+    if use_async:
+        from async_connector import AsyncYandexDirectConnector
+        connector = AsyncYandexDirectConnector(token='fake', metrics=metrics, api_url=server.url)
+    else:
+        connector = YandexDirectConnector(token='fake', metrics=metrics, api_url=server.url)
+    collector = DataCollector(connector)
+    
+    started = time.monotonic()
+    data = collector.collect_all_data()
+    elapsed = time.monotonic() - started
+    
+    objects = sum(len(data.get(key, [])) for key in ('campaigns', 'ad_groups', 'ads', 'keywords'))
+    return {
+        'elapsed': round(elapsed, 3),
+        'objects': objects,
+        'objects_per_second': round(objects / elapsed) if elapsed else 0,
+        'methods': metrics.summary(),
+    }
+
+
+def main():
+    """Запуск сервера из командной строки"""
+    parser = argparse.ArgumentParser(description='Локальная имитация API Яндекс.Директ')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--campaigns', type=int, default=10, help='Число кампаний')
+    parser.add_argument('--groups', type=int, default=10, help='Групп в кампании')
+    parser.add_argument('--ads', type=int, default=3, help='Объявлений в группе')
+    parser.add_argument('--keywords', type=int, default=20, help='Ключевых слов в группе')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа, сек')
+    parser.add_argument('--latency-per-object', type=float, default=0.0, help='Задержка на объект, сек')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Доля ответов с ошибкой 1000')
+    parser.add_argument('--units-limit', type=int, default=1_000_000, help='Суточный лимит баллов')
+    parser.add_argument('--max-concurrent', type=int, default=5, help='Одновременных запросов на логин')
+    parser.add_argument('--report-delay', type=float, default=2.0, help='Время формирования отчета, сек')
+    parser.add_argument('--benchmark', action='store_true', help='Замерить сбор данных и выйти')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Замер асинхронным коннектором')
+    args = parser.parse_args()
+    
+    server = FakeDirectServer(
+        FakeAccount(args.campaigns, args.groups, args.ads, args.keywords, args.seed),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        latency_per_object=args.latency_per_object,
+        error_rates={1000: args.error_rate},
+        units_limit=args.units_limit,
+        max_concurrent=args.max_concurrent,
+        report_delay=args.report_delay
+    )
+    
+    if not args.benchmark:
+        server.serve_forever()
+        return
+    
+    server.port = 0
+    with server:
+        result = benchmark(server, use_async=args.use_async)
+    
+    print(f"\nОбъектов: {result['objects']} за {result['elapsed']} с "
+          f"({result['objects_per_second']} объектов/с)")
+    for row in result['methods']:
+        print(f"  {row['method']}: {row['requests']} запросов, {row['latency_sum']:.2f} с "
+              f"({row['share']:.0%}), {row['units']} баллов, {row['response_bytes']} байт")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Наборы запрашиваемых полей (FieldNames) для get-методов API Яндекс.Директ
+
+Поля объекта задаются параметром FieldNames, а поля вложенных структур -
+отдельными параметрами (TextCampaignFieldNames, TextAdFieldNames, ...).
+Набор полей описывается словарем таких параметров, например
+{'FieldNames': ['Id', 'Name'], 'TextAdFieldNames': ['Title']}.
+
+Профили:
+    minimal  - идентификаторы, названия и статусы (проверки, списки);
+    analysis - поля, нужные для анализа стратегии, ставок и статистики;
+    full     - все основные поля (по умолчанию).
+"""
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+
+FieldSpec = Dict[str, List[str]]
+Fields = Union[None, str, List[str], Mapping[str, Iterable[str]]]
+
+# Объекты, для которых заданы профили
+ENTITIES = ('campaigns', 'ad_groups', 'ads', 'keywords')
+
+FIELD_PROFILES: Dict[str, Dict[str, FieldSpec]] = {
+    'minimal': {
+        'campaigns': {'FieldNames': ['Id', 'Name', 'Status']},
+        'ad_groups': {'FieldNames': ['Id', 'Name', 'CampaignId', 'Status']},
+        'ads': {'FieldNames': ['Id', 'AdGroupId', 'CampaignId', 'Status']},
+        'keywords': {'FieldNames': ['Id', 'Keyword', 'AdGroupId', 'CampaignId', 'Status']},
+    },
+    'analysis': {
+        'campaigns': {
+            'FieldNames': ['Id', 'Name', 'Type', 'Status', 'State', 'StatusPayment',
+                           'Currency', 'Funds', 'DailyBudget', 'Statistics'],
+            'TextCampaignFieldNames': ['BiddingStrategy'],
+        },
+        'ad_groups': {'FieldNames': ['Id', 'Name', 'CampaignId', 'Type', 'Status', 'ServingStatus']},
+        'ads': {'FieldNames': ['Id', 'AdGroupId', 'CampaignId', 'Type', 'Status', 'State']},
+        'keywords': {
+            'FieldNames': ['Id', 'Keyword', 'AdGroupId', 'CampaignId', 'Status', 'State',
+                           'Bid', 'ContextBid', 'Productivity', 'StatisticsSearch', 'StatisticsNetwork'],
+        },
+    },
+    'full': {
+        'campaigns': {
+            'FieldNames': ['Id', 'Name', 'Type', 'Status', 'State', 'StatusPayment',
+                           'StartDate', 'EndDate', 'Currency', 'Funds', 'Statistics', 'DailyBudget'],
+            'TextCampaignFieldNames': ['BiddingStrategy', 'Settings', 'CounterIds', 'RelevantKeywords'],
+        },
+        'ad_groups': {
+            'FieldNames': ['Id', 'Name', 'CampaignId', 'NegativeKeywords', 'NegativeKeywordSharedSetIds',
+                           'RegionIds', 'Type', 'Subtype', 'Status', 'ServingStatus'],
+        },
+        'ads': {
+            'FieldNames': ['Id', 'AdGroupId', 'CampaignId', 'Type', 'Subtype', 'Status',
+                           'State', 'StatusClarification', 'AdCategories', 'AgeLabel'],
+            'TextAdFieldNames': ['Title', 'Title2', 'Text', 'Href', 'Mobile', 'DisplayDomain',
+                                 'DisplayUrlPath', 'VCardId', 'SitelinkSetId', 'AdImageHash', 'AdExtensions'],
+            'TextImageAdFieldNames': ['AdImageHash', 'Href'],
+            'MobileAppAdFieldNames': ['Title', 'Text', 'TrackingUrl', 'Action', 'AdImageHash', 'Features'],
+            'DynamicTextAdFieldNames': ['Text', 'VCardId', 'SitelinkSetId', 'AdImageHash', 'AdExtensions'],
+            'TextAdBuilderAdFieldNames': ['Creative', 'Href'],
+        },
+        'keywords': {
+            'FieldNames': ['Id', 'AdGroupId', 'CampaignId', 'Keyword', 'UserParam1', 'UserParam2',
+                           'Bid', 'ContextBid', 'StrategyPriority', 'Status', 'State',
+                           'Productivity', 'StatisticsSearch', 'StatisticsNetwork'],
+        },
+    },
+}
+
+DEFAULT_PROFILE = 'full'
+
+
+def merge_fields(*specs: Optional[Mapping[str, Iterable[str]]]) -> FieldSpec:
+    """
+    Объединение наборов полей (порядок полей сохраняется, повторы убираются)
+    
+    Returns:
+        Набор, содержащий поля всех переданных наборов
+    """
+    merged: FieldSpec = {}
+    for spec in specs:
+        for param, names in (spec or {}).items():
+            target = merged.setdefault(param, [])
+            for name in names:
+                if name not in target:
+                    target.append(name)
+    return merged
+
+
+def resolve_fields(entity: str, fields: Fields = None) -> FieldSpec:
+    """
+    Параметры *FieldNames запроса для объекта
+    
+    Args:
+        entity: 'campaigns', 'ad_groups', 'ads' или 'keywords'
+        fields: Имя профиля, список FieldNames или словарь параметров *FieldNames
+            (None - профиль по умолчанию)
+    
+    Returns:
+        Словарь параметров для подстановки в params запроса
+    
+    Raises:
+        ValueError: если профиль неизвестен
+    """
+    if fields is None:
+        fields = DEFAULT_PROFILE
+    
+    if isinstance(fields, str):
+        if fields not in FIELD_PROFILES:
+            raise ValueError(f"Неизвестный профиль полей: {fields}. Доступны: {', '.join(FIELD_PROFILES)}")
+        return merge_fields(FIELD_PROFILES[fields][entity])
+    
+    if isinstance(fields, Mapping):
+        return merge_fields(fields)
+    
+    return {'FieldNames': list(fields)}
+
+
+def resolve_requirements(fields: Union[None, str, Mapping[str, Fields]] = None) -> Dict[str, FieldSpec]:
+    """
+    Наборы полей для всех объектов
+    
+    Args:
+        fields: Имя профиля или словарь {объект: поля} (для объектов, которых
+            нет в словаре, берется профиль по умолчанию)
+    
+    Returns:
+        Словарь {объект: набор полей}
+    """
+    if fields is None or isinstance(fields, str):
+        return {entity: resolve_fields(entity, fields) for entity in ENTITIES}
+    return {entity: resolve_fields(entity, fields.get(entity)) for entity in ENTITIES}
+
+
+def merge_requirements(*requirements: Optional[Mapping[str, Mapping[str, Iterable[str]]]]) -> Dict[str, FieldSpec]:
+    """
+    Объединение заявленных потребителями полей по объектам
+    
+    Returns:
+        Словарь {объект: объединенный набор полей} (только упомянутые объекты)
+    """
+    merged: Dict[str, FieldSpec] = {}
+    for requirement in requirements:
+        for entity, spec in (requirement or {}).items():
+            merged[entity] = merge_fields(merged.get(entity), spec)
+    return merged
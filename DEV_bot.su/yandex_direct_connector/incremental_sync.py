@@ -0,0 +1,222 @@
+"""
+Инкрементальная синхронизация данных Яндекс.Директ через сервис Changes
+
+Вместо полного сбора аккаунта запрашиваются только изменения с момента
+предыдущего снимка (changes.checkCampaigns / changes.check), после чего
+перезагружаются лишь измененные кампании, группы, объявления и ключевые
+слова, и они накладываются на последний сохраненный снимок.
+"""
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Максимальное число кампаний в одном запросе changes.check
+CHANGES_CAMPAIGN_IDS_LIMIT = 3000
+
+SNAPSHOT_PATTERN = 'yandex_direct_data_*.json'
+
+
+def _upsert(items: List[Dict], fresh: List[Dict], requested_ids: Set[int]) -> List[Dict]:
+    """
+    Замена объектов свежими версиями по Id
+    
+    Объекты, которые запрашивались, но не вернулись из API, считаются удаленными.
+    Новые объекты добавляются в конец, порядок остальных сохраняется.
+    """
+    fresh_by_id = {item['Id']: item for item in fresh}
+    result = []
+    for item in items:
+        item_id = item.get('Id')
+        if item_id in fresh_by_id:
+            result.append(fresh_by_id.pop(item_id))
+        elif item_id not in requested_ids:
+            result.append(item)
+    result.extend(fresh_by_id.values())
+    return result
+
+
+def _replace_children(items: List[Dict], parent_key: str, parent_ids: Set[int],
+                      fresh: Iterable[Dict] = ()) -> List[Dict]:
+    """Замена всех дочерних объектов указанных родителей свежим списком"""
+    kept = [item for item in items if item.get(parent_key) not in parent_ids]
+    kept.extend(fresh)
+    return kept
+
+
+class IncrementalSync:
+    """Инкрементальное обновление снимка данных по сервису Changes"""
+    
+    def __init__(self, collector):
+        """
+        Args:
+            collector: Экземпляр DataCollector с синхронным коннектором
+        """
+        if collector.is_async:
+            raise ValueError("Инкрементальная синхронизация требует синхронного YandexDirectConnector")
+        
+        self.collector = collector
+        self.connector = collector.connector
+        self.fields = collector.fields
+    
+    def find_latest_snapshot(self) -> Optional[Path]:
+        """Путь к последнему сохраненному снимку в data/"""
+        snapshots = sorted(self.collector.data_dir.glob(SNAPSHOT_PATTERN))
+        return snapshots[-1] if snapshots else None
+    
+    def load_latest_snapshot(self) -> Optional[Dict]:
+        """Последний сохраненный снимок или None"""
+        path = self.find_latest_snapshot()
+        if path is None:
+            return None
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        
+        logger.info(f"Базовый снимок: {path.name}")
+        return snapshot
+    
+    def full_sync(self, campaign_ids: Optional[List[int]] = None) -> Dict:
+        """
+        Полный сбор данных с меткой времени для последующих инкрементальных обновлений
+        
+        Метка берется до начала сбора, чтобы не потерять изменения, сделанные во время него.
+        """
+        timestamp = self.connector.get_changes_timestamp()
+        data = self.collector.collect_all_data(campaign_ids=campaign_ids)
+        data['sync_timestamp'] = timestamp
+        return data
+    
+    def sync(self, snapshot: Optional[Dict] = None) -> Dict:
+        """
+        Обновление снимка только по изменившимся объектам
+        
+        Args:
+            snapshot: Базовый снимок (если None - последний файл из data/).
+                Без снимка или без sync_timestamp выполняется полный сбор.
+        
+        Returns:
+            Новый снимок с обновленной sync_timestamp и статистикой sync_stats
+        """
+        if snapshot is None:
+            snapshot = self.load_latest_snapshot()
+        
+        if not snapshot or not snapshot.get('sync_timestamp'):
+            logger.info("Базовый снимок без метки синхронизации, выполняется полный сбор")
+            return self.full_sync()
+        
+        since = snapshot['sync_timestamp']
+        changes = self.connector.check_campaigns_changes(since)
+        
+        self_ids, children_ids = [], []
+        for item in changes.get('Campaigns', []):
+            changes_in = item.get('ChangesIn', [])
+            if 'SELF' in changes_in:
+                self_ids.append(item['CampaignId'])
+            if 'CHILDREN' in changes_in:
+                children_ids.append(item['CampaignId'])
+        
+        data = dict(snapshot)
+        for key in ('campaigns', 'ad_groups', 'ads', 'keywords'):
+            data[key] = list(snapshot.get(key, []))
+        
+        stats = {
+            'since': since,
+            'campaigns': 0,
+            'ad_groups': 0,
+            'ads': 0,
+            'keywords': 0
+        }
+        
+        if self_ids:
+            self._patch_campaigns(data, self_ids, stats)
+        
+        if children_ids:
+            self._patch_children(data, since, children_ids, stats)
+        
+        data['timestamp'] = datetime.now().isoformat()
+        data['sync_timestamp'] = changes.get('Timestamp', since)
+        data['sync_stats'] = stats
+        
+        logger.info(
+            f"Инкрементальная синхронизация: кампаний {stats['campaigns']}, групп {stats['ad_groups']}, "
+            f"объявлений {stats['ads']}, ключевых слов {stats['keywords']}"
+        )
+        return data
+    
+    def _patch_campaigns(self, data: Dict, campaign_ids: List[int], stats: Dict) -> None:
+        """Перезагрузка измененных кампаний; удаленные убираются вместе с дочерними объектами"""
+        fresh = self.connector.get_campaigns(campaign_ids=campaign_ids, field_names=self.fields['campaigns'])
+        requested = set(campaign_ids)
+        data['campaigns'] = _upsert(data['campaigns'], fresh, requested)
+        stats['campaigns'] += len(fresh)
+        
+        removed = requested - {c['Id'] for c in fresh}
+        if removed:
+            for key in ('ad_groups', 'ads', 'keywords'):
+                data[key] = _replace_children(data[key], 'CampaignId', removed)
+    
+    def _patch_children(self, data: Dict, since: str, campaign_ids: List[int], stats: Dict) -> None:
+        """Перезагрузка измененных групп, объявлений и ключевых слов кампаний"""
+        modified_groups: Set[int] = set()
+        modified_ads: Set[int] = set()
+        unprocessed: List[int] = []
+        
+        for i in range(0, len(campaign_ids), CHANGES_CAMPAIGN_IDS_LIMIT):
+            result = self.connector.check_changes(
+                since,
+                campaign_ids=campaign_ids[i:i + CHANGES_CAMPAIGN_IDS_LIMIT],
+                field_names=['AdGroupIds', 'AdIds']
+            )
+            modified = result.get('Modified', {})
+            modified_groups.update(modified.get('AdGroupIds', []))
+            modified_ads.update(modified.get('AdIds', []))
+            unprocessed.extend(result.get('Unprocessed', {}).get('CampaignIds', []))
+        
+        if unprocessed:
+            # Слишком много изменений - кампании перезагружаются целиком
+            self._reload_campaign_children(data, unprocessed, stats)
+            reloaded = set(unprocessed)
+            reloaded_groups = {g['Id'] for g in data['ad_groups'] if g.get('CampaignId') in reloaded}
+            modified_groups -= reloaded_groups
+        
+        if modified_groups:
+            group_ids = sorted(modified_groups)
+            fresh_groups = self.connector.get_ad_groups(ad_group_ids=group_ids, field_names=self.fields['ad_groups'])
+            data['ad_groups'] = _upsert(data['ad_groups'], fresh_groups, modified_groups)
+            stats['ad_groups'] += len(fresh_groups)
+            
+            # Изменения ключевых фраз отражаются как изменения группы
+            fresh_keywords = []
+            if fresh_groups:
+                fresh_keywords = self.connector.get_keywords(ad_group_ids=group_ids, field_names=self.fields['keywords'])
+            data['keywords'] = _replace_children(data['keywords'], 'AdGroupId', modified_groups, fresh_keywords)
+            stats['keywords'] += len(fresh_keywords)
+            
+            removed_groups = modified_groups - {g['Id'] for g in fresh_groups}
+            if removed_groups:
+                data['ads'] = _replace_children(data['ads'], 'AdGroupId', removed_groups)
+        
+        if modified_ads:
+            fresh_ads = self.connector.get_ads(ad_ids=sorted(modified_ads), field_names=self.fields['ads'])
+            data['ads'] = _upsert(data['ads'], fresh_ads, modified_ads)
+            stats['ads'] += len(fresh_ads)
+    
+    def _reload_campaign_children(self, data: Dict, campaign_ids: List[int], stats: Dict) -> None:
+        """Полная перезагрузка групп, объявлений и ключевых слов кампаний"""
+        reloaded = set(campaign_ids)
+        ad_groups = self.connector.get_ad_groups(campaign_ids=campaign_ids, field_names=self.fields['ad_groups'])
+        group_ids = [ag['Id'] for ag in ad_groups]
+        ads = self.connector.get_ads(ad_group_ids=group_ids, field_names=self.fields['ads']) if group_ids else []
+        keywords = self.connector.get_keywords(ad_group_ids=group_ids, field_names=self.fields['keywords']) if group_ids else []
+        
+        data['ad_groups'] = _replace_children(data['ad_groups'], 'CampaignId', reloaded, ad_groups)
+        data['ads'] = _replace_children(data['ads'], 'CampaignId', reloaded, ads)
+        data['keywords'] = _replace_children(data['keywords'], 'CampaignId', reloaded, keywords)
+        
+        stats['ad_groups'] += len(ad_groups)
+        stats['ads'] += len(ads)
+        stats['keywords'] += len(keywords)
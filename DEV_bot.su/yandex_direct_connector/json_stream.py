@@ -0,0 +1,189 @@
+"""
+Потоковый разбор больших JSON-ответов API Яндекс.Директ
+
+Ответ get-метода выглядит как {"result": {"Ads": [...], "LimitedBy": N}}.
+Вместо json() по всему телу декодер получает ответ кусками, находит массив
+объектов по ключу результата и отдает объекты по одному, как только объект
+пришел целиком. Полностью в памяти одновременно находятся только текущий
+кусок ответа и уже отданные объекты, а ненужные поля отбрасываются сразу
+при разборе. Если установлен orjson, объекты декодируются им.
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson не обязателен
+    orjson = None
+
+# Размер куска при чтении ответа, байт
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Структурные символы вне строк и символы, важные внутри строк
+_STRUCTURE = re.compile(rb'[{}"]')
+_STRING = re.compile(rb'["\\]')
+_WHITESPACE = b' \t\r\n,'
+
+
+def loads(data: bytes) -> Any:
+    """Декодирование JSON (orjson, если доступен)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class StreamingItemsDecoder:
+    """
+    Инкрементальный разбор ответа с массивом объектов
+    
+    Пример:
+        decoder = StreamingItemsDecoder('Ads', keep={'Id', 'Status'})
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            for ad in decoder.feed(chunk):
+                ...
+        response_json = decoder.close()  # ответ без объектов: LimitedBy, error
+    """
+    
+    def __init__(self, result_key: str, keep: Optional[Iterable[str]] = None):
+        """
+        Args:
+            result_key: Ключ массива объектов в result ('Campaigns', 'Ads', ...)
+            keep: Поля объектов, которые нужно оставить (None - все)
+        """
+        self.result_key = result_key
+        self.keep = set(keep) if keep is not None else None
+        self._array_start = re.compile(rb'"' + re.escape(result_key.encode()) + rb'"\s*:\s*\[')
+        self.reset()
+    
+    def reset(self) -> None:
+        """Сброс состояния (перед повторной попыткой запроса)"""
+        self.items = 0
+        self.bytes = 0
+        self.result: Optional[Dict[str, Any]] = None
+        
+        self._phase = 'prefix'
+        self._head = bytearray()
+        self._buffer = bytearray()
+        self._pos = 0
+        self._object_start = -1
+        self._depth = 0
+        self._in_string = False
+    
+    def _project(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        if self.keep is None:
+            return item
+        return {key: value for key, value in item.items() if key in self.keep}
+    
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """
+        Обработка очередного куска ответа
+        
+        Args:
+            chunk: Байты ответа
+        
+        Returns:
+            Объекты, полностью пришедшие к этому моменту
+        """
+        self.bytes += len(chunk)
+        
+        if self._phase == 'prefix':
+            self._head += chunk
+            match = self._array_start.search(self._head)
+            if not match:
+                return []
+            self._buffer = self._head[match.end():]
+            del self._head[match.end():]
+            self._phase = 'array'
+        elif self._phase == 'array':
+            self._buffer += chunk
+        else:
+            self._buffer += chunk
+            return []
+        
+        return self._scan()
+    
+    def _scan(self) -> List[Dict[str, Any]]:
+        """Выделение завершенных объектов из буфера"""
+        buffer = self._buffer
+        size = len(buffer)
+        pos = self._pos
+        found = []
+        
+        while True:
+            if self._object_start < 0:
+                while pos < size and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos >= size:
+                    break
+                if buffer[pos] == ord(']'):
+                    self._phase = 'suffix'
+                    pos += 1
+                    break
+                if buffer[pos] != ord('{'):
+                    raise ValueError(f"Ожидался объект в массиве {self.result_key}")
+                self._object_start = pos
+                self._depth = 0
+            
+            if self._in_string:
+                match = _STRING.search(buffer, pos)
+                if match is None:
+                    # Экранирующий символ мог оказаться последним в куске
+                    pos = max(pos, size)
+                    break
+                if match.group() == b'\\':
+                    pos = match.end() + 1
+                    continue
+                self._in_string = False
+                pos = match.end()
+                continue
+            
+            match = _STRUCTURE.search(buffer, pos)
+            if match is None:
+                pos = size
+                break
+            pos = match.end()
+            char = match.group()
+            if char == b'"':
+                self._in_string = True
+            elif char == b'{':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    item = loads(bytes(buffer[self._object_start:pos]))
+                    found.append(self._project(item))
+                    self._object_start = -1
+        
+        # Отбрасываем разобранную часть буфера
+        consumed = self._object_start if self._object_start >= 0 else pos
+        if consumed:
+            del buffer[:consumed]
+            pos -= consumed
+            if self._object_start >= 0:
+                self._object_start = 0
+        self._pos = pos
+        self.items += len(found)
+        return found
+    
+    def close(self) -> Dict[str, Any]:
+        """
+        Завершение разбора
+        
+        Returns:
+            Ответ API без объектов массива (result с пустым списком, либо error)
+        
+        Raises:
+            ValueError: если ответ оборван посреди массива
+        """
+        if self._phase == 'prefix':
+            document = loads(bytes(self._head)) if self._head.strip() else {}
+        elif self._phase == 'array':
+            raise ValueError(f"Ответ оборван: массив {self.result_key} не завершен")
+        else:
+            document = loads(bytes(self._head) + b']' + bytes(self._buffer[self._pos:]))
+        
+        self._head = bytearray()
+        self._buffer = bytearray()
+        self.result = document
+        return document
@@ -0,0 +1,354 @@
+"""
+Аналитика эффективности ключевых слов на массивах NumPy
+
+Ключевые слова из collect_all_data один раз раскладываются по столбцам
+(KeywordArrays), после чего распределения ставок, CTR и CPC по кампаниям и
+выбросы по продуктивности считаются векторными операциями: группировка по
+кампаниям - через сортировку и np.bincount, без циклов по объектам.
+
+Статистика keywords.get (StatisticsSearch, StatisticsNetwork) содержит только
+показы и клики, поэтому CPC считается, если передан отчет
+CRITERIA_PERFORMANCE_REPORT с колонками CriterionId, Clicks и Cost.
+"""
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+# Модули, общие для коннекторов Директа и Метрики (column_snapshot)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'shared'))
+
+from column_snapshot import ColumnSnapshot
+
+# Ставки в API передаются в микроединицах валюты
+MICROS = 1_000_000
+
+# Квантили ставок и CTR/CPC по кампаниям
+BID_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+DISTRIBUTION_QUANTILES = (0.25, 0.5, 0.75, 0.9)
+
+# Число равнонаполненных интервалов гистограммы ставок
+BID_HISTOGRAM_BINS = 10
+
+# Порог выброса: отклонение продуктивности от медианы кампании в единицах MAD
+PRODUCTIVITY_OUTLIER_THRESHOLD = 3.0
+
+# Поля ключевых слов, которые читает аналитика (передаются в DataCollector(fields=...))
+REQUIRED_FIELDS = {
+    'keywords': {
+        'FieldNames': ['Id', 'AdGroupId', 'CampaignId', 'Keyword', 'Bid', 'ContextBid',
+                       'Productivity', 'StatisticsSearch', 'StatisticsNetwork']
+    }
+}
+
+
+def _nested(item: Dict, key: str, field: str, default: Any = 0) -> Any:
+    value = (item.get(key) or {}).get(field)
+    return default if value is None else value
+
+
+class KeywordArrays:
+    """Столбцы ключевых слов: идентификаторы, ставки, продуктивность и статистика"""
+    
+    def __init__(self, keywords: List[Dict]):
+        """
+        Args:
+            keywords: Ключевые слова (формат keywords.get)
+        """
+        count = len(keywords)
+        
+        def column(field: str, dtype, default: Any = 0) -> np.ndarray:
+            key, _, nested = field.partition('.')
+            if nested:
+                values = (_nested(kw, key, nested, default) for kw in keywords)
+            else:
+                values = (kw.get(key) or default for kw in keywords)
+            return np.fromiter(values, dtype=dtype, count=count)
+        
+        self.keywords = keywords
+        self._snapshot: Optional[ColumnSnapshot] = None
+        self._fill(column)
+    
+    @classmethod
+    def from_snapshot(cls, snapshot: ColumnSnapshot) -> 'KeywordArrays':
+        """
+        Столбцы из колоночного снимка (column_snapshot.py)
+        
+        Читаются только столбцы, нужные аналитике; тексты ключевых слов -
+        по одному для попавших в результат (см. keyword).
+        """
+        count = snapshot.rows('keywords')
+        stored = set(snapshot.columns('keywords'))
+        
+        def column(field: str, dtype, default: Any = 0) -> np.ndarray:
+            if field not in stored:
+                return np.full(count, default, dtype=dtype)
+            values = snapshot.column('keywords', field)
+            return np.where(snapshot.valid('keywords', field), values, default).astype(dtype)
+        
+        arrays = cls([])
+        arrays._snapshot = snapshot
+        arrays._fill(column)
+        return arrays
+    
+    def _fill(self, column: Callable[..., np.ndarray]) -> None:
+        """Заполнение столбцов: column(поле, dtype, значение по умолчанию)"""
+        self.ids = column('Id', np.int64)
+        self.campaign_ids = column('CampaignId', np.int64)
+        self.bids = column('Bid', np.float64) / MICROS
+        self.context_bids = column('ContextBid', np.float64) / MICROS
+        self.productivity = column('Productivity.Value', np.float64, np.nan)
+        self.impressions = (column('StatisticsSearch.Impressions', np.int64)
+                            + column('StatisticsNetwork.Impressions', np.int64))
+        self.clicks = (column('StatisticsSearch.Clicks', np.int64)
+                       + column('StatisticsNetwork.Clicks', np.int64))
+        
+        # Данные отчета (attach_report): расход и клики за период отчета
+        self.cost: Optional[np.ndarray] = None
+        self.report_clicks: Optional[np.ndarray] = None
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def attach_report(self, report: Dict[str, Any]) -> 'KeywordArrays':
+        """
+        Расход и клики ключевых слов из отчета CRITERIA_PERFORMANCE_REPORT
+        
+        Строки отчета (например, по дням) суммируются по CriterionId.
+        
+        Args:
+            report: Результат get_statistics с колонками CriterionId, Clicks, Cost
+        """
+        columns = report['columns']
+        criterion_ids = np.asarray(columns['CriterionId'], dtype=np.int64)
+        cost = np.nan_to_num(np.asarray(columns['Cost'], dtype=np.float64))
+        clicks = np.asarray(columns['Clicks'], dtype=np.int64)
+        
+        unique_ids, codes = np.unique(criterion_ids, return_inverse=True)
+        cost_by_id = np.bincount(codes, weights=cost, minlength=len(unique_ids))
+        clicks_by_id = np.bincount(codes, weights=clicks, minlength=len(unique_ids))
+        
+        self.cost = np.zeros(len(self))
+        self.report_clicks = np.zeros(len(self), dtype=np.int64)
+        if not len(unique_ids):
+            return self
+        
+        # Ключевые слова без строк в отчете получают нули
+        position = np.searchsorted(unique_ids, self.ids).clip(max=len(unique_ids) - 1)
+        found = unique_ids[position] == self.ids
+        self.cost[found] = cost_by_id[position[found]]
+        self.report_clicks[found] = clicks_by_id[position[found]]
+        return self
+    
+    def keyword(self, index: int) -> Any:
+        """Текст ключевого слова по номеру строки"""
+        if self._snapshot is None:
+            return self.keywords[index].get('Keyword', 'N/A')
+        if 'Keyword' not in self._snapshot.columns('keywords'):
+            return 'N/A'
+        return self._snapshot.column('keywords', 'Keyword', np.array([index]))[0]
+
+
+def _group_quantiles(codes: np.ndarray, values: np.ndarray, groups: int,
+                     quantiles: Iterable[float]) -> Dict[float, np.ndarray]:
+    """
+    Квантили значений по группам (линейная интерполяция, как np.quantile)
+    
+    Значения сортируются один раз внутри групп; квантиль группы берется по
+    индексам ее границ. Для пустых групп - NaN.
+    """
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    sizes = np.bincount(codes, minlength=groups)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    
+    result = {}
+    for q in quantiles:
+        position = (sizes - 1).clip(min=0) * q
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        if len(sorted_values):
+            low_values = sorted_values[np.minimum(starts + lower, len(sorted_values) - 1)]
+            high_values = sorted_values[np.minimum(starts + upper, len(sorted_values) - 1)]
+            values_q = low_values + (high_values - low_values) * (position - lower)
+        else:
+            values_q = np.zeros(groups)
+        result[q] = np.where(sizes > 0, values_q, np.nan)
+    return result
+
+
+def _round(value: float, digits: int = 4) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def bid_histogram(bids: np.ndarray, bins: int = BID_HISTOGRAM_BINS,
+                  quantiles: Iterable[float] = BID_QUANTILES) -> Dict[str, Any]:
+    """
+    Квантили ставок и гистограмма с равнонаполненными интервалами
+    
+    Границы интервалов - квантили ставок, поэтому в каждый интервал попадает
+    примерно одинаковое число ключевых слов (совпадающие границы объединяются).
+    Нулевые ставки (не заданы) не учитываются.
+    
+    Args:
+        bids: Ставки в валюте
+        bins: Число интервалов
+        quantiles: Квантили для сводки
+    
+    Returns:
+        Словарь {'count', 'quantiles': {квантиль: ставка}, 'histogram': [{'from', 'to', 'count'}]}
+    """
+    quantiles = tuple(quantiles)
+    bids = bids[bids > 0]
+    if not len(bids):
+        return {'count': 0, 'quantiles': {}, 'histogram': []}
+    
+    edges = np.unique(np.quantile(bids, np.linspace(0, 1, bins + 1)))
+    if len(edges) == 1:
+        edges = np.array([edges[0], edges[0]])
+    counts, edges = np.histogram(bids, bins=edges)
+    
+    return {
+        'count': int(len(bids)),
+        'quantiles': {str(q): _round(value) for q, value in zip(quantiles, np.quantile(bids, quantiles))},
+        'histogram': [
+            {'from': _round(edges[i]), 'to': _round(edges[i + 1]), 'count': int(counts[i])}
+            for i in range(len(counts))
+        ]
+    }
+
+
+def campaign_distributions(arrays: KeywordArrays,
+                           quantiles: Iterable[float] = DISTRIBUTION_QUANTILES) -> List[Dict[str, Any]]:
+    """
+    Распределения ставок, CTR и CPC ключевых слов по кампаниям
+    
+    CTR (%) считается по ключевым словам с показами, CPC - по ключевым словам
+    с кликами в отчете (если он приложен через attach_report).
+    
+    Returns:
+        Список по кампаниям: итоги (показы, клики, CTR, расход, CPC) и квантили
+    """
+    quantiles = tuple(quantiles)
+    campaign_ids, codes = np.unique(arrays.campaign_ids, return_inverse=True)
+    groups = len(campaign_ids)
+    
+    keywords = np.bincount(codes, minlength=groups)
+    impressions = np.bincount(codes, weights=arrays.impressions, minlength=groups)
+    clicks = np.bincount(codes, weights=arrays.clicks, minlength=groups)
+    
+    bid_mask = arrays.bids > 0
+    bid_q = _group_quantiles(codes[bid_mask], arrays.bids[bid_mask], groups, quantiles)
+    
+    shown = arrays.impressions > 0
+    ctr = arrays.clicks[shown] / arrays.impressions[shown] * 100
+    ctr_q = _group_quantiles(codes[shown], ctr, groups, quantiles)
+    
+    cost = cpc_q = None
+    if arrays.cost is not None:
+        cost = np.bincount(codes, weights=arrays.cost, minlength=groups)
+        report_clicks = np.bincount(codes, weights=arrays.report_clicks, minlength=groups)
+        clicked = arrays.report_clicks > 0
+        cpc = arrays.cost[clicked] / arrays.report_clicks[clicked]
+        cpc_q = _group_quantiles(codes[clicked], cpc, groups, quantiles)
+    
+    rows = []
+    for i, campaign_id in enumerate(campaign_ids.tolist()):
+        row = {
+            'campaign_id': campaign_id,
+            'keywords': int(keywords[i]),
+            'impressions': int(impressions[i]),
+            'clicks': int(clicks[i]),
+            'ctr': _round(clicks[i] / impressions[i] * 100) if impressions[i] else None,
+            'bid_quantiles': {str(q): _round(bid_q[q][i]) for q in quantiles},
+            'ctr_quantiles': {str(q): _round(ctr_q[q][i]) for q in quantiles},
+        }
+        if cost is not None:
+            row['cost'] = _round(cost[i], 2)
+            row['cpc'] = _round(cost[i] / report_clicks[i]) if report_clicks[i] else None
+            row['cpc_quantiles'] = {str(q): _round(cpc_q[q][i]) for q in quantiles}
+        rows.append(row)
+    return rows
+
+
+def productivity_outliers(arrays: KeywordArrays,
+                          threshold: float = PRODUCTIVITY_OUTLIER_THRESHOLD,
+                          limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+    """
+    Ключевые слова с продуктивностью, далекой от медианы своей кампании
+    
+    Отклонение измеряется в масштабированных MAD кампании (робастный z-score);
+    выбросом считается |z| > threshold. Ключевые слова без продуктивности
+    и кампании с нулевым разбросом пропускаются.
+    
+    Args:
+        arrays: Столбцы ключевых слов
+        threshold: Порог |z|
+        limit: Максимум результатов (по убыванию |z|; None - все)
+    
+    Returns:
+        Список {'keyword_id', 'campaign_id', 'keyword', 'bid', 'productivity',
+        'campaign_median', 'score', 'direction' ('low'/'high')}
+    """
+    known = np.flatnonzero(~np.isnan(arrays.productivity))
+    if not len(known):
+        return []
+    
+    values = arrays.productivity[known]
+    campaign_ids, codes = np.unique(arrays.campaign_ids[known], return_inverse=True)
+    groups = len(campaign_ids)
+    
+    median = _group_quantiles(codes, values, groups, (0.5,))[0.5][codes]
+    deviation = np.abs(values - median)
+    mad = _group_quantiles(codes, deviation, groups, (0.5,))[0.5][codes] * 1.4826
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = np.where(mad > 0, (values - median) / mad, 0.0)
+    outliers = np.flatnonzero(np.abs(score) > threshold)
+    outliers = outliers[np.argsort(-np.abs(score[outliers]), kind='stable')]
+    if limit is not None:
+        outliers = outliers[:limit]
+    
+    result = []
+    for i in outliers.tolist():
+        index = int(known[i])
+        result.append({
+            'keyword_id': int(arrays.ids[index]),
+            'campaign_id': int(arrays.campaign_ids[index]),
+            'keyword': arrays.keyword(index),
+            'bid': _round(arrays.bids[index], 2),
+            'productivity': _round(values[i], 2),
+            'campaign_median': _round(median[i], 2),
+            'score': _round(score[i], 2),
+            'direction': 'low' if score[i] < 0 else 'high',
+        })
+    return result
+
+
+def analyze_keyword_performance(keywords: Union[List[Dict], KeywordArrays], report: Optional[Dict[str, Any]] = None,
+                                outlier_threshold: float = PRODUCTIVITY_OUTLIER_THRESHOLD,
+                                outlier_limit: Optional[int] = 100) -> Dict[str, Any]:
+    """
+    Полная аналитика ключевых слов
+    
+    Args:
+        keywords: Ключевые слова (с полями REQUIRED_FIELDS) или готовые столбцы KeywordArrays
+        report: Отчет CRITERIA_PERFORMANCE_REPORT для расчета CPC (необязательно)
+        outlier_threshold: Порог выброса по продуктивности
+        outlier_limit: Максимум выбросов в результате
+    
+    Returns:
+        Словарь {'total', 'bids', 'context_bids', 'campaigns', 'productivity_outliers'}
+    """
+    arrays = keywords if isinstance(keywords, KeywordArrays) else KeywordArrays(keywords)
+    if report is not None:
+        arrays.attach_report(report)
+    
+    return {
+        'total': len(arrays),
+        'bids': bid_histogram(arrays.bids),
+        'context_bids': bid_histogram(arrays.context_bids),
+        'campaigns': campaign_distributions(arrays),
+        'productivity_outliers': productivity_outliers(arrays, outlier_threshold, outlier_limit),
+    }
@@ -0,0 +1,171 @@
+"""
+Ограничение числа одновременных запросов к API Яндекс.Директ
+
+Директ отклоняет лишние одновременные запросы от имени одного рекламодателя
+ошибкой 506. Лимитер выдает не больше max_parallel "слотов" на каждый
+Client-Login; общий для процесса экземпляр разделяют все коннекторы,
+сборщики, создатели кампаний и запросы отчетов, в каких бы потоках
+и циклах событий они ни работали.
+"""
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+from config import MAX_PARALLEL_REQUESTS
+
+
+class ConcurrencyLimiter:
+    """Семафоры одновременных запросов по логинам рекламодателей"""
+    
+    def __init__(self, max_parallel: int = MAX_PARALLEL_REQUESTS):
+        """
+        Args:
+            max_parallel: Максимум одновременных запросов на один Client-Login
+        """
+        if max_parallel < 1:
+            raise ValueError("max_parallel должен быть не меньше 1")
+        
+        self.max_parallel = max_parallel
+        
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._peak: Dict[str, int] = {}
+        # Ожидающие слот корутины: release будит первую из них в ее цикле событий
+        self._waiters: Dict[str, Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._lock = threading.Lock()
+    
+    def _semaphore(self, login: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(login)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_parallel)
+                self._semaphores[login] = semaphore
+            return semaphore
+    
+    def _acquired(self, login: str) -> None:
+        with self._lock:
+            count = self._in_flight.get(login, 0) + 1
+            self._in_flight[login] = count
+            self._peak[login] = max(self._peak.get(login, 0), count)
+    
+    def acquire(self, login: Optional[str], timeout: Optional[float] = None) -> bool:
+        """
+        Занять слот для запроса от имени логина (блокирует поток)
+        
+        Args:
+            login: Client-Login запроса (пустой - владелец токена)
+            timeout: Максимальное ожидание, сек (None - без ограничения)
+        
+        Returns:
+            True, если слот получен
+        """
+        login = login or ''
+        if not self._semaphore(login).acquire(timeout=timeout):
+            return False
+        self._acquired(login)
+        return True
+    
+    async def acquire_async(self, login: Optional[str]) -> None:
+        """
+        Занять слот, не блокируя цикл событий
+        
+        Если слотов нет, корутина ждет в очереди логина, пока release не разбудит
+        ее; после пробуждения слот занимается заново (его мог перехватить поток).
+        """
+        login = login or ''
+        semaphore = self._semaphore(login)
+        loop = asyncio.get_running_loop()
+        while True:
+            # Попытка и постановка в очередь под одной блокировкой: release между
+            # ними не потеряет пробуждение
+            with self._lock:
+                if semaphore.acquire(blocking=False):
+                    break
+                waiter = loop.create_future()
+                self._waiters.setdefault(login, deque()).append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter.cancelled():
+                        try:
+                            self._waiters[login].remove((loop, waiter))
+                        except ValueError:
+                            pass
+                    else:
+                        # Разбуженная, но отмененная корутина передает пробуждение дальше
+                        self._wake_next(login)
+                raise
+        self._acquired(login)
+    
+    def _wake_next(self, login: str) -> None:
+        """Разбудить первую ожидающую корутину логина (вызывается под self._lock)"""
+        waiters = self._waiters.get(login)
+        while waiters:
+            loop, waiter = waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(self._notify, login, waiter)
+                return
+            except RuntimeError:
+                # Цикл событий ожидающего уже закрыт
+                continue
+    
+    def _notify(self, login: str, waiter: asyncio.Future) -> None:
+        """Пробуждение в цикле событий ожидающего; отмененный передает очередь следующему"""
+        if not waiter.done():
+            waiter.set_result(None)
+            return
+        with self._lock:
+            self._wake_next(login)
+    
+    def release(self, login: Optional[str]) -> None:
+        """Освободить слот"""
+        login = login or ''
+        semaphore = self._semaphore(login)
+        with self._lock:
+            self._in_flight[login] = self._in_flight.get(login, 1) - 1
+            semaphore.release()
+            self._wake_next(login)
+    
+    @contextmanager
+    def slot(self, login: Optional[str]):
+        """Слот на время блока with"""
+        self.acquire(login)
+        try:
+            yield
+        finally:
+            self.release(login)
+    
+    @asynccontextmanager
+    async def slot_async(self, login: Optional[str]):
+        """Слот на время блока async with"""
+        await self.acquire_async(login)
+        try:
+            yield
+        finally:
+            self.release(login)
+    
+    def in_flight(self, login: Optional[str]) -> int:
+        """Число запросов логина, выполняющихся сейчас"""
+        with self._lock:
+            return self._in_flight.get(login or '', 0)
+    
+    def peak(self, login: Optional[str]) -> int:
+        """Максимальное число одновременных запросов логина за время работы"""
+        with self._lock:
+            return self._peak.get(login or '', 0)
+
+
+_shared_limiter: Optional[ConcurrencyLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter() -> ConcurrencyLimiter:
+    """Общий для процесса лимитер (используется коннекторами по умолчанию)"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = ConcurrencyLimiter()
+        return _shared_limiter
@@ -0,0 +1,235 @@
+"""
+Метрики запросов к API Яндекс.Директ
+
+По каждому методу API накапливаются: число запросов, гистограмма времени
+ответа, ожидание баллов и слота лимитера, объем запроса и ответа в байтах,
+израсходованные баллы, повторы и коды ошибок. Метрики доступны из Python
+(snapshot, summary) и выгружаются в формате Prometheus или JSON.
+"""
+import json
+import threading
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from config import LOGS_DIR
+from units import parse_units_header
+
+# Границы корзин гистограммы времени ответа, сек
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_COUNTERS = ('requests', 'retries', 'errors', 'request_bytes', 'response_bytes', 'units')
+
+
+class _MethodStats:
+    """Накопленные значения одного метода"""
+    
+    def __init__(self, buckets: tuple):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.units = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.wait_sum = 0.0
+        self.latency_buckets = [0] * (len(buckets) + 1)
+        self.error_codes: Dict[str, int] = {}
+
+
+class ConnectorMetrics:
+    """Потокобезопасный накопитель метрик по методам API"""
+    
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        """
+        Args:
+            buckets: Границы корзин гистограммы времени ответа, сек
+        """
+        self.buckets = tuple(buckets)
+        self.started_at = datetime.now()
+        self._methods: Dict[str, _MethodStats] = {}
+        self._lock = threading.Lock()
+    
+    def _stats(self, method: str) -> _MethodStats:
+        stats = self._methods.get(method)
+        if stats is None:
+            stats = self._methods[method] = _MethodStats(self.buckets)
+        return stats
+    
+    def observe_request(self, method: str, latency: float, wait: float = 0.0,
+                        request_bytes: int = 0, response_bytes: int = 0,
+                        units_header: Optional[str] = None) -> None:
+        """
+        Учет выполненного HTTP-запроса
+        
+        Args:
+            method: Метод API ('ads.get')
+            latency: Время от отправки запроса до конца чтения ответа, сек
+            wait: Ожидание баллов и слота лимитера перед отправкой, сек
+            request_bytes: Размер тела запроса
+            response_bytes: Размер тела ответа
+            units_header: Значение заголовка Units ответа
+        """
+        units = parse_units_header(units_header)
+        with self._lock:
+            stats = self._stats(method)
+            stats.requests += 1
+            stats.latency_sum += latency
+            stats.latency_max = max(stats.latency_max, latency)
+            stats.wait_sum += wait
+            stats.latency_buckets[bisect_left(self.buckets, latency)] += 1
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+            if units is not None:
+                stats.units += units[0]
+    
+    def record_error(self, method: str, code: Union[int, str, None]) -> None:
+        """
+        Учет ошибки запроса
+        
+        Args:
+            method: Метод API
+            code: Код ошибки API, HTTP-статус или имя исключения
+        """
+        key = str(code)
+        with self._lock:
+            stats = self._stats(method)
+            stats.errors += 1
+            stats.error_codes[key] = stats.error_codes.get(key, 0) + 1
+    
+    def record_retry(self, method: str) -> None:
+        """Учет повтора запроса"""
+        with self._lock:
+            self._stats(method).retries += 1
+    
+    def reset(self) -> None:
+        """Обнуление всех метрик"""
+        with self._lock:
+            self._methods.clear()
+            self.started_at = datetime.now()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Текущие значения метрик
+        
+        Returns:
+            Словарь {'started_at', 'buckets', 'methods': {метод: значения}}
+        """
+        with self._lock:
+            methods = {}
+            for method, stats in sorted(self._methods.items()):
+                methods[method] = {
+                    **{name: getattr(stats, name) for name in _COUNTERS},
+                    'latency_sum': round(stats.latency_sum, 6),
+                    'latency_max': round(stats.latency_max, 6),
+                    'latency_avg': round(stats.latency_sum / stats.requests, 6) if stats.requests else 0.0,
+                    'wait_sum': round(stats.wait_sum, 6),
+                    'latency_buckets': list(stats.latency_buckets),
+                    'error_codes': dict(stats.error_codes),
+                }
+        return {
+            'started_at': self.started_at.isoformat(),
+            'buckets': list(self.buckets),
+            'methods': methods,
+        }
+    
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Методы, отсортированные по суммарному времени ответа
+        
+        Returns:
+            Список {'method', 'requests', 'latency_sum', 'share', 'units', ...}
+        """
+        methods = self.snapshot()['methods']
+        total = sum(m['latency_sum'] for m in methods.values()) or 1.0
+        rows = [
+            {
+                'method': method,
+                'requests': m['requests'],
+                'latency_sum': m['latency_sum'],
+                'latency_avg': m['latency_avg'],
+                'share': round(m['latency_sum'] / total, 4),
+                'wait_sum': m['wait_sum'],
+                'units': m['units'],
+                'response_bytes': m['response_bytes'],
+                'retries': m['retries'],
+                'errors': m['errors'],
+            }
+            for method, m in methods.items()
+        ]
+        return sorted(rows, key=lambda row: row['latency_sum'], reverse=True)
+    
+    def to_json(self) -> str:
+        """Метрики в JSON"""
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+    
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        methods = self.snapshot()['methods']
+        lines = []
+        
+        def counter(name: str, help_text: str, field: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for method, m in methods.items():
+                lines.append(f'{name}{{method="{method}"}} {m[field]}')
+        
+        counter('direct_api_requests_total', 'HTTP requests to the Direct API', 'requests')
+        counter('direct_api_retries_total', 'Requests repeated after a retryable error', 'retries')
+        counter('direct_api_request_bytes_total', 'Request body bytes', 'request_bytes')
+        counter('direct_api_response_bytes_total', 'Response body bytes', 'response_bytes')
+        counter('direct_api_units_spent_total', 'Units spent according to the Units header', 'units')
+        counter('direct_api_wait_seconds_total', 'Time spent waiting for units and concurrency slots', 'wait_sum')
+        
+        lines.append("# HELP direct_api_errors_total Errors by API error code")
+        lines.append("# TYPE direct_api_errors_total counter")
+        for method, m in methods.items():
+            for code, count in sorted(m['error_codes'].items()):
+                lines.append(f'direct_api_errors_total{{method="{method}",code="{code}"}} {count}')
+        
+        lines.append("# HELP direct_api_request_seconds Direct API response time")
+        lines.append("# TYPE direct_api_request_seconds histogram")
+        for method, m in methods.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, m['latency_buckets']):
+                cumulative += count
+                lines.append(f'direct_api_request_seconds_bucket{{method="{method}",le="{bound}"}} {cumulative}')
+            lines.append(f'direct_api_request_seconds_bucket{{method="{method}",le="+Inf"}} {m["requests"]}')
+            lines.append(f'direct_api_request_seconds_sum{{method="{method}"}} {m["latency_sum"]}')
+            lines.append(f'direct_api_request_seconds_count{{method="{method}"}} {m["requests"]}')
+        
+        return '\n'.join(lines) + '\n'
+    
+    def dump(self, path: Optional[Union[str, Path]] = None) -> Path:
+        """
+        Запись метрик в файл
+        
+        Args:
+            path: Путь к файлу; расширение .prom - формат Prometheus, иначе JSON
+                (по умолчанию - logs/metrics_<время>.json)
+        
+        Returns:
+            Путь к записанному файлу
+        """
+        if path is None:
+            path = LOGS_DIR / f"metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        path = Path(path)
+        
+        content = self.to_prometheus() if path.suffix == '.prom' else self.to_json()
+        path.write_text(content, encoding='utf-8')
+        return path
+
+
+_shared_metrics: Optional[ConnectorMetrics] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_metrics() -> ConnectorMetrics:
+    """Общий для процесса накопитель метрик (используется коннекторами по умолчанию)"""
+    global _shared_metrics
+    with _shared_lock:
+        if _shared_metrics is None:
+            _shared_metrics = ConnectorMetrics()
+        return _shared_metrics
@@ -0,0 +1,358 @@
+"""
+Локальное хранилище объектов Яндекс.Директ в SQLite
+
+Кампании, группы, объявления и ключевые слова хранятся по одной строке
+на объект (ключ - Id): повторная загрузка снимка обновляет строки, а не
+дописывает новый файл. Поля, по которым выполняется отбор (CampaignId,
+AdGroupId, Status, текст ключевой фразы), вынесены в индексированные
+колонки, полный объект хранится в JSON. Ключевая фраза дополнительно
+хранится приведенной через str.casefold (колонка keyword_folded): NOCASE
+в SQLite не различает регистр только латиницы. База работает в режиме WAL:
+чтение не блокируется записью из другого потока или процесса.
+"""
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from config import OBJECT_STORE_FILE
+from json_stream import loads as json_loads
+
+logger = logging.getLogger(__name__)
+
+# Поля объектов, вынесенные в колонки (кроме Id); индексы - по INDEXED_COLUMNS
+ENTITY_COLUMNS = {
+    'campaigns': ('Name', 'Type', 'Status', 'State'),
+    'ad_groups': ('CampaignId', 'Name', 'Status'),
+    'ads': ('CampaignId', 'AdGroupId', 'Type', 'Status', 'State'),
+    'keywords': ('CampaignId', 'AdGroupId', 'Keyword', 'Status', 'State'),
+}
+
+INDEXED_COLUMNS = ('CampaignId', 'AdGroupId', 'Status')
+
+# Ключевая фраза после str.casefold - для поиска без учета регистра (в т.ч. кириллицы)
+KEYWORD_FOLDED_COLUMN = 'keyword_folded'
+
+# Размер пачки при записи
+UPSERT_BATCH_SIZE = 5000
+
+
+def _casefold(value: Any) -> Any:
+    return value.casefold() if isinstance(value, str) else value
+
+
+class ObjectStore:
+    """
+    SQLite-хранилище объектов с обновлением по Id и выборками по индексам
+    
+    Пример:
+        with ObjectStore() as store:
+            store.save_data(collector.collect_all_data(), prune=True)
+            keywords = store.query('keywords', campaign_ids=[123], statuses=['ACCEPTED'])
+    """
+    
+    def __init__(self, path: Union[str, Path] = OBJECT_STORE_FILE):
+        """
+        Args:
+            path: Файл базы (по умолчанию - data/yandex_direct.sqlite3)
+        """
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.create_function('casefold', 1, _casefold, deterministic=True)
+        self._create_schema()
+    
+    def _create_schema(self) -> None:
+        with self._lock:
+            for entity, columns in ENTITY_COLUMNS.items():
+                definitions = ', '.join(
+                    f"{column} TEXT COLLATE NOCASE" if column == 'Keyword' else f"{column}"
+                    for column in columns
+                )
+                self._connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {entity} ("
+                    f"Id INTEGER PRIMARY KEY, {definitions}, data TEXT NOT NULL, synced_at TEXT NOT NULL)"
+                )
+                for column in columns:
+                    if column in INDEXED_COLUMNS:
+                        self._connection.execute(
+                            f"CREATE INDEX IF NOT EXISTS idx_{entity}_{column.lower()} ON {entity} ({column})"
+                        )
+                if 'Keyword' in columns:
+                    self._add_folded_column(entity)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    
+    def _add_folded_column(self, entity: str) -> None:
+        """Колонка keyword_folded; в базе, созданной без нее, заполняется из Keyword"""
+        existing = {row[1] for row in self._connection.execute(f"PRAGMA table_info({entity})")}
+        if KEYWORD_FOLDED_COLUMN not in existing:
+            self._connection.execute(f"ALTER TABLE {entity} ADD COLUMN {KEYWORD_FOLDED_COLUMN} TEXT COLLATE NOCASE")
+            self._connection.execute(f"UPDATE {entity} SET {KEYWORD_FOLDED_COLUMN} = casefold(Keyword)")
+        self._connection.execute(f"DROP INDEX IF EXISTS idx_{entity}_keyword")
+        self._connection.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{entity}_{KEYWORD_FOLDED_COLUMN} ON {entity} ({KEYWORD_FOLDED_COLUMN})"
+        )
+    
+    def close(self) -> None:
+        """Закрытие соединения"""
+        with self._lock:
+            self._connection.close()
+    
+    def __enter__(self) -> 'ObjectStore':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+    
+    @staticmethod
+    def _check_entity(entity: str) -> None:
+        if entity not in ENTITY_COLUMNS:
+            raise ValueError(f"Неизвестный тип объектов: {entity}. Доступны: {', '.join(ENTITY_COLUMNS)}")
+    
+    # Запись
+    
+    def upsert(self, entity: str, items: Iterable[Dict[str, Any]],
+               synced_at: Optional[str] = None) -> int:
+        """
+        Вставка новых и обновление существующих объектов по Id
+        
+        Args:
+            entity: 'campaigns', 'ad_groups', 'ads' или 'keywords'
+            items: Объекты API (обязательно с Id)
+            synced_at: Метка загрузки (по умолчанию - текущее время)
+        
+        Returns:
+            Число записанных объектов
+        """
+        self._check_entity(entity)
+        columns = ENTITY_COLUMNS[entity]
+        synced_at = synced_at or datetime.now().isoformat()
+        
+        folded = 'Keyword' in columns
+        names = ('Id',) + columns + ((KEYWORD_FOLDED_COLUMN,) if folded else ()) + ('data', 'synced_at')
+        updates = ', '.join(f"{name} = excluded.{name}" for name in names[1:])
+        sql = (
+            f"INSERT INTO {entity} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+            f"ON CONFLICT(Id) DO UPDATE SET {updates}"
+        )
+        
+        written = 0
+        batch = []
+        with self._lock:
+            self._connection.execute('BEGIN')
+            try:
+                for item in items:
+                    batch.append(
+                        (item['Id'],)
+                        + tuple(item.get(column) for column in columns)
+                        + ((_casefold(item.get('Keyword')),) if folded else ())
+                        + (json.dumps(item, ensure_ascii=False), synced_at)
+                    )
+                    if len(batch) >= UPSERT_BATCH_SIZE:
+                        self._connection.executemany(sql, batch)
+                        written += len(batch)
+                        batch = []
+                if batch:
+                    self._connection.executemany(sql, batch)
+                    written += len(batch)
+                self._connection.execute('COMMIT')
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
+        
+        return written
+    
+    def delete(self, entity: str, ids: Iterable[int]) -> int:
+        """Удаление объектов по Id"""
+        self._check_entity(entity)
+        with self._lock:
+            cursor = self._connection.execute(
+                f"DELETE FROM {entity} WHERE Id IN (SELECT value FROM json_each(?))", (json.dumps(list(ids)),)
+            )
+            return cursor.rowcount
+    
+    def save_data(self, data: Dict, prune: bool = False,
+                  campaign_ids: Optional[List[int]] = None) -> Dict[str, int]:
+        """
+        Загрузка снимка DataCollector (collect_all_data, sync_data)
+        
+        Args:
+            data: Снимок с ключами campaigns, ad_groups, ads, keywords
+            prune: Удалить объекты, которых нет в снимке
+            campaign_ids: Кампании, которые собирались (удаление только в их пределах;
+                по умолчанию - весь аккаунт, а для снимка с pending_campaign_ids -
+                только собранные кампании)
+        
+        Returns:
+            Число записанных объектов по типам (и удаленных, если prune)
+        """
+        synced_at = datetime.now().isoformat()
+        stats = {}
+        for entity in ENTITY_COLUMNS:
+            stats[entity] = self.upsert(entity, data.get(entity, []), synced_at)
+        
+        if prune:
+            if campaign_ids is None and data.get('pending_campaign_ids'):
+                campaign_ids = [campaign['Id'] for campaign in data.get('campaigns', [])]
+            stats['deleted'] = self._prune(synced_at, campaign_ids)
+        
+        self.set_meta('timestamp', data.get('timestamp', synced_at))
+        if data.get('client_info'):
+            self.set_meta('client_info', json.dumps(data['client_info'], ensure_ascii=False))
+        
+        logger.info(f"Хранилище {self.path.name} обновлено: {stats}")
+        return stats
+    
+    def _prune(self, synced_at: str, campaign_ids: Optional[List[int]]) -> int:
+        """Удаление объектов, не попавших в загрузку synced_at"""
+        deleted = 0
+        with self._lock:
+            for entity in ENTITY_COLUMNS:
+                sql = f"DELETE FROM {entity} WHERE synced_at != ?"
+                params: List[Any] = [synced_at]
+                if campaign_ids is not None:
+                    column = 'Id' if entity == 'campaigns' else 'CampaignId'
+                    sql += f" AND {column} IN (SELECT value FROM json_each(?))"
+                    params.append(json.dumps(campaign_ids))
+                deleted += self._connection.execute(sql, params).rowcount
+        return deleted
+    
+    def set_meta(self, key: str, value: str) -> None:
+        """Запись служебного значения"""
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        """Чтение служебного значения"""
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    # Чтение
+    
+    def _where(self, entity: str, ids: Optional[Iterable[int]], campaign_ids: Optional[Iterable[int]],
+               ad_group_ids: Optional[Iterable[int]], statuses: Optional[Iterable[str]],
+               keyword: Optional[str]) -> tuple:
+        """Условие WHERE и параметры по фильтрам query"""
+        self._check_entity(entity)
+        columns = ENTITY_COLUMNS[entity]
+        conditions = []
+        params: List[Any] = []
+        
+        filters = (
+            ('Id', ids),
+            ('CampaignId', campaign_ids),
+            ('AdGroupId', ad_group_ids),
+            ('Status', statuses),
+        )
+        for column, values in filters:
+            if values is None:
+                continue
+            if column != 'Id' and column not in columns:
+                raise ValueError(f"У объектов {entity} нет поля {column}")
+            conditions.append(f"{column} IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(values)))
+        
+        if keyword is not None:
+            if 'Keyword' not in columns:
+                raise ValueError(f"У объектов {entity} нет поля Keyword")
+            # Сравнение с фразой после casefold: регистр кириллицы NOCASE/LIKE не учитывают.
+            # Префикс без подстановочных символов использует индекс (LIKE по NOCASE-колонке)
+            conditions.append(f"{KEYWORD_FOLDED_COLUMN} LIKE ? ESCAPE '\\'")
+            escaped = keyword.casefold().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(escaped.replace('*', '%') if '*' in keyword else escaped)
+        
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
+    
+    def iter_query(self, entity: str, ids: Optional[Iterable[int]] = None,
+                   campaign_ids: Optional[Iterable[int]] = None,
+                   ad_group_ids: Optional[Iterable[int]] = None,
+                   statuses: Optional[Iterable[str]] = None,
+                   keyword: Optional[str] = None,
+                   limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Объекты по фильтрам (все условия объединяются по И)
+        
+        Args:
+            entity: 'campaigns', 'ad_groups', 'ads' или 'keywords'
+            ids: ID объектов
+            campaign_ids: ID кампаний
+            ad_group_ids: ID групп объявлений
+            statuses: Статусы (Status)
+            keyword: Текст ключевой фразы без учета регистра; * - любая подстрока
+                ('купить*' - фразы, начинающиеся с "купить")
+            limit: Максимум объектов
+        
+        Yields:
+            Объекты в том виде, в котором они пришли из API
+        """
+        where, params = self._where(entity, ids, campaign_ids, ad_group_ids, statuses, keyword)
+        sql = f"SELECT data FROM {entity}{where} ORDER BY Id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        for (data,) in rows:
+            yield json_loads(data)
+    
+    def query(self, entity: str, **filters) -> List[Dict[str, Any]]:
+        """Список объектов по фильтрам (см. iter_query)"""
+        return list(self.iter_query(entity, **filters))
+    
+    def get(self, entity: str, object_id: int) -> Optional[Dict[str, Any]]:
+        """Объект по Id"""
+        found = self.query(entity, ids=[object_id])
+        return found[0] if found else None
+    
+    def count(self, entity: str, ids: Optional[Iterable[int]] = None,
+              campaign_ids: Optional[Iterable[int]] = None,
+              ad_group_ids: Optional[Iterable[int]] = None,
+              statuses: Optional[Iterable[str]] = None,
+              keyword: Optional[str] = None) -> int:
+        """Число объектов по фильтрам (без чтения JSON)"""
+        where, params = self._where(entity, ids, campaign_ids, ad_group_ids, statuses, keyword)
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM {entity}{where}", params).fetchone()[0]
+    
+    def count_by(self, entity: str, column: str) -> Dict[Any, int]:
+        """Число объектов по значениям индексированной колонки (например, по Status)"""
+        self._check_entity(entity)
+        if column not in ENTITY_COLUMNS[entity]:
+            raise ValueError(f"У объектов {entity} нет поля {column}")
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {column}, COUNT(*) FROM {entity} GROUP BY {column}"
+            ).fetchall()
+        return dict(rows)
+    
+    def load_data(self, campaign_ids: Optional[List[int]] = None) -> Dict:
+        """
+        Снимок в формате DataCollector.collect_all_data (для анализа и экспорта)
+        
+        Args:
+            campaign_ids: Только эти кампании и их объекты (если None - все)
+        """
+        client_info = self.get_meta('client_info')
+        data = {
+            'timestamp': self.get_meta('timestamp'),
+            'client_info': json.loads(client_info) if client_info else {},
+        }
+        for entity in ENTITY_COLUMNS:
+            if campaign_ids is None:
+                data[entity] = self.query(entity)
+            elif entity == 'campaigns':
+                data[entity] = self.query(entity, ids=campaign_ids)
+            else:
+                data[entity] = self.query(entity, campaign_ids=campaign_ids)
+        return data
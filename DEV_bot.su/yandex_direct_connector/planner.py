@@ -0,0 +1,238 @@
+"""
+План запросов и оценка стоимости заданий в баллах без обращения к API
+
+По числу объектов из последнего сохраненного снимка строится тот же граф
+вызовов, что выполнит DataCollector.collect_all_data (разбиение Ids на части
+по SELECTION_LIMITS, страницы по PAGE_LIMIT), и по таблице стоимости методов
+(units.UNITS_COST) оценивается, сколько баллов он потратит. Задание, которое
+не помещается в остаток баллов, можно отложить (wait_seconds) или разбить
+по кампаниям (split_campaigns), а не прерывать на середине.
+"""
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import PAGE_LIMIT
+from connector import BULK_LIMITS, SELECTION_LIMITS
+from units import SECONDS_PER_DAY, estimate_cost
+
+# Структура аккаунта для планирования: {кампания: {группа: (объявлений, ключевых слов)}}
+AccountCounts = Dict[int, Dict[int, Tuple[int, int]]]
+
+
+class JobPlan:
+    """Запланированные запросы задания и их оценка в баллах"""
+    
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Название задания (для логов и отчетов)
+        """
+        self.name = name
+        self.calls: List[Dict[str, Any]] = []
+    
+    def add(self, step: str, method: str, objects: int = 0) -> None:
+        """
+        Добавление одного запроса
+        
+        Args:
+            step: Этап задания ('campaigns', 'keywords', ...)
+            method: Метод API
+            objects: Число объектов в запросе или ответе
+        """
+        self.calls.append({
+            'step': step,
+            'method': method,
+            'objects': objects,
+            'units': estimate_cost(method, objects),
+        })
+    
+    def add_pages(self, step: str, method: str, objects: int, page_limit: int = PAGE_LIMIT) -> None:
+        """Запросы get-метода с постраничной выдачей (минимум один запрос)"""
+        pages = max(1, math.ceil(objects / page_limit))
+        for page in range(pages):
+            self.add(step, method, min(page_limit, objects - page * page_limit))
+    
+    def add_bulk(self, step: str, method: str, objects: int) -> None:
+        """Запросы пакетного изменения с разбиением по BULK_LIMITS"""
+        limit = BULK_LIMITS.get(method, objects or 1)
+        for start in range(0, objects, limit):
+            self.add(step, method, min(limit, objects - start))
+    
+    @property
+    def requests(self) -> int:
+        """Число запросов"""
+        return len(self.calls)
+    
+    @property
+    def units(self) -> int:
+        """Оценка стоимости в баллах"""
+        return sum(call['units'] for call in self.calls)
+    
+    def by_method(self) -> List[Dict[str, Any]]:
+        """Запросы, объекты и баллы по методам в порядке выполнения"""
+        methods: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for call in self.calls:
+            key = (call['step'], call['method'])
+            row = methods.setdefault(key, {
+                'step': call['step'], 'method': call['method'],
+                'requests': 0, 'objects': 0, 'units': 0,
+            })
+            row['requests'] += 1
+            row['objects'] += call['objects']
+            row['units'] += call['units']
+        return list(methods.values())
+    
+    def wait_seconds(self, remaining: Optional[int], daily_limit: Optional[int] = None) -> Optional[float]:
+        """
+        Через сколько секунд остаток баллов позволит выполнить задание
+        
+        Баллы восстанавливаются равномерно в течение суток.
+        
+        Args:
+            remaining: Текущий остаток баллов (None - неизвестен, ждать не нужно)
+            daily_limit: Суточный лимит баллов
+        
+        Returns:
+            0, если задание помещается сейчас; время ожидания; None, если задание
+            больше суточного лимита или скорость восстановления неизвестна
+        """
+        if remaining is None or self.units <= remaining:
+            return 0.0
+        if not daily_limit or self.units > daily_limit:
+            return None
+        return (self.units - remaining) * SECONDS_PER_DAY / daily_limit
+    
+    def check(self, remaining: Optional[int], daily_limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Сравнение оценки с бюджетом
+        
+        Returns:
+            Словарь: units, remaining, fits (None - остаток неизвестен), wait_seconds
+        """
+        return {
+            'units': self.units,
+            'remaining': remaining,
+            'daily_limit': daily_limit,
+            'fits': None if remaining is None else self.units <= remaining,
+            'wait_seconds': self.wait_seconds(remaining, daily_limit),
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """План в виде словаря (для JSON и вывода)"""
+        return {
+            'name': self.name,
+            'requests': self.requests,
+            'units': self.units,
+            'methods': self.by_method(),
+        }
+    
+    def summary(self) -> str:
+        """Текстовое описание плана"""
+        lines = [f"{self.name}: {self.requests} запросов, ~{self.units} баллов"]
+        for row in self.by_method():
+            lines.append(f"  {row['method']}: {row['requests']} запросов, "
+                         f"{row['objects']} объектов, ~{row['units']} баллов")
+        return '\n'.join(lines)
+
+
+def counts_from_snapshot(snapshot: Dict) -> AccountCounts:
+    """
+    Структура аккаунта по сохраненному снимку DataCollector
+    
+    Returns:
+        {CampaignId: {AdGroupId: (объявлений, ключевых слов)}} в порядке снимка
+    """
+    counts: AccountCounts = {campaign['Id']: {} for campaign in snapshot.get('campaigns', [])}
+    children: Dict[int, List[int]] = {}
+    for key, position in (('ads', 0), ('keywords', 1)):
+        for item in snapshot.get(key, []):
+            totals = children.setdefault(item.get('AdGroupId'), [0, 0])
+            totals[position] += 1
+    for group in snapshot.get('ad_groups', []):
+        ads, keywords = children.get(group['Id'], (0, 0))
+        counts.setdefault(group.get('CampaignId'), {})[group['Id']] = (ads, keywords)
+    return counts
+
+
+def _chunks(ids: List[int], limit: int) -> Iterable[List[int]]:
+    for start in range(0, len(ids), limit):
+        yield ids[start:start + limit]
+
+
+def plan_collect(counts: AccountCounts, campaign_ids: Optional[Iterable[int]] = None,
+                 page_limit: int = PAGE_LIMIT) -> JobPlan:
+    """
+    План DataCollector.collect_all_data по структуре аккаунта
+    
+    Args:
+        counts: Структура аккаунта (см. counts_from_snapshot)
+        campaign_ids: Кампании для сбора (None - все)
+        page_limit: Размер страницы
+    
+    Returns:
+        План с запросами по этапам
+    """
+    plan = JobPlan('collect_all_data')
+    plan.add('client_info', 'clients.get')
+    
+    if campaign_ids is None:
+        selected = list(counts)
+        plan.add_pages('campaigns', 'campaigns.get', len(selected), page_limit)
+    else:
+        requested = list(campaign_ids)
+        selected = [campaign_id for campaign_id in requested if campaign_id in counts]
+        for part in _chunks(requested, SELECTION_LIMITS['campaigns.get']['Ids']):
+            plan.add_pages('campaigns', 'campaigns.get', sum(1 for c in part if c in counts), page_limit)
+    
+    if not selected:
+        return plan
+    
+    for part in _chunks(selected, SELECTION_LIMITS['adgroups.get']['CampaignIds']):
+        plan.add_pages('ad_groups', 'adgroups.get', sum(len(counts[c]) for c in part), page_limit)
+    
+    groups = [(group_id, sizes) for c in selected for group_id, sizes in counts[c].items()]
+    for step, method, position in (('ads', 'ads.get', 0), ('keywords', 'keywords.get', 1)):
+        if groups:
+            for part in _chunks(groups, SELECTION_LIMITS[method]['AdGroupIds']):
+                plan.add_pages(step, method, sum(sizes[position] for _, sizes in part), page_limit)
+        else:
+            for part in _chunks(selected, SELECTION_LIMITS[method]['CampaignIds']):
+                plan.add_pages(step, method, 0, page_limit)
+    
+    return plan
+
+
+def split_campaigns(counts: AccountCounts, budget: int,
+                    campaign_ids: Optional[Iterable[int]] = None,
+                    page_limit: int = PAGE_LIMIT) -> List[List[int]]:
+    """
+    Разбиение сбора на части по кампаниям, каждая из которых укладывается в бюджет
+    
+    Стоимость части оценивается сверху суммой стоимостей ее кампаний по отдельности
+    (объединение в один сбор только уменьшает число запросов). Кампания, которая
+    сама по себе дороже бюджета, образует отдельную часть.
+    
+    Args:
+        counts: Структура аккаунта
+        budget: Баллов на одну часть
+        campaign_ids: Кампании для сбора (None - все)
+        page_limit: Размер страницы
+    
+    Returns:
+        Списки ID кампаний по частям
+    """
+    base = estimate_cost('clients.get')
+    selected = [c for c in (campaign_ids if campaign_ids is not None else counts) if c in counts]
+    parts: List[List[int]] = []
+    current: List[int] = []
+    current_units = base
+    for campaign_id in selected:
+        units = plan_collect(counts, [campaign_id], page_limit).units - base
+        if current and current_units + units > budget:
+            parts.append(current)
+            current, current_units = [], base
+        current.append(campaign_id)
+        current_units += units
+    if current:
+        parts.append(current)
+    return parts
@@ -0,0 +1,300 @@
+"""
+Клиент сервиса Reports API Яндекс.Директ (офлайн-режим, TSV)
+
+Отчет запрашивается в режиме processingMode=offline: сервер отвечает 201/202,
+пока отчет формируется, и подсказывает в заголовке retryIn, когда повторить
+запрос. Готовый отчет (HTTP 200) читается потоком построчно и сразу
+раскладывается по типизированным колонкам (array.array для чисел).
+"""
+import hashlib
+import json
+import logging
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import requests
+
+from config import REQUEST_TIMEOUT, REPORTS_MAX_WAIT, REPORTS_DEFAULT_RETRY_IN
+
+logger = logging.getLogger(__name__)
+
+# Поля отчетов по умолчанию
+DEFAULT_REPORT_FIELDS = {
+    'CAMPAIGN_PERFORMANCE_REPORT': [
+        'Date', 'CampaignId', 'CampaignName', 'Impressions', 'Clicks',
+        'Cost', 'Ctr', 'AvgCpc', 'Conversions'
+    ],
+    'AD_PERFORMANCE_REPORT': [
+        'Date', 'CampaignId', 'AdGroupId', 'AdId', 'Impressions', 'Clicks',
+        'Cost', 'Ctr', 'AvgCpc', 'Conversions'
+    ],
+}
+
+# Типы колонок: целые - array('q'), дробные - array('d'), остальные - строки
+INT_COLUMNS = {
+    'CampaignId', 'AdGroupId', 'AdId', 'CriterionId', 'Impressions', 'Clicks', 'Sessions'
+}
+FLOAT_COLUMNS = {
+    'Cost', 'Ctr', 'AvgCpc', 'AvgCpm', 'AvgClickPosition', 'AvgImpressionPosition',
+    'AvgTrafficVolume', 'BounceRate', 'Conversions', 'ConversionRate',
+    'CostPerConversion', 'Revenue', 'GoalsRoi', 'Profit'
+}
+
+# Значение "нет данных" в TSV-отчетах Директа
+EMPTY_VALUE = '--'
+
+ColumnArray = Union[array, List[str]]
+
+
+class ReportError(Exception):
+    """Ошибка формирования отчета"""
+
+
+class TsvColumnarParser:
+    """Построчный разбор TSV-отчета в типизированные колонки"""
+    
+    def __init__(self):
+        self.field_names: List[str] = []
+        self.columns: Dict[str, ColumnArray] = {}
+        self.rows = 0
+    
+    @staticmethod
+    def _new_column(name: str) -> ColumnArray:
+        if name in INT_COLUMNS:
+            return array('q')
+        if name in FLOAT_COLUMNS:
+            return array('d')
+        return []
+    
+    def feed_line(self, line: Union[str, bytes]) -> None:
+        """
+        Обработка одной строки отчета (первая строка - заголовки колонок)
+        
+        Args:
+            line: Строка TSV без перевода строки (или с ним)
+        """
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.rstrip('\r\n')
+        if not line:
+            return
+        
+        values = line.split('\t')
+        if not self.field_names:
+            self.field_names = values
+            self.columns = {name: self._new_column(name) for name in values}
+            return
+        
+        for name, value in zip(self.field_names, values):
+            column = self.columns[name]
+            if name in INT_COLUMNS:
+                column.append(0 if value == EMPTY_VALUE else int(value))
+            elif name in FLOAT_COLUMNS:
+                column.append(float('nan') if value == EMPTY_VALUE else float(value))
+            else:
+                column.append(value)
+        self.rows += 1
+    
+    def feed(self, lines: Iterable[Union[str, bytes]]) -> 'TsvColumnarParser':
+        """Обработка потока строк"""
+        for line in lines:
+            self.feed_line(line)
+        return self
+
+
+def build_report_request(report_type: str, date_from: str, date_to: str,
+                         field_names: Optional[List[str]] = None,
+                         campaign_ids: Optional[List[int]] = None,
+                         name_suffix: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Тело запроса к Reports API
+    
+    Имя отчета вычисляется из параметров: повторный запрос с теми же
+    параметрами в офлайн-режиме опрашивает уже поставленный в очередь отчет.
+    name_suffix (например, время загрузки) делает имя уникальным, чтобы
+    статистика еще меняющихся дней не отдавалась из ранее построенного отчета.
+    """
+    params = {
+        'SelectionCriteria': {
+            'DateFrom': date_from,
+            'DateTo': date_to
+        },
+        'FieldNames': field_names or DEFAULT_REPORT_FIELDS.get(report_type, ['Date', 'Impressions', 'Clicks', 'Cost']),
+        'ReportType': report_type,
+        'DateRangeType': 'CUSTOM_DATE',
+        'Format': 'TSV',
+        'IncludeVAT': 'YES',
+        'IncludeDiscount': 'NO'
+    }
+    
+    if campaign_ids:
+        params['SelectionCriteria']['Filter'] = [{
+            'Field': 'CampaignId',
+            'Operator': 'IN',
+            'Values': [str(campaign_id) for campaign_id in campaign_ids]
+        }]
+    
+    digest = hashlib.md5(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    params['ReportName'] = f"{report_type}_{date_from}_{date_to}_{digest}"
+    if name_suffix:
+        params['ReportName'] += f"_{name_suffix}"
+    
+    return {'params': params}
+
+
+def build_report_headers(base_headers: Dict[str, str]) -> Dict[str, str]:
+    """Заголовки офлайн-отчета в формате TSV без строк заголовка и итогов"""
+    headers = dict(base_headers)
+    headers.update({
+        'processingMode': 'offline',
+        'returnMoneyInMicros': 'false',
+        'skipReportHeader': 'true',
+        'skipColumnHeader': 'false',
+        'skipReportSummary': 'true'
+    })
+    return headers
+
+
+def default_date_range(date_from: Optional[str], date_to: Optional[str]) -> tuple:
+    """Даты по умолчанию - последние 7 дней"""
+    if not date_from:
+        date_from = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+    if not date_to:
+        date_to = datetime.now().strftime('%Y-%m-%d')
+    return date_from, date_to
+
+
+def parse_retry_in(value: Optional[str]) -> float:
+    """Значение заголовка retryIn в секундах"""
+    try:
+        return max(float(value), 1.0)
+    except (TypeError, ValueError):
+        return float(REPORTS_DEFAULT_RETRY_IN)
+
+
+def report_result(report_type: str, date_from: str, date_to: str,
+                  parser: TsvColumnarParser) -> Dict[str, Any]:
+    """Итоговая структура отчета"""
+    return {
+        'report_type': report_type,
+        'date_from': date_from,
+        'date_to': date_to,
+        'field_names': parser.field_names,
+        'rows': parser.rows,
+        'columns': parser.columns
+    }
+
+
+def raise_report_error(status: int, text: str) -> None:
+    """Разбор ошибки Reports API (JSON с полем error)"""
+    try:
+        error = json.loads(text).get('error', {})
+        message = f"{error.get('error_code')}: {error.get('error_string')} {error.get('error_detail', '')}".strip()
+    except ValueError:
+        message = text[:200]
+    raise ReportError(f"Reports API вернул HTTP {status}: {message}")
+
+
+class ReportsClient:
+    """Клиент Reports API поверх сессии и заголовков синхронного коннектора"""
+    
+    def __init__(self, connector):
+        """
+        Args:
+            connector: Экземпляр YandexDirectConnector
+        """
+        self.connector = connector
+    
+    def get_report(self, report_type: str = 'CAMPAIGN_PERFORMANCE_REPORT',
+                   date_from: Optional[str] = None,
+                   date_to: Optional[str] = None,
+                   campaign_ids: Optional[List[int]] = None,
+                   field_names: Optional[List[str]] = None,
+                   max_wait: float = REPORTS_MAX_WAIT,
+                   name_suffix: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Получение отчета в офлайн-режиме
+        
+        Обрыв соединения, таймаут или HTTP 5xx при опросе повторяются по политике
+        повторов коннектора (счетчик сбрасывается после каждого ответа 201/202)
+        и учитываются предохранителем и метриками, как в AsyncYandexDirectConnector.
+        
+        Args:
+            report_type: Тип отчета
+            date_from: Дата начала (формат YYYY-MM-DD)
+            date_to: Дата окончания (формат YYYY-MM-DD)
+            campaign_ids: Список ID кампаний
+            field_names: Поля отчета (по умолчанию - DEFAULT_REPORT_FIELDS)
+            max_wait: Максимальное время ожидания готовности отчета, сек
+            name_suffix: Добавка к имени отчета (см. build_report_request)
+        
+        Returns:
+            Словарь с метаданными и колонками отчета
+        """
+        date_from, date_to = default_date_range(date_from, date_to)
+        body = build_report_request(report_type, date_from, date_to, field_names, campaign_ids, name_suffix)
+        headers = build_report_headers(self.connector._build_headers())
+        connector = self.connector
+        started = time.monotonic()
+        attempt = 0
+        
+        while True:
+            connector.circuit_breaker.before_call()
+            error: Optional[BaseException] = None
+            try:
+                with connector.limiter.slot(connector.client_login):
+                    requested = time.monotonic()
+                    response = connector.session.post(
+                        connector._service_url('reports'),
+                        headers=headers,
+                        json=body,
+                        timeout=REQUEST_TIMEOUT,
+                        stream=True
+                    )
+                    try:
+                        if response.status_code == 200:
+                            response.encoding = 'utf-8'
+                            parser = TsvColumnarParser().feed(response.iter_lines(decode_unicode=True))
+                            logger.info(f"Отчет {report_type} получен: {parser.rows} строк")
+                            return report_result(report_type, date_from, date_to, parser)
+                        
+                        if response.status_code in (201, 202):
+                            retry_in = parse_retry_in(response.headers.get('retryIn'))
+                        elif response.status_code >= 500:
+                            response.raise_for_status()
+                        else:
+                            raise_report_error(response.status_code, response.text)
+                    finally:
+                        response.close()
+                        connector.metrics.observe_request(
+                            'reports', time.monotonic() - requested,
+                            units_header=response.headers.get('Units')
+                        )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError, requests.exceptions.HTTPError) as e:
+                # Обрыв, таймаут или HTTP 5xx при опросе или выгрузке - повтор запроса
+                logger.error(f"Ошибка запроса отчета: {e}")
+                connector.metrics.record_error('reports', connector._transport_error_code(e))
+                error, delay = e, connector._retry_delay('reports', e, attempt, transport=True)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Пробный запрос предохранителя освобождается при любом исходе
+                connector._record_attempt(error)
+            
+            if error is not None:
+                if delay is None:
+                    raise error
+                time.sleep(delay)
+                attempt += 1
+                continue
+            attempt = 0
+            
+            if time.monotonic() - started + retry_in > max_wait:
+                raise ReportError(f"Отчет {report_type} не сформирован за {max_wait:.0f} с")
+            
+            logger.info(f"Отчет {report_type} формируется, повтор через {retry_in:.0f} с")
+            time.sleep(retry_in)
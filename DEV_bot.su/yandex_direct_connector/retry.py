@@ -0,0 +1,217 @@
+"""
+Повторы запросов по кодам ошибок API Яндекс.Директ
+
+Большинство временных сбоев Директ возвращает как HTTP 200 с error_code
+в теле ответа, поэтому HTTP-повторы urllib3 их не видят. Здесь ошибки
+классифицируются по коду: временные повторяются с экспоненциальной
+задержкой и случайным разбросом (jitter), а при серии отказов сервиса
+срабатывает предохранитель (circuit breaker), чтобы не долбить
+недоступный API.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+from config import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+# Временные ошибки, после которых запрос имеет смысл повторить
+RETRYABLE_ERROR_CODES = {
+    52: 'Сервер авторизации временно недоступен',
+    56: 'Превышен лимит запросов к методу',
+    152: 'Недостаточно баллов',
+    506: 'Превышен лимит одновременных запросов',
+    1000: 'Сервер временно недоступен',
+    1001: 'Ошибка при выполнении операции на сервере',
+    1002: 'Операция не выполнена, повторите попытку',
+}
+
+# Ошибки, означающие недоступность сервиса (учитываются предохранителем)
+SERVICE_DOWN_ERROR_CODES = {52, 1000, 1001}
+
+
+class DirectAPIError(Exception):
+    """Ошибка, возвращенная API Директа в теле ответа"""
+    
+    def __init__(self, error_code: Optional[int], error_string: str = '',
+                 error_detail: str = '', request_id: Optional[str] = None):
+        self.error_code = error_code
+        self.error_string = error_string
+        self.error_detail = error_detail
+        self.request_id = request_id
+        
+        message = f"API Error {error_code}: {error_string or 'Unknown error'}"
+        if error_detail:
+            message += f" ({error_detail})"
+        super().__init__(message)
+    
+    @classmethod
+    def from_response(cls, error: dict) -> 'DirectAPIError':
+        """Создание исключения из поля error ответа API"""
+        try:
+            code = int(error.get('error_code'))
+        except (TypeError, ValueError):
+            code = None
+        return cls(
+            error_code=code,
+            error_string=error.get('error_string', ''),
+            error_detail=error.get('error_detail', ''),
+            request_id=error.get('request_id')
+        )
+    
+    @property
+    def is_retryable(self) -> bool:
+        return self.error_code in RETRYABLE_ERROR_CODES
+    
+    @property
+    def is_service_down(self) -> bool:
+        return self.error_code in SERVICE_DOWN_ERROR_CODES
+
+
+class CircuitOpenError(Exception):
+    """Предохранитель разомкнут: API недоступен, запросы временно не выполняются"""
+
+
+class RetryPolicy:
+    """Политика повторов: экспоненциальная задержка с полным случайным разбросом"""
+    
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY):
+        """
+        Args:
+            max_attempts: Максимальное число попыток (включая первую)
+            base_delay: Базовая задержка, сек
+            max_delay: Верхняя граница задержки, сек
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    def should_retry(self, error: Exception, attempt: int, transport: bool = False) -> bool:
+        """
+        Нужно ли повторять запрос
+        
+        Args:
+            error: Возникшее исключение
+            attempt: Номер неудачной попытки (с 0)
+            transport: Сетевая ошибка (обрыв соединения, таймаут), которую тоже нужно повторять
+        """
+        if attempt + 1 >= self.max_attempts:
+            return False
+        return transport or (isinstance(error, DirectAPIError) and error.is_retryable)
+    
+    def delay(self, attempt: int) -> float:
+        """Задержка перед следующей попыткой (full jitter)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для API
+    
+    После failure_threshold подряд отказов сервиса размыкается и сразу
+    отклоняет запросы; через reset_timeout пропускает один пробный запрос
+    (полуоткрытое состояние) и по его результату замыкается или снова размыкается.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        """
+        Args:
+            failure_threshold: Число отказов подряд до размыкания
+            reset_timeout: Через сколько секунд пробовать снова
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    def before_call(self) -> None:
+        """
+        Проверка перед запросом
+        
+        Raises:
+            CircuitOpenError: если предохранитель разомкнут
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == self.OPEN and elapsed >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                logger.info("Предохранитель API: пробный запрос")
+                return
+            
+            retry_in = max(self.reset_timeout - elapsed, 0)
+            raise CircuitOpenError(
+                f"API Директа недоступен (после {self.failures} отказов подряд), "
+                f"повтор не раньше чем через {retry_in:.0f} с"
+            )
+    
+    def record_success(self) -> None:
+        """Успешный ответ замыкает предохранитель"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Предохранитель API замкнут: сервис снова доступен")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+    
+    def release_probe(self) -> None:
+        """
+        Завершение попытки, исход которой не говорит о доступности сервиса
+        
+        Пробный запрос мог закончиться иначе, чем ответом API или отказом
+        сервиса (например, нехваткой баллов до отправки или ошибкой 4xx);
+        тогда следующий запрос снова становится пробным.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        """Отказ сервиса; при достижении порога предохранитель размыкается"""
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Предохранитель API разомкнут на {self.reset_timeout:.0f} с")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+_shared_breaker: Optional[CircuitBreaker] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_circuit_breaker() -> CircuitBreaker:
+    """Общий для процесса предохранитель (недоступность API не зависит от логина)"""
+    global _shared_breaker
+    with _shared_lock:
+        if _shared_breaker is None:
+            _shared_breaker = CircuitBreaker()
+        return _shared_breaker
@@ -0,0 +1,272 @@
+"""
+История снимков данных с хешами объектов и хранением только изменений
+
+Каждый объект снимка (кампания, группа, объявление, ключевое слово)
+получает 64-битный хеш своего содержимого. Снимок сохраняется двумя файлами:
+
+- <id>.npz - индекс: ID объектов в порядке снимка и хеши объектов,
+  изменившихся относительно предыдущего снимка (у базового - всех);
+- <id>.json.gz - сами изменившиеся и новые объекты и прочие поля снимка.
+
+Полный (базовый) снимок пишется раз в SNAPSHOT_BASE_EVERY снимков, остальные
+хранят только разницу с предыдущим, поэтому история за месяцы занимает
+немногим больше одного полного снимка. Сравнение двух снимков (diff) читает
+только индексы и сравнивает хеши векторно, объекты при этом не загружаются.
+"""
+import gzip
+import hashlib
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson не обязателен
+    orjson = None
+
+from config import SNAPSHOT_BASE_EVERY, SNAPSHOT_HISTORY_DIR
+from json_stream import loads
+
+logger = logging.getLogger(__name__)
+
+# Списки объектов снимка DataCollector
+ENTITIES = ('campaigns', 'ad_groups', 'ads', 'keywords')
+
+# Индекс одного вида объектов: ID по возрастанию и хеши в том же порядке
+HashIndex = Tuple[np.ndarray, np.ndarray]
+
+
+# Уровень сжатия gzip файлов объектов (6 - почти как 9, но в несколько раз быстрее)
+SNAPSHOT_COMPRESS_LEVEL = 6
+
+
+def _dumps(value: Any, sort_keys: bool = False) -> bytes:
+    """Компактный JSON в байтах (orjson, если доступен)"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return json.dumps(value, sort_keys=sort_keys, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def object_hash(item: Dict[str, Any]) -> int:
+    """64-битный хеш содержимого объекта (не зависит от порядка ключей)"""
+    digest = hashlib.blake2b(_dumps(item, sort_keys=True), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _hashes(items: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """ID и хеши объектов в порядке списка"""
+    ids = np.fromiter((item['Id'] for item in items), dtype=np.int64, count=len(items))
+    hashes = np.fromiter((object_hash(item) for item in items), dtype=np.uint64, count=len(items))
+    return ids, hashes
+
+
+def _lookup(index: HashIndex, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Хеши ids по индексу: (найден ли ID, хеш)"""
+    index_ids, index_hashes = index
+    if not len(index_ids):
+        return np.zeros(len(ids), dtype=bool), np.zeros(len(ids), dtype=np.uint64)
+    position = np.searchsorted(index_ids, ids).clip(max=len(index_ids) - 1)
+    found = index_ids[position] == ids
+    return found, index_hashes[position]
+
+
+def diff_indexes(old: HashIndex, new: HashIndex) -> Dict[str, List[int]]:
+    """
+    Разница двух индексов одного вида объектов
+    
+    Returns:
+        Словарь {'added', 'removed', 'modified'} со списками ID по возрастанию
+    """
+    found, old_hashes = _lookup(old, new[0])
+    modified = new[0][found & (old_hashes != new[1])]
+    return {
+        'added': new[0][~found].tolist(),
+        'removed': np.setdiff1d(old[0], new[0], assume_unique=True).tolist(),
+        'modified': modified.tolist(),
+    }
+
+
+class SnapshotHistory:
+    """Хранилище истории снимков DataCollector"""
+    
+    def __init__(self, path: Union[str, Path] = SNAPSHOT_HISTORY_DIR,
+                 base_every: int = SNAPSHOT_BASE_EVERY):
+        """
+        Args:
+            path: Папка истории
+            base_every: Через сколько снимков писать полный (базовый) снимок
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.base_every = max(1, base_every)
+    
+    def snapshots(self) -> List[str]:
+        """ID сохраненных снимков по возрастанию"""
+        return sorted(p.name[:-len('.npz')] for p in self.path.glob('*.npz'))
+    
+    def _resolve(self, snapshot_id: Optional[str]) -> str:
+        snapshots = self.snapshots()
+        if not snapshots:
+            raise ValueError(f"История снимков пуста: {self.path}")
+        if snapshot_id is None:
+            return snapshots[-1]
+        if snapshot_id not in snapshots:
+            raise ValueError(f"Снимок не найден: {snapshot_id}")
+        return snapshot_id
+    
+    def _read_index_file(self, snapshot_id: str) -> Dict[str, Dict[str, np.ndarray]]:
+        with np.load(self.path / f'{snapshot_id}.npz') as stored:
+            return {
+                entity: {
+                    'order': np.cumsum(stored[f'{entity}.order']),
+                    'changed_ids': stored[f'{entity}.changed_ids'],
+                    'changed_hashes': stored[f'{entity}.changed_hashes'],
+                }
+                for entity in ENTITIES
+            }
+    
+    def _parent(self, snapshot_id: str) -> Optional[str]:
+        with np.load(self.path / f'{snapshot_id}.npz') as stored:
+            return str(stored['parent']) or None
+    
+    def _chain(self, snapshot_id: str) -> List[str]:
+        """Снимки от базового до snapshot_id включительно"""
+        chain = [snapshot_id]
+        while True:
+            parent = self._parent(chain[-1])
+            if parent is None:
+                return chain[::-1]
+            chain.append(parent)
+    
+    def index(self, snapshot_id: Optional[str] = None) -> Dict[str, HashIndex]:
+        """
+        Хеши объектов снимка без загрузки самих объектов
+        
+        Индекс восстанавливается по цепочке от базового снимка: к хешам
+        предыдущего снимка применяются хеши изменившихся объектов.
+        
+        Args:
+            snapshot_id: ID снимка (None - последний)
+        
+        Returns:
+            {вид объектов: (ID по возрастанию, хеши)}
+        """
+        snapshot_id = self._resolve(snapshot_id)
+        index: Dict[str, HashIndex] = {
+            entity: (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)) for entity in ENTITIES
+        }
+        for step in self._chain(snapshot_id):
+            stored = self._read_index_file(step)
+            for entity in ENTITIES:
+                ids = np.sort(stored[entity]['order'])
+                _, hashes = _lookup(index[entity], ids)
+                changed_found, changed_hashes = _lookup(
+                    (stored[entity]['changed_ids'], stored[entity]['changed_hashes']), ids)
+                index[entity] = (ids, np.where(changed_found, changed_hashes, hashes))
+        return index
+    
+    def save(self, data: Dict[str, Any], snapshot_id: Optional[str] = None) -> str:
+        """
+        Сохранение снимка (только изменений относительно предыдущего)
+        
+        Args:
+            data: Данные collect_all_data или sync_data
+            snapshot_id: ID снимка (по умолчанию - время сохранения, как в save_data)
+        
+        Returns:
+            ID сохраненного снимка
+        """
+        snapshot_id = snapshot_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        snapshots = self.snapshots()
+        if snapshot_id in snapshots:
+            raise ValueError(f"Снимок уже существует: {snapshot_id}")
+        
+        parent = snapshots[-1] if snapshots else None
+        if parent is not None and len(self._chain(parent)) >= self.base_every:
+            parent = None
+        previous = self.index(parent) if parent is not None else None
+        
+        arrays: Dict[str, np.ndarray] = {'parent': np.array(parent or '')}
+        objects: Dict[str, List[Dict[str, Any]]] = {}
+        for entity in ENTITIES:
+            items = data.get(entity, [])
+            ids, hashes = _hashes(items)
+            if previous is None:
+                changed = np.ones(len(ids), dtype=bool)
+            else:
+                found, previous_hashes = _lookup(previous[entity], ids)
+                changed = ~found | (previous_hashes != hashes)
+            
+            order = np.argsort(ids[changed], kind='stable')
+            arrays[f'{entity}.order'] = np.diff(ids, prepend=0)
+            arrays[f'{entity}.changed_ids'] = ids[changed][order]
+            arrays[f'{entity}.changed_hashes'] = hashes[changed][order]
+            objects[entity] = [items[i] for i in np.flatnonzero(changed).tolist()]
+        
+        meta = {key: value for key, value in data.items() if key not in ENTITIES}
+        payload = _dumps({'snapshot_id': snapshot_id, 'parent': parent, 'meta': meta, 'objects': objects})
+        (self.path / f'{snapshot_id}.json.gz').write_bytes(gzip.compress(payload, SNAPSHOT_COMPRESS_LEVEL))
+        # Индекс пишется последним: снимок появляется в истории только целиком
+        np.savez_compressed(self.path / f'{snapshot_id}.npz', **arrays)
+        
+        changed_total = sum(len(items) for items in objects.values())
+        logger.info(f"Снимок {snapshot_id} сохранен в историю "
+                    f"({'базовый' if parent is None else f'изменений: {changed_total}'})")
+        return snapshot_id
+    
+    def load(self, snapshot_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Восстановление снимка целиком
+        
+        Args:
+            snapshot_id: ID снимка (None - последний)
+        
+        Returns:
+            Данные в формате collect_all_data
+        """
+        snapshot_id = self._resolve(snapshot_id)
+        known: Dict[str, Dict[int, Dict[str, Any]]] = {entity: {} for entity in ENTITIES}
+        meta: Dict[str, Any] = {}
+        for step in self._chain(snapshot_id):
+            stored = loads(gzip.decompress((self.path / f'{step}.json.gz').read_bytes()))
+            meta = stored['meta']
+            for entity in ENTITIES:
+                known[entity].update((item['Id'], item) for item in stored['objects'].get(entity, []))
+        
+        entities = self._read_index_file(snapshot_id)
+        data = dict(meta)
+        for entity in ENTITIES:
+            data[entity] = [known[entity][object_id] for object_id in entities[entity]['order'].tolist()]
+        return data
+    
+    def diff(self, snapshot_a: Optional[str] = None, snapshot_b: Optional[str] = None) -> Dict[str, Dict[str, List[int]]]:
+        """
+        Объекты, добавленные, удаленные и измененные между двумя снимками
+        
+        Сравниваются только хеши из индексов, объекты снимков не читаются.
+        
+        Args:
+            snapshot_a: Более ранний снимок (None - предпоследний)
+            snapshot_b: Более поздний снимок (None - последний)
+        
+        Returns:
+            {вид объектов: {'added', 'removed', 'modified'}}
+        """
+        snapshot_b = self._resolve(snapshot_b)
+        if snapshot_a is None:
+            earlier = [s for s in self.snapshots() if s < snapshot_b]
+            if not earlier:
+                raise ValueError(f"Нет снимка раньше {snapshot_b}")
+            snapshot_a = earlier[-1]
+        
+        index_a = self.index(snapshot_a)
+        index_b = self.index(snapshot_b)
+        return {entity: diff_indexes(index_a[entity], index_b[entity]) for entity in ENTITIES}
+    
+    def disk_usage(self) -> int:
+        """Размер истории на диске, байт"""
+        return sum(p.stat().st_size for p in self.path.iterdir() if p.is_file())
@@ -0,0 +1,394 @@
+"""
+Локальное хранилище дневной статистики Reports API в SQLite
+
+Строки CAMPAIGN_PERFORMANCE_REPORT и AD_PERFORMANCE_REPORT хранятся по
+разделам (клиент, отчет, день). Для каждого раздела записывается, когда он
+загружен и окончательный ли он: статистика последних STATS_MUTABLE_DAYS дней
+еще уточняется Директом (конверсии, списания), поэтому такие дни при
+синхронизации запрашиваются повторно, а более старые - только один раз.
+
+sync запрашивает лишь недостающие и неокончательные дни, объединяя соседние
+дни в один диапазон, то есть один запрос отчета на каждый пропуск. Выборки
+за период (query, daily_totals) читают только локальные данные и отдают
+статистику в том же колоночном формате, что и get_statistics.
+"""
+import json
+import logging
+import math
+import sqlite3
+import threading
+from array import array
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from config import STATS_MUTABLE_DAYS, STATS_WAREHOUSE_FILE
+from reports import DEFAULT_REPORT_FIELDS, FLOAT_COLUMNS, INT_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Отчеты хранилища и их поля (Date обязательно)
+WAREHOUSE_REPORTS = {
+    report_type: DEFAULT_REPORT_FIELDS[report_type]
+    for report_type in ('CAMPAIGN_PERFORMANCE_REPORT', 'AD_PERFORMANCE_REPORT')
+}
+
+# Суммируемые показатели для daily_totals
+TOTAL_COLUMNS = ('Impressions', 'Clicks', 'Cost', 'Conversions')
+
+DateLike = Union[str, date]
+
+
+def _to_date(value: DateLike) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _date_range(date_from: date, date_to: date) -> List[date]:
+    return [date_from + timedelta(days=n) for n in range((date_to - date_from).days + 1)]
+
+
+def date_runs(dates: Iterable[DateLike]) -> List[Tuple[str, str]]:
+    """Соседние дни, объединенные в диапазоны (date_from, date_to)"""
+    runs: List[List[date]] = []
+    for day in sorted({_to_date(value) for value in dates}):
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [(start.isoformat(), end.isoformat()) for start, end in runs]
+
+
+class StatsWarehouse:
+    """
+    Хранилище дневной статистики с разделами по дням и клиентам
+    
+    Пример:
+        with StatsWarehouse() as warehouse:
+            warehouse.sync(connector, 'CAMPAIGN_PERFORMANCE_REPORT', '2024-01-01', '2024-06-30')
+            report = warehouse.query('CAMPAIGN_PERFORMANCE_REPORT', '2024-01-01', '2024-06-30')
+    """
+    
+    def __init__(self, path: Union[str, Path] = STATS_WAREHOUSE_FILE,
+                 mutable_days: int = STATS_MUTABLE_DAYS):
+        """
+        Args:
+            path: Файл базы (по умолчанию - data/yandex_direct_stats.sqlite3)
+            mutable_days: Сколько последних дней (включая сегодня) статистика
+                считается неокончательной и перезапрашивается
+        """
+        self.path = Path(path)
+        self.mutable_days = max(1, mutable_days)
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+    
+    @staticmethod
+    def _table(report_type: str) -> str:
+        return f"stats_{report_type.lower()}"
+    
+    def _create_schema(self) -> None:
+        with self._lock:
+            for report_type, fields in WAREHOUSE_REPORTS.items():
+                definitions = ', '.join(
+                    f"{field} INTEGER" if field in INT_COLUMNS
+                    else f"{field} REAL" if field in FLOAT_COLUMNS
+                    else f"{field} TEXT"
+                    for field in fields
+                )
+                table = self._table(report_type)
+                self._connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} (client_login TEXT NOT NULL, {definitions})"
+                )
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_date ON {table} (client_login, Date)"
+                )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS partitions ("
+                "client_login TEXT NOT NULL, report_type TEXT NOT NULL, date TEXT NOT NULL, "
+                "rows INTEGER NOT NULL, fetched_at TEXT NOT NULL, final INTEGER NOT NULL, "
+                "PRIMARY KEY (client_login, report_type, date))"
+            )
+    
+    def close(self) -> None:
+        """Закрытие соединения"""
+        with self._lock:
+            self._connection.close()
+    
+    def __enter__(self) -> 'StatsWarehouse':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+    
+    @staticmethod
+    def _check_report(report_type: str) -> None:
+        if report_type not in WAREHOUSE_REPORTS:
+            raise ValueError(f"Отчет не поддерживается хранилищем: {report_type}. "
+                             f"Доступны: {', '.join(WAREHOUSE_REPORTS)}")
+    
+    # Разделы
+    
+    def is_final(self, day: DateLike, today: Optional[date] = None) -> bool:
+        """Окончательна ли статистика дня (старше mutable_days дней)"""
+        today = today or date.today()
+        return _to_date(day) <= today - timedelta(days=self.mutable_days)
+    
+    def partitions(self, report_type: str, date_from: DateLike, date_to: DateLike,
+                   client_login: str = '') -> Dict[str, Dict[str, Any]]:
+        """
+        Загруженные разделы за период
+        
+        Returns:
+            {день: {'rows', 'fetched_at', 'final'}}
+        """
+        self._check_report(report_type)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT date, rows, fetched_at, final FROM partitions "
+                "WHERE client_login = ? AND report_type = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (client_login, report_type, _to_date(date_from).isoformat(), _to_date(date_to).isoformat())
+            ).fetchall()
+        return {day: {'rows': count, 'fetched_at': fetched_at, 'final': bool(final)}
+                for day, count, fetched_at, final in rows}
+    
+    def missing_dates(self, report_type: str, date_from: DateLike, date_to: DateLike,
+                      client_login: str = '') -> List[str]:
+        """Дни периода, которых нет в хранилище или статистика которых неокончательна"""
+        stored = self.partitions(report_type, date_from, date_to, client_login)
+        return [
+            day.isoformat() for day in _date_range(_to_date(date_from), _to_date(date_to))
+            if not stored.get(day.isoformat(), {}).get('final')
+        ]
+    
+    # Запись
+    
+    def store_report(self, report: Dict[str, Any], client_login: str = '',
+                     today: Optional[date] = None) -> int:
+        """
+        Замена разделов периода отчета его строками
+        
+        Все дни с date_from по date_to отчета считаются загруженными, в том числе
+        дни без строк (без показов).
+        
+        Args:
+            report: Результат get_statistics с полями WAREHOUSE_REPORTS
+            client_login: Клиент
+            today: Текущая дата (для признака окончательности)
+        
+        Returns:
+            Число записанных строк
+        """
+        report_type = report['report_type']
+        self._check_report(report_type)
+        fields = WAREHOUSE_REPORTS[report_type]
+        missing = [field for field in fields if field not in report['columns']]
+        if missing:
+            raise ValueError(f"В отчете {report_type} нет полей: {', '.join(missing)}")
+        
+        days = [day.isoformat() for day in _date_range(_to_date(report['date_from']), _to_date(report['date_to']))]
+        counts = dict.fromkeys(days, 0)
+        for day in report['columns']['Date']:
+            counts[day] = counts.get(day, 0) + 1
+        
+        table = self._table(report_type)
+        fetched_at = datetime.now().isoformat()
+        rows = zip(*(report['columns'][field] for field in fields))
+        with self._lock:
+            self._connection.execute('BEGIN')
+            try:
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE client_login = ? AND Date BETWEEN ? AND ?",
+                    (client_login, days[0], days[-1])
+                )
+                self._connection.executemany(
+                    f"INSERT INTO {table} (client_login, {', '.join(fields)}) "
+                    f"VALUES ({', '.join('?' * (len(fields) + 1))})",
+                    ((client_login,) + row for row in rows)
+                )
+                self._connection.executemany(
+                    "INSERT INTO partitions (client_login, report_type, date, rows, fetched_at, final) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(client_login, report_type, date) DO UPDATE SET "
+                    "rows = excluded.rows, fetched_at = excluded.fetched_at, final = excluded.final",
+                    [(client_login, report_type, day, count, fetched_at, int(self.is_final(day, today)))
+                     for day, count in counts.items()]
+                )
+                self._connection.execute('COMMIT')
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
+        return report['rows']
+    
+    def _plan(self, report_type: str, date_from: Optional[DateLike], date_to: Optional[DateLike],
+              client_login: str, today: Optional[date]) -> Tuple[date, date, List[Tuple[str, str]]]:
+        """Период синхронизации (по умолчанию - 7 дней по сегодня) и диапазоны для запроса"""
+        self._check_report(report_type)
+        today = today or date.today()
+        end = _to_date(date_to) if date_to else today
+        start = _to_date(date_from) if date_from else end - timedelta(days=7)
+        if start > end:
+            raise ValueError(f"Начало периода позже конца: {start} > {end}")
+        return start, end, date_runs(self.missing_dates(report_type, start, end, client_login))
+    
+    def _name_suffix(self, run_to: str, fetch_tag: str, today: Optional[date]) -> Optional[str]:
+        """
+        Добавка к имени отчета для диапазона с неокончательными днями
+        
+        Имя отчета без нее вычисляется только из параметров, и Reports API
+        вернул бы отчет, построенный при прошлой синхронизации того же диапазона.
+        """
+        return None if self.is_final(run_to, today) else fetch_tag
+    
+    def _sync_result(self, report_type: str, client_login: str, start: date, end: date,
+                     runs: List[Tuple[str, str]], rows: int) -> Dict[str, Any]:
+        fetched_days = sum((_to_date(b) - _to_date(a)).days + 1 for a, b in runs)
+        logger.info(f"Статистика {report_type} ({client_login or 'свой аккаунт'}) за {start}..{end}: "
+                    f"запросов {len(runs)}, дней загружено {fetched_days}, строк {rows}")
+        return {
+            'report_type': report_type,
+            'client_login': client_login,
+            'date_from': start.isoformat(),
+            'date_to': end.isoformat(),
+            'requests': len(runs),
+            'ranges': runs,
+            'fetched_days': fetched_days,
+            'rows': rows,
+        }
+    
+    def sync(self, connector, report_type: str = 'CAMPAIGN_PERFORMANCE_REPORT',
+             date_from: Optional[DateLike] = None, date_to: Optional[DateLike] = None,
+             today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Загрузка недостающих и неокончательных дней периода
+        
+        Args:
+            connector: YandexDirectConnector (клиент - его client_login)
+            report_type: CAMPAIGN_PERFORMANCE_REPORT или AD_PERFORMANCE_REPORT
+            date_from: Начало периода (по умолчанию - 7 дней до date_to)
+            date_to: Конец периода (по умолчанию - сегодня)
+            today: Текущая дата (для признака окончательности)
+        
+        Returns:
+            Сводка: requests, ranges (запрошенные диапазоны), fetched_days, rows
+        """
+        client_login = connector.client_login or ''
+        start, end, runs = self._plan(report_type, date_from, date_to, client_login, today)
+        fetch_tag = datetime.now().strftime('%Y%m%d%H%M%S')
+        rows = 0
+        for run_from, run_to in runs:
+            report = connector.get_statistics(report_type, date_from=run_from, date_to=run_to,
+                                              field_names=WAREHOUSE_REPORTS[report_type],
+                                              name_suffix=self._name_suffix(run_to, fetch_tag, today))
+            rows += self.store_report(report, client_login, today)
+        return self._sync_result(report_type, client_login, start, end, runs, rows)
+    
+    async def sync_async(self, connector, report_type: str = 'CAMPAIGN_PERFORMANCE_REPORT',
+                         date_from: Optional[DateLike] = None, date_to: Optional[DateLike] = None,
+                         today: Optional[date] = None) -> Dict[str, Any]:
+        """Загрузка недостающих дней через AsyncYandexDirectConnector (см. sync)"""
+        client_login = connector.client_login or ''
+        start, end, runs = self._plan(report_type, date_from, date_to, client_login, today)
+        fetch_tag = datetime.now().strftime('%Y%m%d%H%M%S')
+        rows = 0
+        for run_from, run_to in runs:
+            report = await connector.get_statistics(report_type, date_from=run_from, date_to=run_to,
+                                                    field_names=WAREHOUSE_REPORTS[report_type],
+                                                    name_suffix=self._name_suffix(run_to, fetch_tag, today))
+            rows += self.store_report(report, client_login, today)
+        return self._sync_result(report_type, client_login, start, end, runs, rows)
+    
+    # Чтение
+    
+    def _where(self, date_from: DateLike, date_to: DateLike, client_login: str,
+               campaign_ids: Optional[Iterable[int]]) -> Tuple[str, List[Any]]:
+        conditions = "client_login = ? AND Date BETWEEN ? AND ?"
+        params: List[Any] = [client_login, _to_date(date_from).isoformat(), _to_date(date_to).isoformat()]
+        if campaign_ids is not None:
+            conditions += " AND CampaignId IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(campaign_ids)))
+        return conditions, params
+    
+    def _warn_missing(self, report_type: str, date_from: DateLike, date_to: DateLike,
+                      client_login: str) -> None:
+        stored = self.partitions(report_type, date_from, date_to, client_login)
+        absent = len(_date_range(_to_date(date_from), _to_date(date_to))) - len(stored)
+        if absent > 0:
+            logger.warning(f"Статистика {report_type} за {absent} дн. периода "
+                           f"{date_from}..{date_to} не загружена (см. sync)")
+    
+    def query(self, report_type: str, date_from: DateLike, date_to: DateLike,
+              client_login: str = '', campaign_ids: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+        """
+        Строки отчета за период из локальных данных
+        
+        Args:
+            report_type: Тип отчета
+            date_from: Начало периода
+            date_to: Конец периода
+            client_login: Клиент
+            campaign_ids: Только эти кампании
+        
+        Returns:
+            Статистика в формате get_statistics: field_names, rows и columns
+            (array('q')/array('d') для числовых полей, списки строк для остальных)
+        """
+        self._check_report(report_type)
+        self._warn_missing(report_type, date_from, date_to, client_login)
+        fields = WAREHOUSE_REPORTS[report_type]
+        where, params = self._where(date_from, date_to, client_login, campaign_ids)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(fields)} FROM {self._table(report_type)} WHERE {where} ORDER BY Date, rowid",
+                params
+            ).fetchall()
+        
+        columns: Dict[str, Any] = {}
+        for field, values in zip(fields, zip(*rows) if rows else [()] * len(fields)):
+            if field in INT_COLUMNS:
+                columns[field] = array('q', (0 if value is None else value for value in values))
+            elif field in FLOAT_COLUMNS:
+                columns[field] = array('d', (math.nan if value is None else value for value in values))
+            else:
+                columns[field] = list(values)
+        return {
+            'report_type': report_type,
+            'date_from': _to_date(date_from).isoformat(),
+            'date_to': _to_date(date_to).isoformat(),
+            'field_names': list(fields),
+            'rows': len(rows),
+            'columns': columns,
+        }
+    
+    def daily_totals(self, report_type: str, date_from: DateLike, date_to: DateLike,
+                     client_login: str = '', campaign_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Показатели по дням за период (для анализа динамики)
+        
+        Returns:
+            Список {'date', 'impressions', 'clicks', 'cost', 'conversions', 'ctr', 'cpc'}
+            по возрастанию даты; дни без строк не включаются
+        """
+        self._check_report(report_type)
+        self._warn_missing(report_type, date_from, date_to, client_login)
+        where, params = self._where(date_from, date_to, client_login, campaign_ids)
+        sums = ', '.join(f"SUM({column})" for column in TOTAL_COLUMNS)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT Date, {sums} FROM {self._table(report_type)} WHERE {where} GROUP BY Date ORDER BY Date",
+                params
+            ).fetchall()
+        
+        result = []
+        for day, impressions, clicks, cost, conversions in rows:
+            impressions, clicks, cost = impressions or 0, clicks or 0, cost or 0.0
+            result.append({
+                'date': day,
+                'impressions': impressions,
+                'clicks': clicks,
+                'cost': round(cost, 2),
+                'conversions': conversions or 0,
+                'ctr': round(clicks / impressions * 100, 2) if impressions else None,
+                'cpc': round(cost / clicks, 2) if clicks else None,
+            })
+        return result
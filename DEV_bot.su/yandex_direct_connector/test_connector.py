@@ -3,6 +3,7 @@
 """
 import sys
 import logging
+import time
 from pathlib import Path
 
 # Добавляем родительскую директорию в путь для импорта
@@ -12,6 +13,9 @@ from connector import YandexDirectConnector
 from data_collector import DataCollector
 from analyzer import StrategyAnalyzer
 from config import YANDEX_DIRECT_TOKEN
+from fake_server import FakeAccount, FakeDirectServer
+from retry import CircuitBreaker, CircuitOpenError, DirectAPIError, RetryPolicy
+from units import UnitsExhaustedError, UnitsGovernor
 
 # Настройка логирования
 logging.basicConfig(
@@ -255,12 +259,76 @@ def test_analysis(data):
         return None
 
 
+def test_circuit_breaker_recovery():
+    """
+    Тест восстановления предохранителя (без доступа к API, через fake_server.py)
+    
+    Пробный запрос полуоткрытого предохранителя, завершившийся ошибкой 506
+    или нехваткой баллов, не должен навсегда блокировать запросы процесса.
+    """
+    print("\n" + "="*60)
+    print("ТЕСТ 0: Восстановление предохранителя (имитация API)")
+    print("="*60)
+    
+    with FakeDirectServer(FakeAccount(campaigns=3), port=0) as server:
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+        governor = UnitsGovernor(max_wait=0)
+        connector = YandexDirectConnector(
+            token='fake', api_url=server.url, governor=governor,
+            retry_policy=RetryPolicy(max_attempts=1), circuit_breaker=breaker
+        )
+        
+        # Отказ сервиса размыкает предохранитель
+        server.error_rates = {1000: 1.0}
+        try:
+            connector.get_campaigns()
+        except DirectAPIError:
+            pass
+        assert breaker.state == CircuitBreaker.OPEN, breaker.state
+        print("✓ Ошибка 1000 разомкнула предохранитель")
+        
+        # Пробный запрос получает 506: API отвечает, предохранитель замыкается
+        time.sleep(0.2)
+        server.error_rates = {506: 1.0}
+        try:
+            connector.get_campaigns()
+        except DirectAPIError as e:
+            assert e.error_code == 506, e
+        server.error_rates = {}
+        assert len(connector.get_campaigns()) == 3
+        print(f"✓ После пробного запроса с ошибкой 506 запросы выполняются (состояние: {breaker.state})")
+        
+        # Пробный запрос не отправлен из-за нехватки баллов: следующий запрос снова пробный
+        breaker.record_failure()
+        time.sleep(0.2)
+        governor.mark_exhausted('')
+        try:
+            connector.get_campaigns()
+        except UnitsExhaustedError:
+            pass
+        governor.update('', {'Units': '0/1000000/1000000', 'Units-Used-Login': 'fake-agency'})
+        try:
+            campaigns = connector.get_campaigns()
+        except CircuitOpenError as e:
+            raise AssertionError(f"Предохранитель не освободил пробный запрос: {e}")
+        assert len(campaigns) == 3 and breaker.state == CircuitBreaker.CLOSED, breaker.state
+        print("✓ Пробный запрос, прерванный нехваткой баллов, не блокирует следующие запросы")
+    
+    return True
+
+
 def main():
     """Основная функция тестирования"""
     print("\n" + "="*60)
     print("ТЕСТИРОВАНИЕ КОННЕКТОРА ЯНДЕКС.ДИРЕКТ")
     print("="*60)
     
+    # Тест 0: Предохранитель на имитации API (токен не нужен)
+    try:
+        test_circuit_breaker_recovery()
+    except AssertionError as e:
+        print(f"✗ Предохранитель: {e}")
+    
     if not YANDEX_DIRECT_TOKEN:
         print("\n✗ ОШИБКА: Токен Яндекс.Директ не найден!")
         print("   Укажите токен в файле config.txt или переменной окружения YANDEX_DIRECT_TOKEN")
@@ -0,0 +1,346 @@
+"""
+Учет баллов (units) API Яндекс.Директ
+
+Директ списывает баллы за каждый вызов и сообщает остаток в заголовке ответа
+Units: "израсходовано/остаток/суточный лимит". Заголовок Units-Used-Login
+указывает, с какого логина списаны баллы (клиент или агентство).
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from config import PAGE_LIMIT, UNITS_RESERVE, UNITS_MAX_WAIT, UNITS_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Стоимость методов в баллах: (за вызов, за каждый объект в запросе/ответе)
+UNITS_COST = {
+    'campaigns.get': (10, 1),
+    'adgroups.get': (15, 1),
+    'ads.get': (15, 1),
+    'keywords.get': (15, 1),
+    'keywordbids.get': (15, 1),
+    'clients.get': (10, 0),
+    'agencyclients.get': (10, 0),
+    'changes.check': (10, 0),
+    'changes.checkCampaigns': (10, 0),
+    'changes.checkDictionaries': (10, 0),
+    'campaigns.add': (10, 5),
+    'campaigns.update': (10, 3),
+    'adgroups.add': (20, 20),
+    'adgroups.update': (20, 20),
+    'ads.add': (20, 20),
+    'ads.update': (20, 20),
+    'keywords.add': (20, 2),
+    'keywords.update': (20, 2),
+    'bids.set': (25, 0),
+    'keywordbids.set': (25, 0),
+}
+DEFAULT_UNITS_COST = (10, 1)
+
+# Ошибка "Недостаточно баллов"
+NOT_ENOUGH_UNITS_ERROR = 152
+
+# Баллы восстанавливаются равномерно в течение суток
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class UnitsExhaustedError(Exception):
+    """Баллов недостаточно, и они не восстановятся за допустимое время ожидания"""
+
+
+def parse_units_header(value: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    """
+    Разбор заголовка Units
+    
+    Args:
+        value: Значение заголовка вида "10/20828/64000"
+    
+    Returns:
+        Кортеж (израсходовано, остаток, суточный лимит) или None
+    """
+    if not value:
+        return None
+    
+    try:
+        spent, remaining, daily_limit = (int(part) for part in value.split('/'))
+    except ValueError:
+        logger.warning(f"Не удалось разобрать заголовок Units: {value}")
+        return None
+    
+    return spent, remaining, daily_limit
+
+
+def estimate_cost(method: str, objects: int = 0) -> int:
+    """
+    Оценка стоимости вызова в баллах
+    
+    Args:
+        method: Название метода API (например, 'keywords.get')
+        objects: Количество объектов в запросе или ответе
+    
+    Returns:
+        Ожидаемое число баллов
+    """
+    call_cost, object_cost = UNITS_COST.get(method, DEFAULT_UNITS_COST)
+    return call_cost + object_cost * objects
+
+
+def estimate_request_cost(method: str, params: Mapping[str, Any]) -> int:
+    """
+    Оценка стоимости запроса по его параметрам
+    
+    Для get-методов число объектов оценивается сверху: по Ids в SelectionCriteria,
+    а при отборе по CampaignIds/AdGroupIds - по размеру страницы (Page.Limit или
+    PAGE_LIMIT). Фактическая стоимость уточняется по заголовку Units ответа.
+    Для изменяющих методов - длина передаваемого списка.
+    """
+    objects = 0
+    criteria = params.get('SelectionCriteria') or {}
+    page_limit = (params.get('Page') or {}).get('Limit') or PAGE_LIMIT
+    if criteria.get('Ids'):
+        objects = len(criteria['Ids'])
+        if method.endswith('.get'):
+            objects = min(objects, page_limit)
+    elif method.endswith('.get'):
+        objects = page_limit
+    else:
+        for value in params.values():
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                objects = len(value)
+                break
+    
+    return estimate_cost(method, objects)
+
+
+class UnitsGovernor:
+    """
+    Регулятор расхода баллов по логинам
+    
+    Хранит актуальный остаток баллов по каждому логину (по заголовкам Units),
+    учитывает стоимость уже запущенных запросов и притормаживает новые
+    вызовы, если остатка не хватает, вместо того чтобы получить ошибку 152.
+    """
+    
+    def __init__(self, reserve: int = UNITS_RESERVE, max_wait: float = UNITS_MAX_WAIT,
+                 poll_interval: float = UNITS_POLL_INTERVAL):
+        """
+        Инициализация регулятора
+        
+        Args:
+            reserve: Неприкосновенный запас баллов
+            max_wait: Максимальное ожидание восстановления баллов, сек
+            poll_interval: Шаг ожидания, сек
+        """
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        
+        self._budgets: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, int] = {}
+        self._charged_login: Dict[str, str] = {}
+        self._condition = threading.Condition()
+    
+    def _resolve(self, login: str) -> str:
+        """Логин, с которого фактически списываются баллы (Units-Used-Login)"""
+        return self._charged_login.get(login or '', login or '')
+    
+    def _projected_remaining(self, login: str, now: float) -> Optional[float]:
+        """Остаток с учетом восстановления баллов с момента последнего ответа"""
+        budget = self._budgets.get(login)
+        if budget is None:
+            return None
+        
+        restore_rate = budget['daily_limit'] / SECONDS_PER_DAY
+        restored = budget['remaining'] + (now - budget['updated_at']) * restore_rate
+        return min(float(budget['daily_limit']), restored)
+    
+    def _wait_time(self, login: str, cost: int, now: float) -> float:
+        """Сколько ждать, чтобы остатка хватило на запрос (0 - можно выполнять)"""
+        remaining = self._projected_remaining(login, now)
+        if remaining is None:
+            return 0.0
+        
+        daily_limit = self._budgets[login]['daily_limit']
+        # Оценка сверху (полная страница) может превышать суточный лимит небольшого
+        # аккаунта: такой запрос ждет полного остатка, а не отклоняется
+        cost = min(cost, daily_limit - self.reserve)
+        
+        available = remaining - self._pending.get(login, 0) - self.reserve
+        if available >= cost:
+            return 0.0
+        
+        if daily_limit <= 0:
+            return self.poll_interval
+        
+        return (cost - available) * SECONDS_PER_DAY / daily_limit
+    
+    def _try_reserve(self, login: str, cost: int, started: float) -> float:
+        """
+        Попытка занять баллы под запрос (вызывается под блокировкой)
+        
+        Returns:
+            0, если баллы заняты, иначе время до следующей попытки
+        """
+        now = time.monotonic()
+        wait = self._wait_time(login, cost, now)
+        if wait <= 0:
+            self._pending[login] = self._pending.get(login, 0) + cost
+            return 0.0
+        
+        if now - started + wait > self.max_wait:
+            raise UnitsExhaustedError(
+                f"Недостаточно баллов для логина '{login or 'default'}': "
+                f"требуется {cost}, ожидание восстановления ~{wait:.0f} с"
+            )
+        
+        logger.info(f"Недостаточно баллов для '{login or 'default'}', ожидание {min(wait, self.poll_interval):.0f} с")
+        return min(wait, self.poll_interval)
+    
+    def acquire(self, login: str, cost: int) -> str:
+        """
+        Резервирование баллов под запрос; блокирует, пока баллов не хватит
+        
+        Args:
+            login: Client-Login запроса
+            cost: Ожидаемая стоимость запроса
+        
+        Returns:
+            Логин, на который записан резерв (передается в release)
+        
+        Raises:
+            UnitsExhaustedError: если ждать пришлось бы дольше max_wait
+        """
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                charged = self._resolve(login)
+                wait = self._try_reserve(charged, cost, started)
+                if not wait:
+                    return charged
+                self._condition.wait(timeout=wait)
+    
+    async def acquire_async(self, login: str, cost: int) -> str:
+        """Асинхронный вариант acquire (ожидание не блокирует цикл событий)"""
+        started = time.monotonic()
+        while True:
+            with self._condition:
+                charged = self._resolve(login)
+                wait = self._try_reserve(charged, cost, started)
+            if not wait:
+                return charged
+            await asyncio.sleep(wait)
+    
+    def release(self, charged: str, cost: int) -> None:
+        """
+        Снятие резерва после завершения запроса
+        
+        Args:
+            charged: Логин, который вернул acquire
+            cost: Стоимость, переданная в acquire
+        """
+        with self._condition:
+            left = self._pending.get(charged, 0) - cost
+            if left > 0:
+                self._pending[charged] = left
+            else:
+                self._pending.pop(charged, None)
+            self._condition.notify_all()
+    
+    def update(self, login: str, headers: Mapping[str, str]) -> None:
+        """
+        Обновление бюджета по заголовкам ответа
+        
+        Args:
+            login: Client-Login запроса
+            headers: Заголовки HTTP-ответа
+        """
+        units = parse_units_header(headers.get('Units'))
+        if units is None:
+            return
+        
+        spent, remaining, daily_limit = units
+        used_login = headers.get('Units-Used-Login') or login or ''
+        
+        with self._condition:
+            if used_login != (login or ''):
+                self._charged_login[login or ''] = used_login
+            budget = self._budgets.setdefault(used_login, {'spent_total': 0})
+            budget.update({
+                'last_spent': spent,
+                'remaining': remaining,
+                'daily_limit': daily_limit,
+                'updated_at': time.monotonic()
+            })
+            budget['spent_total'] += spent
+            self._condition.notify_all()
+        
+        logger.debug(f"Баллы '{used_login or 'default'}': -{spent}, остаток {remaining}/{daily_limit}")
+    
+    def mark_exhausted(self, login: str) -> None:
+        """Обнуление остатка после ошибки 152 (недостаточно баллов)"""
+        with self._condition:
+            budget = self._budgets.get(self._resolve(login))
+            if budget is not None:
+                budget['remaining'] = 0
+                budget['updated_at'] = time.monotonic()
+    
+    def remaining(self, login: str) -> Optional[int]:
+        """Текущий остаток баллов логина (None - еще не было ответов)"""
+        with self._condition:
+            value = self._projected_remaining(self._resolve(login), time.monotonic())
+        return None if value is None else int(value)
+    
+    def pending_cost(self, login: str) -> int:
+        """Суммарная оценка стоимости запросов, выполняющихся прямо сейчас"""
+        with self._condition:
+            return self._pending.get(self._resolve(login), 0)
+    
+    def estimate_work(self, calls: Iterable[Tuple[str, int]]) -> int:
+        """
+        Оценка стоимости пакета работ
+        
+        Args:
+            calls: Пары (метод, число объектов)
+        
+        Returns:
+            Суммарная стоимость в баллах
+        """
+        return sum(estimate_cost(method, objects) for method, objects in calls)
+    
+    def get_budget(self, login: str) -> Dict[str, Any]:
+        """
+        Состояние бюджета логина
+        
+        Returns:
+            Словарь с остатком, суточным лимитом, израсходованным за сессию
+            и стоимостью выполняющихся запросов
+        """
+        charged = self._resolve(login)
+        with self._condition:
+            budget = dict(self._budgets.get(charged, {}))
+            pending = self._pending.get(charged, 0)
+            remaining = self._projected_remaining(charged, time.monotonic())
+        
+        return {
+            'login': charged,
+            'remaining': None if remaining is None else int(remaining),
+            'daily_limit': budget.get('daily_limit'),
+            'spent_total': budget.get('spent_total', 0),
+            'pending': pending
+        }
+
+
+_shared_governor: Optional[UnitsGovernor] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_governor() -> UnitsGovernor:
+    """Общий для процесса регулятор баллов (используется коннекторами по умолчанию)"""
+    global _shared_governor
+    with _shared_lock:
+        if _shared_governor is None:
+            _shared_governor = UnitsGovernor()
+        return _shared_governor
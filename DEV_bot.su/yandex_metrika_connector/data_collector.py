@@ -3,11 +3,16 @@
 """
 import json
 import logging
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional
 import pandas as pd
 
+# Модули, общие для коннекторов Директа и Метрики (column_snapshot)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'shared'))
+
+from column_snapshot import COLUMN_SNAPSHOT_SUFFIX, ColumnSelection, ColumnSnapshot, write_column_snapshot
 from connector import YandexMetrikaConnector
 from config import DATA_DIR, REPORTS_DIR
 
@@ -112,35 +117,45 @@ class MetrikaDataCollector:
             logger.error(f"Ошибка при сборе данных: {e}")
             raise
     
-    def save_data(self, data: Dict, filename: Optional[str] = None) -> Path:
+    def save_data(self, data: Dict, filename: Optional[str] = None, columnar: bool = False) -> Path:
         """
-        Сохранение данных в JSON файл
+        Сохранение данных в JSON файл или колоночный снимок
         
         Args:
             data: Данные для сохранения
             filename: Имя файла
+            columnar: Сохранить колоночный снимок (папка .columns, см. column_snapshot.py);
+                так же сохраняется при filename с расширением .columns
             
         Returns:
             Путь к сохраненному файлу
         """
+        columnar = columnar or (filename or '').endswith(COLUMN_SNAPSHOT_SUFFIX)
         if not filename:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'yandex_metrika_data_{timestamp}.json'
+            suffix = COLUMN_SNAPSHOT_SUFFIX if columnar else '.json'
+            filename = f'yandex_metrika_data_{timestamp}{suffix}'
         
         filepath = self.data_dir / filename
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if columnar:
+            write_column_snapshot(data, filepath)
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
         
         logger.info(f"Данные сохранены в {filepath}")
         return filepath
     
-    def load_data(self, filename: str) -> Dict:
+    def load_data(self, filename: str, columns: Optional[ColumnSelection] = None) -> Dict:
         """
-        Загрузка данных из JSON файла
+        Загрузка данных из JSON файла или колоночного снимка
         
         Args:
             filename: Имя файла
+            columns: Только для колоночного снимка - нужные поля по таблицам,
+                например {'sources_report.data': ['dimensions', 'metrics']};
+                остальные таблицы загружаются пустыми (None - все данные)
             
         Returns:
             Загруженные данные
@@ -150,12 +165,29 @@ class MetrikaDataCollector:
         if not filepath.exists():
             raise FileNotFoundError(f"Файл не найден: {filepath}")
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if filepath.is_dir():
+            data = ColumnSnapshot(filepath).to_data(columns)
+        else:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         
         logger.info(f"Данные загружены из {filepath}")
         return data
     
+    def open_snapshot(self, filename: str) -> ColumnSnapshot:
+        """
+        Открытие колоночного снимка для чтения отдельных столбцов
+        
+        Данные столбцов отображаются в память и читаются с диска только при обращении.
+        
+        Args:
+            filename: Имя папки снимка (результат save_data(..., columnar=True))
+            
+        Returns:
+            Открытый снимок
+        """
+        return ColumnSnapshot(self.data_dir / filename)
+    
     def export_to_excel(self, data: Dict, filename: Optional[str] = None) -> Path:
         """
         Экспорт данных в Excel файл